@@ -0,0 +1,248 @@
+import os
+import logging
+import sqlite3
+import statistics
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Deque, Dict, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+# --- Admission Configuration ---
+# Slot table shared by every process on the host (web workers, worker.py, the scheduler leader, scripts)
+ADMISSION_PATH = os.getenv(
+    "ADMISSION_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".admission.sqlite3"),
+)
+# Browser sessions (pooled or standalone Chromium) allowed to run at once on the whole host
+BROWSER_SLOTS = int(os.getenv("BROWSER_SLOTS", os.getenv("BROWSER_POOL_SIZE", "2")))
+# Slots only booking work may use, so a release-time booking never waits behind scrapes
+BOOKING_RESERVED_SLOTS = int(os.getenv("BROWSER_SLOTS_RESERVED_FOR_BOOKING", "1"))
+# New scrape work is rejected at once when this many scrapes are already waiting on the host
+MAX_QUEUED_SCRAPES = int(os.getenv("MAX_QUEUED_SCRAPES", "4"))
+# How long admitted-but-waiting work may queue before giving up
+ADMISSION_TIMEOUT_SECONDS = float(os.getenv("ADMISSION_TIMEOUT", "120"))
+# Waiters re-check the slot table this often; a release in the same process wakes them at once
+ADMISSION_POLL_SECONDS = float(os.getenv("ADMISSION_POLL", "0.05"))
+# --- End Admission Configuration ---
+
+# browser_pool's size (BROWSER_POOL_SIZE). The pool hands out browsers first come
+# first served, so one process must never be admitted more sessions than it has browsers
+_POOL_SIZE = int(os.getenv("BROWSER_POOL_SIZE", "2"))
+
+# Lower runs first; 'watch' (slot watch sessions) only gets slots no scrape is waiting for
+PRIORITIES = {"book": 0, "scrape": 1, "watch": 2}
+# Wait times kept per kind for the metrics percentiles
+_WAIT_SAMPLES = 500
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS admission_tickets (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind TEXT NOT NULL,
+    priority INTEGER NOT NULL,
+    pid INTEGER NOT NULL,
+    state TEXT NOT NULL DEFAULT 'waiting',
+    enqueued_at REAL NOT NULL,
+    started_at REAL
+);
+CREATE INDEX IF NOT EXISTS admission_tickets_state ON admission_tickets (state, priority, id);
+"""
+
+
+class AdmissionRejected(Exception):
+    """Raised when browser work is refused because the admission queue is saturated."""
+
+
+def _pid_alive(pid: Optional[int]) -> bool:
+    if not pid:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class AdmissionController:
+    """
+    Host-wide budget of concurrent browser sessions.
+
+    Work asks for a slot with admit(kind). Slots and waiting work are tickets
+    in a SQLite file shared by every process on the host, so the gunicorn
+    workers' scrapes, worker.py's and the scheduler leader's bookings and
+    scheduled_bookings.py all draw from the same BROWSER_SLOTS. Waiting work
+    is served in priority order: 'book' always goes before 'scrape', 'scrape'
+    before 'watch', first come first served within a kind, and scrapes and
+    watches can never take the last BOOKING_RESERVED_SLOTS slots, so a
+    booking that fires at the release minute gets a browser as soon as one is
+    free anywhere on the host instead of queueing behind availability
+    scrapes. Scrapes are rejected immediately (AdmissionRejected) once
+    MAX_QUEUED_SCRAPES are waiting; bookings are never rejected, only time
+    out. Tickets of processes that died are dropped. Counters and wait
+    times in metrics() are per process; slots in use and queue depth are
+    host-wide.
+    """
+
+    def __init__(self, slots: int = BROWSER_SLOTS, reserved_for_booking: int = BOOKING_RESERVED_SLOTS,
+                 max_queued_scrapes: int = MAX_QUEUED_SCRAPES, path: str = ADMISSION_PATH,
+                 pool_size: int = _POOL_SIZE):
+        if slots > pool_size:
+            logger.warning(f"[AdmissionController] BROWSER_SLOTS={slots} exceeds BROWSER_POOL_SIZE={pool_size}; "
+                           f"using {pool_size} slots")
+        self.slots = max(1, min(slots, pool_size))
+        # Scrapes must always be able to run on at least one slot
+        self.reserved_for_booking = max(0, min(reserved_for_booking, self.slots - 1))
+        self.max_queued_scrapes = max_queued_scrapes
+        self.path = path
+        self._local = threading.local()
+        # Notified on every release in this process, so local waiters do not wait for the next poll
+        self._released = threading.Condition()
+        self._lock = threading.Lock()
+        self._admitted: Dict[str, int] = {kind: 0 for kind in PRIORITIES}
+        self._rejected: Dict[str, int] = {kind: 0 for kind in PRIORITIES}
+        self._timed_out: Dict[str, int] = {kind: 0 for kind in PRIORITIES}
+        self._waits: Dict[str, Deque[float]] = {kind: deque(maxlen=_WAIT_SAMPLES) for kind in PRIORITIES}
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        # Reconnect per pid: a connection inherited across fork must not be used by the child
+        conn = getattr(self._local, "conn", None)
+        if conn is None or getattr(self._local, "pid", None) != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    @staticmethod
+    def _reap(conn: sqlite3.Connection):
+        """Drops the tickets of processes that exited without releasing them."""
+        dead = [row["pid"] for row in conn.execute("SELECT DISTINCT pid FROM admission_tickets")
+                if not _pid_alive(row["pid"])]
+        for pid in dead:
+            count = conn.execute("DELETE FROM admission_tickets WHERE pid = ?", (pid,)).rowcount
+            logger.warning(f"[AdmissionController] Dropped {count} ticket(s) of exited process {pid}")
+
+    def _try_start(self, conn: sqlite3.Connection, ticket: int, kind: str) -> bool:
+        """Turns a waiting ticket into a running one if the slots left after everything ahead of it allow."""
+        running = conn.execute("SELECT COUNT(*) FROM admission_tickets WHERE state = 'running'").fetchone()[0]
+        ahead = conn.execute(
+            "SELECT COUNT(*) FROM admission_tickets WHERE state = 'waiting' AND (priority < ? OR (priority = ? AND id < ?))",
+            (PRIORITIES[kind], PRIORITIES[kind], ticket)).fetchone()[0]
+        limit = self.slots if kind == "book" else self.slots - self.reserved_for_booking
+        if running + ahead >= limit:
+            return False
+        conn.execute("UPDATE admission_tickets SET state = 'running', started_at = ? WHERE id = ?", (time.time(), ticket))
+        return True
+
+    def acquire(self, kind: str, timeout: Optional[float] = None) -> int:
+        """Blocks until a slot for kind is free. Returns the ticket to release()."""
+        if kind not in PRIORITIES:
+            raise ValueError(f"Unknown admission kind {kind!r}")
+        started = time.monotonic()
+        deadline = started + (timeout if timeout is not None else ADMISSION_TIMEOUT_SECONDS)
+        with self._transaction() as conn:
+            self._reap(conn)
+            if kind == "scrape":
+                queued = conn.execute(
+                    "SELECT COUNT(*) FROM admission_tickets WHERE state = 'waiting' AND kind = 'scrape'").fetchone()[0]
+            ticket = conn.execute(
+                "INSERT INTO admission_tickets (kind, priority, pid, enqueued_at) VALUES (?, ?, ?, ?)",
+                (kind, PRIORITIES[kind], os.getpid(), time.time())).lastrowid
+            granted = self._try_start(conn, ticket, kind)
+            rejected = not granted and kind == "scrape" and queued >= self.max_queued_scrapes
+            if rejected:
+                conn.execute("DELETE FROM admission_tickets WHERE id = ?", (ticket,))
+        if rejected:
+            with self._lock:
+                self._rejected[kind] += 1
+            raise AdmissionRejected(f"Browser queue is saturated ({queued} scrapes waiting)")
+
+        while not granted:
+            with self._released:
+                self._released.wait(max(0.0, min(ADMISSION_POLL_SECONDS, deadline - time.monotonic())))
+            with self._transaction() as conn:
+                self._reap(conn)
+                granted = self._try_start(conn, ticket, kind)
+                expired = not granted and time.monotonic() >= deadline
+                if expired:
+                    conn.execute("DELETE FROM admission_tickets WHERE id = ?", (ticket,))
+            if expired:
+                with self._lock:
+                    self._timed_out[kind] += 1
+                raise TimeoutError(f"Timed out waiting for a browser slot ({kind})")
+
+        waited = time.monotonic() - started
+        with self._lock:
+            self._admitted[kind] += 1
+            self._waits[kind].append(waited)
+        if waited > 1:
+            logger.info(f"[AdmissionController] {kind} admitted after waiting {waited:.1f}s")
+        return ticket
+
+    def release(self, ticket: int):
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM admission_tickets WHERE id = ?", (ticket,))
+        with self._released:
+            self._released.notify_all()
+
+    @contextmanager
+    def admit(self, kind: str, timeout: Optional[float] = None):
+        """Holds a browser slot of the given kind ('book', 'scrape' or 'watch') for the block."""
+        ticket = self.acquire(kind, timeout)
+        try:
+            yield
+        finally:
+            self.release(ticket)
+
+    def busy(self, kind: str) -> bool:
+        """Whether work of this kind holds a slot anywhere on the host."""
+        return self._connect().execute("SELECT 1 FROM admission_tickets WHERE kind = ? AND state = 'running' LIMIT 1",
+                                       (kind,)).fetchone() is not None
+
+    def metrics(self) -> Dict[str, Any]:
+        counts = {(row["kind"], row["state"]): row["count"] for row in self._connect().execute(
+            "SELECT kind, state, COUNT(*) AS count FROM admission_tickets GROUP BY kind, state")}
+        with self._lock:
+            per_kind = {}
+            for kind in PRIORITIES:
+                waits = sorted(self._waits[kind])
+                per_kind[kind] = {
+                    "in_use": counts.get((kind, "running"), 0),
+                    "queued": counts.get((kind, "waiting"), 0),
+                    "admitted": self._admitted[kind],
+                    "rejected": self._rejected[kind],
+                    "timed_out": self._timed_out[kind],
+                    "wait_p50_ms": round(statistics.median(waits) * 1000, 1) if waits else None,
+                    "wait_p95_ms": round(waits[min(len(waits) - 1, int(len(waits) * 0.95))] * 1000, 1) if waits else None,
+                    "wait_max_ms": round(waits[-1] * 1000, 1) if waits else None,
+                }
+        return {
+            "slots": self.slots,
+            "reserved_for_booking": self.reserved_for_booking,
+            "max_queued_scrapes": self.max_queued_scrapes,
+            "in_use": sum(count for (_, state), count in counts.items() if state == "running"),
+            "queue_depth": sum(count for (_, state), count in counts.items() if state == "waiting"),
+            "kinds": per_kind,
+        }
+
+
+admission_controller = AdmissionController()
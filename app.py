@@ -1,14 +1,28 @@
 import os
 import logging
 import json
-from flask import Flask, render_template, request, jsonify, flash, redirect, url_for
+from flask import Flask, Response, render_template, request, jsonify, flash, redirect, url_for, stream_with_context
 from datetime import datetime, timedelta
 from zoneinfo import ZoneInfo
 from court_scraper import update_court_list
 from automation import TennisBooker
-from models import Court, UserInformation, BookingAttempt
+from availability_scanner import scan_availability, booking_window_dates, date_range
+from booking_window import release_instant
+from scheduler import schedule_booking_chain, start_recovery
+from booking_queue import booking_queue
+from models import Court, UserInformation, BookingAttempt, SlotWatch
 from database import init_db
 from extensions import scheduler
+from scheduler_leader import scheduler_leader
+from admission import admission_controller, AdmissionRejected
+from browser_pool import browser_pool
+from resource_profiles import ResourceStats
+from clock_sync import clock_sync
+from recus_navigator import deep_link_navigator
+from availability_cache import availability_cache
+from singleflight import single_flight
+from availability_prefetcher import availability_prefetcher, AVAILABILITY_PREFETCH_ENABLED, AVAILABILITY_PREFETCH_TICK_SECONDS
+from slot_watcher import slot_watcher, stream_slot_events, open_stream, close_stream, with_served, SLOT_WATCH_ENABLED, SLOT_WATCH_MAX_DATES, SLOT_WATCH_SYNC_SECONDS
 import re
 from flask_apscheduler import APScheduler
 from flask_wtf.csrf import CSRFProtect
@@ -36,10 +50,39 @@ csrf = CSRFProtect(app)
 logger.info("Flask-WTF CSRF protection initialized.")
 # --- End Secret Key and CSRF Protection Setup ---
 
-# Initialize scheduler
+# Initialize scheduler: only the elected leader process runs jobs, the other
+# gunicorn workers forward their add_job calls to it. Whichever process
+# becomes leader rebuilds the pending booking jobs from booking_attempts and
+# registers the periodic jobs below on its own scheduler.
 if not scheduler.running:
-    scheduler.init_app(app)
-    scheduler.start()
+    # Keep cached rec.us logins fresh so bookings can skip the login flow
+    scheduler_leader.add_leader_job(
+        id='refresh_rec_sessions',
+        func='session_cache:refresh_expiring_sessions',
+        trigger='interval',
+        minutes=15
+    )
+    # Keep availability for the booking window warm so lookups rarely wait on a browser
+    if AVAILABILITY_PREFETCH_ENABLED:
+        scheduler_leader.add_leader_job(
+            id='prefetch_availability',
+            func='availability_prefetcher:prefetch_tick',
+            trigger='interval',
+            seconds=AVAILABILITY_PREFETCH_TICK_SECONDS,
+            max_instances=1,
+            coalesce=True
+        )
+    # Watch dates with active slot watches for freed-up slots
+    if SLOT_WATCH_ENABLED:
+        scheduler_leader.add_leader_job(
+            id='sync_slot_watches',
+            func='slot_watcher:sync_slot_watches',
+            trigger='interval',
+            seconds=SLOT_WATCH_SYNC_SECONDS,
+            max_instances=1,
+            coalesce=True
+        )
+    scheduler_leader.start(app, on_elected=[start_recovery])
 
 def sync_courts():
     """Synchronize courts from scraper with database"""
@@ -187,6 +230,19 @@ def settings():
                          courts=None, 
                          user_info=current_user_info)
 
+def existing_attempt_response(existing_attempt):
+    """/schedule-booking answer for a duplicate submission, mirroring the live attempt's state."""
+    attempt_id = existing_attempt['id']
+    status = existing_attempt.get('status')
+    logger.info(f"SCHEDULE_BOOKING: Duplicate submission collapsed into attempt {attempt_id} ({status})")
+    if status == 'completed':
+        response = {'status': 'success', 'message': 'Court already booked'}
+    elif status == 'scheduled':
+        response = {'status': 'scheduled', 'message': 'Booking already scheduled'}
+    else:
+        response = {'status': 'queued', 'message': 'Booking already in progress'}
+    return jsonify({**response, 'attempt_id': attempt_id, 'duplicate': True})
+
 @app.route('/schedule-booking', methods=['POST'])
 def schedule_booking():
     try:
@@ -235,21 +291,29 @@ def schedule_booking():
             booking_time=booking_time,
             user_email=user_email_for_attempt
         )
+        # A repeated submission (double click, front-end retry) gets the live attempt for the same slot
+        existing_attempt = BookingAttempt.get_active_by_key(attempt.idempotency_key)
+        if existing_attempt:
+            return existing_attempt_response(existing_attempt)
         attempt_data = attempt.save()
 
         if not attempt_data:
+            # The unique index on the key rejects a concurrent duplicate insert
+            existing_attempt = BookingAttempt.get_active_by_key(attempt.idempotency_key)
+            if existing_attempt:
+                return existing_attempt_response(existing_attempt)
             logger.error(f"SCHEDULE_BOOKING: Failed to save booking attempt for {user_email_for_attempt}")
             return jsonify({
                 'status': 'error',
                 'message': 'Failed to create booking attempt record'
             }), 500
 
-        # Calculate days difference between booking date and today
-        days_difference = (booking_date - today).days
+        # When the slot is bookable is set by the court's booking-window rule
+        release_at = release_instant(court_name, booking_time)
 
-        # If booking is within a week, attempt to book immediately
-        if days_difference <= 7:
-            logger.info(f"SCHEDULE_BOOKING: Attempt {attempt_data['id']} - Date within 7 days. Attempting immediate booking.")
+        # If the slot has already been released, attempt to book immediately
+        if release_at <= now:
+            logger.info(f"SCHEDULE_BOOKING: Attempt {attempt_data['id']} - Slot released at {release_at.isoformat()}. Attempting immediate booking.")
 
             # Get the full attempt record first (includes user_email)
             attempt_record = BookingAttempt.get_by_id(attempt_data["id"])
@@ -292,87 +356,34 @@ def schedule_booking():
                      'message': f'Password not found for user {email}. Please update settings.'
                  }), 400
 
-            # Initialize TennisBooker with specific user's credentials
-            logger.debug(f"SCHEDULE_BOOKING: Attempt {attempt_data['id']} - Initializing TennisBooker for {email}.")
-            booker = TennisBooker(email, password, user_id=email)
-
-            # Get playtime duration (default to 60 minutes if not set or invalid in user_info)
-            playtime_duration = user_info.get('playtime_duration', 60)
-            if playtime_duration not in [60, 90]:
-                logger.warning(f"SCHEDULE_BOOKING: Attempt {attempt_data['id']} - Invalid playtime duration {playtime_duration} for user {email}, defaulting to 60")
-                playtime_duration = 60
-
-            # Attempt booking
-            logger.info(f"SCHEDULE_BOOKING: Attempt {attempt_data['id']} - Calling booker.book_court...")
-            success, error = booker.book_court(
-                court_name,
-                booking_time,
-                playtime_duration=playtime_duration
-            )
-            
-            # Update attempt status based on immediate attempt
-            status = 'completed' if success else 'failed'
-            error_message = error if error else None
-            # Log the immediate result before potentially scheduling
-            logger.debug(f"Updating booking attempt {attempt_data['id']} status to '{status}' after immediate attempt.")
-            BookingAttempt.update_status(attempt_data["id"], status, error_message)
-            
-            if success:
-                logger.info(f"SCHEDULE_BOOKING: Attempt {attempt_data['id']} - Immediate booking successful for {email}")
+            # The browser work runs in worker.py; hand the attempt over and answer right away
+            try:
+                job_id = booking_queue.enqueue(attempt_data["id"], dedupe_key=attempt.idempotency_key)
+            except Exception as queue_error:
+                logger.error(f"SCHEDULE_BOOKING: Attempt {attempt_data['id']} - Failed to enqueue: {str(queue_error)}", exc_info=True)
+                BookingAttempt.update_status(attempt_data["id"], 'failed', f"Failed to queue: {str(queue_error)}")
                 return jsonify({
-                    'status': 'success',
-                    'message': 'Court booked successfully'
-                })
-            else:
-                # Immediate booking failed, schedule it for the future as a backup
-                logger.warning(f"SCHEDULE_BOOKING: Attempt {attempt_data['id']} - Immediate booking failed for {email}: {error}. Scheduling for the future.")
-                # Schedule the booking attempt with a unique job ID
-                job_id = f'booking_{attempt_data["id"]}_{booking_time.strftime("%Y%m%d_%H%M")}'
-                try:
-                    scheduler.add_job(
-                        func='scheduler:booking_job',  # Use string reference to function
-                        trigger='date',
-                        run_date=booking_time,
-                        args=[attempt_data["id"]],
-                        id=job_id,
-                        replace_existing=True # Avoid duplicate jobs if somehow triggered again
-                    )
-                    # Update status to 'scheduled' since immediate failed but scheduling worked
-                    # Keep the original error message about the immediate failure
-                    logger.info(f"SCHEDULE_BOOKING: Attempt {attempt_data['id']} - Successfully scheduled future booking job {job_id} despite immediate failure.")
-                    BookingAttempt.update_status(attempt_data["id"], 'scheduled', error_message) 
-                    # Return success status but with a specific message
-                    return jsonify({
-                        'status': 'success', # Keep status success for frontend simplicity
-                        'message': f'Immediate booking failed ({error_message or "reason unknown"}).' # Simplified message
-                    })
-                except Exception as scheduler_error:
-                    # Immediate booking failed AND scheduling failed
-                    full_error = f"Immediate fail: {error_message}. Scheduler fail: {str(scheduler_error)}"
-                    logger.error(f"SCHEDULE_BOOKING: Attempt {attempt_data['id']} - Immediate booking failed AND scheduler error for attempt {attempt_data['id']}: {str(scheduler_error)}", exc_info=True)
-                    BookingAttempt.update_status(attempt_data["id"], 'failed', full_error)
-                    return jsonify({
-                        'status': 'error',
-                        'message': f'Immediate booking failed and failed to schedule future attempt: {str(scheduler_error)}'
-                    }), 500
+                    'status': 'error',
+                    'message': 'Failed to queue booking'
+                }), 500
+            BookingAttempt.update_status(attempt_data["id"], 'queued')
+            logger.info(f"SCHEDULE_BOOKING: Attempt {attempt_data['id']} - Queued as job {job_id} for {email}")
+            return jsonify({
+                'status': 'queued',
+                'attempt_id': attempt_data["id"],
+                'message': 'Booking queued'
+            })
         
-        # This part is now only reached if days_difference > 7
-        logger.info(f"Booking date is > 7 days away ({days_difference} days). Scheduling job.")
-        job_id = f'booking_{attempt_data["id"]}_{booking_time.strftime("%Y%m%d_%H%M")}'
+        # This part is now only reached if the slot has not been released yet
+        logger.info(f"Slot is released at {release_at.isoformat()}. Scheduling job chain.")
         try:
-            scheduler.add_job(
-                func='scheduler:booking_job',  # Use string reference to function
-                trigger='date',
-                run_date=booking_time,
-                args=[attempt_data["id"]],
-                id=job_id,
-                replace_existing=True
-            )
-            logger.info(f"SCHEDULE_BOOKING: Attempt {attempt_data['id']} - Successfully scheduled future booking job {job_id}.")
+            job_ids = schedule_booking_chain(attempt_data["id"], court_name, booking_time)
+            logger.info(f"SCHEDULE_BOOKING: Attempt {attempt_data['id']} - Successfully scheduled future booking jobs {job_ids}.")
             # Ensure attempt status is 'scheduled'
             BookingAttempt.update_status(attempt_data["id"], 'scheduled') 
             return jsonify({
                 'status': 'scheduled',
+                'attempt_id': attempt_data["id"],
                 'message': 'Booking successfully scheduled for the future.' # Provide specific message
                 })
         except Exception as scheduler_error:
@@ -397,6 +408,134 @@ def schedule_booking():
             'message': str(e)
         }), 500
 
+@app.route('/booking-status/<int:attempt_id>')
+def booking_status(attempt_id):
+    """Progress of a booking attempt, read from its booking_attempts row and queue jobs."""
+    try:
+        attempt = BookingAttempt.get_by_id(attempt_id)
+        if not attempt:
+            return jsonify({
+                'status': 'error',
+                'message': f'Booking attempt {attempt_id} not found'
+            }), 404
+
+        jobs = booking_queue.jobs_for_attempt(attempt_id)
+        queued_job = next((job for job in jobs if job['status'] == 'queued'), None)
+        return jsonify({
+            'status': 'success',
+            'attempt': {
+                'id': attempt_id,
+                'status': attempt.get('status'),
+                'error_message': attempt.get('error_message'),
+                'court_name': attempt.get('court_name'),
+                'booking_time': attempt.get('booking_time'),
+                'timeline': attempt.get('timeline'),
+                'tries': attempt.get('tries'),
+            },
+            'jobs': jobs,
+            'queue_position': booking_queue.position(queued_job['id']) if queued_job else None
+        })
+    except Exception as e:
+        logger.error(f"Error in booking_status endpoint: {str(e)}", exc_info=True)
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 500
+
+@app.route('/metrics')
+def metrics():
+    """Browser admission queue, pool state, resource profile averages, rec.us clock estimate, deep-link navigation, availability cache, in-flight scrape, prefetch and slot watch counters of this worker process."""
+    return jsonify({
+        'pid': os.getpid(),
+        'admission': admission_controller.metrics(),
+        'browser_pool': browser_pool.stats(),
+        'resource_profiles': ResourceStats.totals(),
+        'clock': clock_sync.stats(),
+        'deep_link': deep_link_navigator.stats(),
+        'availability_cache': availability_cache.stats(),
+        'single_flight': single_flight.stats(),
+        'prefetch': availability_prefetcher.stats(),
+        'slot_watcher': slot_watcher.stats()
+    })
+
+@app.route('/slot-watches', methods=['GET', 'POST'])
+def slot_watches():
+    """
+    Lists the active slot watches, or adds one: {court_name, date, earliest_time?, latest_time?, auto_book?}.
+    Only the soonest SLOT_WATCH_MAX_DATES watched dates are watched at a time; every watch carries
+    'served' to say whether its date is one of them.
+    """
+    today = datetime.now(ZoneInfo("America/Los_Angeles")).strftime('%Y-%m-%d')
+    if request.method == 'GET':
+        return jsonify({'status': 'success', 'watches': with_served(SlotWatch.get_active(), today)})
+
+    try:
+        data = request.get_json(silent=True) or {}
+        court_name = data.get('court_name')
+        date_str = data.get('date')
+        earliest_time = data.get('earliest_time') or '00:00'
+        latest_time = data.get('latest_time') or '23:59'
+        if not court_name or not date_str:
+            return jsonify({'status': 'error', 'message': 'Court name and date are required'}), 400
+        datetime.strptime(date_str, '%Y-%m-%d')
+        if date_str < today:
+            return jsonify({'status': 'error', 'message': 'Cannot watch a past date'}), 400
+        for value in (earliest_time, latest_time):
+            if not re.fullmatch(r'\d{2}:\d{2}', value):
+                return jsonify({'status': 'error', 'message': 'Times must be HH:MM'}), 400
+
+        user_info = UserInformation.get_latest()
+        if not user_info or not user_info.get('rec_account_email'):
+            return jsonify({
+                'status': 'error',
+                'message': 'User information not found or incomplete. Please ensure settings are saved.'
+            }), 400
+
+        watch = SlotWatch.create(user_info['rec_account_email'], court_name, date_str,
+                                 earliest_time, latest_time, bool(data.get('auto_book')))
+        if not watch:
+            return jsonify({'status': 'error', 'message': 'Failed to create slot watch'}), 500
+        watch = next((active for active in with_served(SlotWatch.get_active(from_date=today), today)
+                      if active['id'] == watch['id']), {**watch, 'served': False})
+        response = {'status': 'success', 'watch': watch}
+        if watch['served']:
+            # Pick the new watch up now instead of at the next periodic sync
+            scheduler_leader.add_job(id='sync_slot_watches_now', func='slot_watcher:sync_slot_watches', replace_existing=True)
+        elif not SLOT_WATCH_ENABLED:
+            response['message'] = 'Watch mode is disabled; this watch will not be served'
+        else:
+            response['message'] = (f"Watch mode covers the {SLOT_WATCH_MAX_DATES} soonest watched date(s); "
+                                    f"this watch starts once an earlier date is no longer watched")
+        return jsonify(response)
+    except ValueError as e:
+        return jsonify({'status': 'error', 'message': f"Invalid date: {str(e)}"}), 400
+    except Exception as e:
+        logger.error(f"[slot_watches] Error creating slot watch: {str(e)}", exc_info=True)
+        return jsonify({'status': 'error', 'message': str(e)}), 500
+
+@app.route('/slot-watches/<int:watch_id>', methods=['DELETE'])
+def cancel_slot_watch(watch_id):
+    watch = SlotWatch.update_status(watch_id, 'cancelled')
+    if not watch:
+        return jsonify({'status': 'error', 'message': 'Slot watch not found'}), 404
+    return jsonify({'status': 'success', 'watch': watch})
+
+@app.route('/slot-events')
+def slot_events():
+    """
+    Server-sent stream of slot_added / slot_removed events from watch mode.
+    Each open stream holds a worker thread, so at most SLOT_EVENT_MAX_STREAMS
+    are served per process; beyond that the client gets a 503 and retries later.
+    """
+    if not open_stream():
+        return jsonify({'status': 'error', 'message': 'Too many open event streams'}), 503, {'Retry-After': '60'}
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('after')
+    last_id = int(last_event_id) if last_event_id and last_event_id.isdigit() else None
+    response = Response(stream_with_context(stream_slot_events(last_id)), mimetype='text/event-stream',
+                        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+    response.call_on_close(close_stream)
+    return response
+
 @app.route('/get-available-times', methods=['POST'])
 def get_available_times():
     try:
@@ -434,20 +573,30 @@ def get_available_times():
             logger.debug("[get_available_times] Initializing TennisBooker with dummy credentials for scraping...")
             # Use dummy values, as get_available_times likely doesn't need login
             booker = TennisBooker(email="dummy@example.com", password="dummypass") 
+            availability_prefetcher.record_demand(court_name, date_str)
 
-            # Get available times
-            logger.debug(f"[get_available_times] Calling booker.get_available_times for {court_name}, {date_str}...")
+            # Get available times from the host-wide availability store (stale entries are served while they refresh)
+            logger.debug(f"[get_available_times] Looking up {court_name}, {date_str} in the availability cache...")
             try:
-                available_times = booker.get_available_times(court_name, date_str)
-                logger.info(f"[get_available_times] Scraper returned {len(available_times)} times: {available_times}")
+                available_times, snapshot_age, cache_state = availability_cache.get(
+                    court_name, date_str, booker.get_availability_snapshot)
+                logger.info(f"[get_available_times] {cache_state} ({snapshot_age:.0f}s old): {len(available_times)} times: {available_times}")
 
                 response_data = {
                     'status': 'success',
                     'times': available_times,
-                    'is_scraped': True
+                    'is_scraped': True,
+                    'snapshot_age_seconds': round(snapshot_age, 1),
+                    'cache': cache_state
                 }
                 logger.debug(f"[get_available_times] Sending response: {response_data}")
                 return jsonify(response_data)
+            except AdmissionRejected as busy_error:
+                logger.warning(f"[get_available_times] Rejected: {str(busy_error)}")
+                return jsonify({
+                    'status': 'error',
+                    'message': 'Availability lookups are busy right now. Please try again in a moment.'
+                }), 503
             except Exception as scraper_error:
                  logger.error(f"[get_available_times] Error during scraping: {str(scraper_error)}", exc_info=True)
                  # Return error but indicate it was a scraping issue
@@ -482,6 +631,50 @@ def get_available_times():
             'message': f"An error occurred: {str(e)}" # Provide error details
         }), 500
 
+@app.route('/get-availability-range', methods=['POST'])
+def get_availability_range():
+    """Availability for every court over a date range (defaults to the 7-day booking window)."""
+    try:
+        data = request.get_json(silent=True) or {}
+        start_date = data.get('start_date')
+        end_date = data.get('end_date')
+        court_name = data.get('court_name')
+
+        if start_date and end_date:
+            dates = date_range(start_date, end_date)
+            if not dates or len(dates) > 31:
+                return jsonify({
+                    'status': 'error',
+                    'message': 'Date range must cover between 1 and 31 days'
+                }), 400
+        else:
+            dates = booking_window_dates()
+
+        logger.info(f"[get_availability_range] Scanning {len(dates)} date(s): {dates[0]} to {dates[-1]}")
+        availability = scan_availability(dates)
+        if court_name:
+            availability = {date_str: {court_name: courts.get(court_name, [])} for date_str, courts in availability.items()}
+
+        return jsonify({
+            'status': 'success',
+            'availability': availability,
+            'is_scraped': True
+        })
+    except ValueError as e:
+        return jsonify({'status': 'error', 'message': f"Invalid date: {str(e)}"}), 400
+    except AdmissionRejected as e:
+        logger.warning(f"[get_availability_range] Rejected: {str(e)}")
+        return jsonify({
+            'status': 'error',
+            'message': 'Availability lookups are busy right now. Please try again in a moment.'
+        }), 503
+    except Exception as e:
+        logger.error(f"[get_availability_range] Error scanning availability: {str(e)}", exc_info=True)
+        return jsonify({
+            'status': 'error',
+            'message': f"An error occurred: {str(e)}"
+        }), 500
+
 @app.route('/get-available-times-for-preferences', methods=['POST'])
 def get_available_times_for_preferences():
     try:
@@ -512,20 +705,30 @@ def get_available_times_for_preferences():
         # Initialize TennisBooker with credentials
         booker = TennisBooker(user_info['rec_account_email'], user_info['rec_account_password'])
         
-        # Get available times
+        # Get available times from the shared availability store (scraped only on a miss)
+        availability_prefetcher.record_demand(court_name, tomorrow_str)
         logger.info(f"Getting available times for preferences: {court_name} on {tomorrow_str}")
-        available_times = booker.get_available_times(court_name, tomorrow_str)
+        available_times, snapshot_age, cache_state = availability_cache.get(
+            court_name, tomorrow_str, booker.get_availability_snapshot)
         
         if not available_times:
             logger.warning(f"No available times found for {court_name} on {tomorrow_str}")
             
-        logger.info(f"Found {len(available_times)} available times")
+        logger.info(f"Found {len(available_times)} available times ({cache_state}, {snapshot_age:.0f}s old)")
         return jsonify({
             'status': 'success',
             'times': available_times,
-            'date': tomorrow_str
+            'date': tomorrow_str,
+            'snapshot_age_seconds': round(snapshot_age, 1),
+            'cache': cache_state
         })
             
+    except AdmissionRejected as e:
+        logger.warning(f"Availability for preferences rejected: {str(e)}")
+        return jsonify({
+            'status': 'error',
+            'message': 'Availability lookups are busy right now. Please try again in a moment.'
+        }), 503
     except Exception as e:
         logger.error(f"Error getting available times for preferences: {str(e)}")
         return jsonify({
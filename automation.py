@@ -9,15 +9,134 @@ from selenium.webdriver.chrome.options import Options
 from bs4 import BeautifulSoup
 from playwright_stealth import stealth_sync
 from playwright.sync_api import sync_playwright
+from browser_pool import browser_pool
+from admission import AdmissionRejected
+from session_cache import session_cache
+from recus_navigator import deep_link_navigator
+from availability_parser import parse_availability_snapshot
+from verification_broker import wait_for_verification_code, VERIFICATION_CODE_TIMEOUT_SECONDS
+from release_launcher import BookingTimeline, PRESTAGE_LEAD_SECONDS, sleep_until
+from clock_sync import clock_sync
+from retry_policy import RetryPolicy, classify_error, default_retry_policy, try_record
+from singleflight import single_flight
+import os
 import requests
 import logging
-from typing import List
+from typing import Callable, Dict, List, Optional, Tuple
 import time
 import pytz
 from datetime import datetime, timedelta
 
 logger = logging.getLogger(__name__)
 
+REC_US_ORG_URL = "https://www.rec.us/organizations/san-francisco-rec-park"
+MONTH_CAPTION_SELECTOR = 'div[role="presentation"][id^="react-day-picker-"]'
+
+# --- Step Timeouts ---
+# Upper bound (ms) for each step of the rec.us flow. Steps return as soon as
+# their readiness signal fires; these only cap how long we wait for it.
+STEP_TIMEOUTS_MS = {
+    "page_load": 15000,
+    "open_calendar": 5000,
+    "month_change": 3000,
+    "day_listing": 10000,
+    "slot_selected": 3000,
+    "login": 5000,
+    "login_submit": 10000,
+    "participant": 5000,
+    "checkout": 5000,
+    "code_input": 5000,
+    "confirm": 10000,
+}
+# The court listing counts as loaded once the DOM has been quiet this long
+DOM_SETTLE_QUIET_MS = 300
+# --- End Step Timeouts ---
+
+# --- Watch Mode Configuration ---
+# A watched listing is refetched this often
+SLOT_WATCH_REFRESH_SECONDS = float(os.getenv("SLOT_WATCH_REFRESH_SECONDS", "15"))
+# A watch holds its pooled browser (and admission slot) at most this long per
+# session, then hands it to waiting scrapes until the next refresh
+SLOT_WATCH_SESSION_SECONDS = float(os.getenv("SLOT_WATCH_SESSION_SECONDS", "20"))
+# --- End Watch Mode Configuration ---
+
+MONTH_CHANGED_SCRIPT = """
+(previous) => {
+    const caption = document.querySelector('div[role="presentation"][id^="react-day-picker-"]');
+    return caption !== null && caption.textContent.trim() !== previous;
+}
+"""
+
+# Arms a MutationObserver that sets window.__recDomSettled once the court
+# listing has changed and then stayed quiet for the given number of
+# milliseconds. Unrelated mutations (e.g. the date button label) are ignored.
+ARM_DOM_SETTLE_SCRIPT = """
+(quietMs) => {
+    const CONTAINER = 'div.rounded-xl.border.border-gray-200.p-3';
+    const touchesListing = (mutation) => {
+        const target = mutation.target.nodeType === 1 ? mutation.target : mutation.target.parentElement;
+        if (target && (target.closest(CONTAINER) || target.querySelector(CONTAINER))) return true;
+        for (const node of [...mutation.addedNodes, ...mutation.removedNodes]) {
+            if (node.nodeType === 1 && (node.matches(CONTAINER) || node.querySelector(CONTAINER))) return true;
+        }
+        return false;
+    };
+    if (window.__recDomObserver) window.__recDomObserver.disconnect();
+    window.__recDomSettled = false;
+    let listingChanged = false;
+    let timer = null;
+    window.__recDomObserver = new MutationObserver((mutations) => {
+        if (!listingChanged && !mutations.some(touchesListing)) return;
+        listingChanged = true;
+        clearTimeout(timer);
+        timer = setTimeout(() => {
+            window.__recDomSettled = true;
+            window.__recDomObserver.disconnect();
+        }, quietMs);
+    });
+    window.__recDomObserver.observe(document.body, {childList: true, subtree: true, characterData: true});
+}
+"""
+
+
+# Arms a MutationObserver that bumps window.__recListingVersion whenever the
+# court listing changes, for watch mode. Stays connected until the page closes.
+WATCH_LISTING_SCRIPT = """
+() => {
+    const CONTAINER = 'div.rounded-xl.border.border-gray-200.p-3';
+    const touchesListing = (mutation) => {
+        const target = mutation.target.nodeType === 1 ? mutation.target : mutation.target.parentElement;
+        if (target && (target.closest(CONTAINER) || target.querySelector(CONTAINER))) return true;
+        for (const node of [...mutation.addedNodes, ...mutation.removedNodes]) {
+            if (node.nodeType === 1 && (node.matches(CONTAINER) || node.querySelector(CONTAINER))) return true;
+        }
+        return false;
+    };
+    if (window.__recWatchObserver) window.__recWatchObserver.disconnect();
+    window.__recListingVersion = 0;
+    window.__recWatchObserver = new MutationObserver((mutations) => {
+        if (mutations.some(touchesListing)) window.__recListingVersion += 1;
+    });
+    window.__recWatchObserver.observe(document.body, {childList: true, subtree: true, characterData: true});
+}
+"""
+
+
+def _arm_dom_settle(page):
+    page.evaluate(ARM_DOM_SETTLE_SCRIPT, DOM_SETTLE_QUIET_MS)
+
+
+def _wait_for_dom_settle(page, timeout_ms: int):
+    """Waits for the mutations triggered since _arm_dom_settle to die down."""
+    try:
+        page.wait_for_function("() => window.__recDomSettled === true", timeout=timeout_ms)
+    except Exception:
+        # Nothing re-rendered (e.g. the listing already showed this date); fine as long as it is there
+        if page.locator('div.rounded-xl.border.border-gray-200.p-3').count() == 0:
+            raise
+        logger.debug("No DOM changes after day click; using the listing already on the page")
+
+
 class TennisBooker:
     def __init__(self, email: str, password: str, user_id: str = None):
         self.email = email
@@ -39,27 +158,35 @@ class TennisBooker:
 
     def get_available_courts(self) -> List[str]:
         """Scrapes and returns a list of all available tennis courts."""
-        with sync_playwright() as playwright:
-            browser = playwright.chromium.launch()
-            context = browser.new_context(java_script_enabled = True)
-            # stealth_sync(context)
-            page = context.new_page()
+        return browser_pool.run(self._get_available_courts, profile="scrape")
 
-            page.goto("https://www.rec.us/organizations/san-francisco-rec-park", wait_until="networkidle")
-            page.wait_for_selector("a.no-underline.hover\\:underline", state="attached")
-            html = page.content()
-            soup = BeautifulSoup(html, "html.parser")
+    def _get_available_courts(self, context) -> List[str]:
+        # stealth_sync(context)
+        page = context.new_page()
 
-            # with open("testfile.html", "w") as file:
-            #     file.write(json.dumps(soup))
+        page.goto(REC_US_ORG_URL, wait_until="networkidle")
+        page.wait_for_selector("a.no-underline.hover\\:underline", state="attached")
+        html = page.content()
+        soup = BeautifulSoup(html, "html.parser")
 
-            court_elements = soup.select("a.no-underline.hover\\:underline p.text-\\[1rem\\].font-medium")
+        # with open("testfile.html", "w") as file:
+        #     file.write(json.dumps(soup))
 
-            # Extract text from each <p> element
-            court_names = [elem.get_text(strip=True) for elem in court_elements]
-            return court_names
+        court_elements = soup.select("a.no-underline.hover\\:underline p.text-\\[1rem\\].font-medium")
 
-    def book_court(self, court_name: str, booking_time, playtime_duration: int = 60) -> tuple[bool, str]:
+        # Extract text from each <p> element
+        court_names = [elem.get_text(strip=True) for elem in court_elements]
+        return court_names
+
+    def book_court(self, court_name: str, booking_time, playtime_duration: int = 60,
+                   release_at: Optional[datetime] = None, tries: Optional[list] = None) -> tuple[bool, str]:
+        """
+        Books court_name at booking_time in a pooled browser. Within the retry
+        policy's window after release_at (rec.us's clock, corrected by the
+        clock_sync offset), a slot that is not listed yet (or a selector
+        timeout) is retried in the same session; every try is appended to
+        `tries`.
+        """
         # Validate playtime duration
         if playtime_duration not in [60, 90]:
             logger.warning(f"Invalid playtime duration: {playtime_duration}, defaulting to 60")
@@ -67,258 +194,541 @@ class TennisBooker:
         
         logger.info(f"Starting booking process for court: {court_name}, time: {booking_time}, duration: {playtime_duration}")
         
-        # Format target date
-        target_date = booking_time
-        # Use str(day) to avoid leading zero (e.g., '8' instead of '08') for matching button text
-        target_day = str(target_date.day)
-        target_month = target_date.strftime("%B")
-        target_year = target_date.strftime("%Y")
+        storage_state = session_cache.load(self.email)
+        context_options = {"storage_state": storage_state} if storage_state else None
+        if storage_state:
+            logger.info(f"Using cached rec.us session for {self.email}")
+
+        try:
+            return browser_pool.run(self._book_court, court_name, booking_time, storage_state is not None,
+                                    clock_sync.to_local(release_at.timestamp()) if release_at else None,
+                                    tries if tries is not None else [],
+                                    context_options=context_options, profile="book")
+        except Exception as e:
+            error_msg = f"Booking failed with exception: {str(e)}"
+            logger.error(error_msg)
+            return False, error_msg
+
+    def _book_court(self, context, court_name: str, booking_time, using_cached_session: bool = False,
+                    release_at: Optional[float] = None, tries: Optional[list] = None) -> tuple[bool, str]:
+        logger.info(f"Target date: {booking_time.strftime('%B %-d, %Y')}, time: {booking_time.strftime('%-I:%M')}")
         
+        page = context.new_page()
+
+        try:
+            self._open_listing(page, booking_time)
+
+            slot_error = self._select_slot_with_retry(page, court_name, booking_time,
+                                                      default_retry_policy.deadline(release_at),
+                                                      tries if tries is not None else [])
+            if slot_error:
+                return False, slot_error
+            return self._checkout(page, using_cached_session)
+
+        except Exception as e:
+            error_msg = f"Booking failed with exception: {str(e)}"
+            logger.error(error_msg)
+            return False, error_msg
+
+    def _select_slot_with_retry(self, page, court_name: str, booking_time, deadline: Optional[float],
+                                tries: list, policy: RetryPolicy = default_retry_policy) -> Optional[str]:
+        """
+        _select_slot, retried with jittered delays until `deadline` (epoch
+        seconds; None means a single try) while the error is retryable. Between
+        tries only the court listing is refetched (calendar re-select, no page
+        reload). Each try is appended to `tries`. Returns the last error or None.
+        """
+        delays = policy.delays()
+        first_try = True
+        while True:
+            started = time.time()
+            try:
+                if not first_try:
+                    self._select_date(page, booking_time)
+                first_try = False
+                error = self._select_slot(page, court_name, booking_time)
+            except Exception as e:
+                error = f"Slot selection failed: {str(e)}"
+            tries.append(try_record(len(tries) + 1, started, time.time() - started, error))
+            if error is None:
+                return None
+            delay = next(delays, None)
+            if (deadline is None or delay is None or classify_error(error) == "terminal"
+                    or time.time() + delay > deadline):
+                return error
+            logger.info(f"Try {len(tries)} failed ({error}); retrying in {delay:.2f}s")
+            page.wait_for_timeout(delay * 1000)
+
+    def _select_slot(self, page, court_name: str, booking_time) -> Optional[str]:
+        """
+        Clicks the court's slot for booking_time in the displayed listing and then
+        the Book button. Returns an error message, or None on success.
+        """
         # Extract time for direct matching - exactly like test.py does
-        target_time_primary = target_date.strftime("%-I:%M")  # Format like "7:30" without leading zero
+        target_time_primary = booking_time.strftime("%-I:%M")  # Format like "7:30" without leading zero
         target_time_alternate = None  # Could add an alternate time option if needed
+
+        # Find and click time slot
+        target_time_clicked = False
+        page.wait_for_selector('div.rounded-xl.border.border-gray-200.p-3', state="visible", timeout=STEP_TIMEOUTS_MS["day_listing"])
         
-        logger.info(f"Target date: {target_month} {target_day}, {target_year}, time: {target_time_primary}")
+        court_containers = page.query_selector_all('div.rounded-xl.border.border-gray-200.p-3')
         
-        with sync_playwright() as playwright:
-            browser = playwright.chromium.launch(headless=True)
-            context = browser.new_context(java_script_enabled=True)
-            page = context.new_page()
-
-            try:
-                # Initial page load
-                logger.debug("Loading initial page")
-                page.goto("https://www.rec.us/organizations/san-francisco-rec-park", wait_until="networkidle")
-                page.wait_for_selector("a.no-underline.hover\\:underline", state="attached", timeout=3000)
-                
-                # Click initial button
-                logger.debug("Looking for initial booking button")
-                button = page.wait_for_selector('button.rounded-2xl.border.border-gray-200.px-4.py-1.hover\\:border-black.bg-gray-200', 
-                                             state="visible", timeout=3000)
-                if button:
-                    button.click()
-
-                # Calendar navigation
-                page.wait_for_selector('.rdp', state="visible", timeout=3000)
-                
-                logger.debug(f"Navigating to month: {target_month} {target_year}")
-                while True:
-                    current_month_element = page.locator('div[role="presentation"][id^="react-day-picker-"]')
-                    current_month_text = current_month_element.text_content()
-                    current_month, current_year = current_month_text.strip().split()
-                    
-                    if current_month == target_month and current_year == target_year:
-                        break
-                        
-                    logger.debug("Clicking next month button")
-                    next_month_button = page.locator('button[name="next-month"]')
-                    next_month_button.click()
-                    page.wait_for_timeout(200)
-
-                # Click target day
-                day_button = page.locator(f'button[name="day"]:has-text("{target_day}"):not(.day-outside):not(.opacity-50)').first
-                day_button.click()
-                page.wait_for_timeout(1000)
-
-                # Find and click time slot
-                target_time_clicked = False
-                page.wait_for_selector('div.rounded-xl.border.border-gray-200.p-3', state="visible", timeout=3000)
+        # Save HTML for debugging
+        # page.screenshot(path="debug_court_listing.png")
+        
+        for container in court_containers:
+            court_name_elem = container.query_selector('p.text-\\[1rem\\].font-medium.text-black.md\\:text-\\[1\\.125rem\\].mb-1')
+            sport_elem = container.query_selector('p.text-\\[0\\.875rem\\].font-medium.text-black.md\\:text-\\[1rem\\].mb-2')
+            
+            if not court_name_elem or not sport_elem:
+                continue
+            
+            current_court = court_name_elem.text_content()
+            sport_type = sport_elem.text_content()
+            
+            # Check if this is our target court
+            if court_name in current_court and "Tennis" in sport_type:
                 
-                court_containers = page.query_selector_all('div.rounded-xl.border.border-gray-200.p-3')
+                time_slots = container.query_selector_all('div.swiper-slide p.text-\\[0\\.875rem\\].font-medium')
+                available_times = [slot.text_content() for slot in time_slots]
                 
-                # Save HTML for debugging
-                # page.screenshot(path="debug_court_listing.png")
+                # Try to find and click our target time
+                for i, time_text in enumerate(available_times):
+                    if target_time_primary in time_text:
+                        swiper_slides = container.query_selector_all('div.swiper-slide')
+                        if i < len(swiper_slides):
+                            logger.debug(f"Clicking time slot {i}")
+                            swiper_slides[i].click()
+                            target_time_clicked = True
+                            break
                 
-                for container in court_containers:
-                    court_name_elem = container.query_selector('p.text-\\[1rem\\].font-medium.text-black.md\\:text-\\[1\\.125rem\\].mb-1')
-                    sport_elem = container.query_selector('p.text-\\[0\\.875rem\\].font-medium.text-black.md\\:text-\\[1rem\\].mb-2')
-                    
-                    if not court_name_elem or not sport_elem:
-                        continue
-                    
-                    current_court = court_name_elem.text_content()
-                    sport_type = sport_elem.text_content()
-                    
-                    # Check if this is our target court
-                    if court_name in current_court and "Tennis" in sport_type:
-                        
-                        time_slots = container.query_selector_all('div.swiper-slide p.text-\\[0\\.875rem\\].font-medium')
-                        available_times = [slot.text_content() for slot in time_slots]
-                        
-                        # Try to find and click our target time
-                        for i, time_text in enumerate(available_times):
-                            if target_time_primary in time_text:
-                                swiper_slides = container.query_selector_all('div.swiper-slide')
-                                if i < len(swiper_slides):
-                                    logger.debug(f"Clicking time slot {i}")
-                                    swiper_slides[i].click()
-                                    target_time_clicked = True
-                                    break
-                        
-                        # If we have an alternate time and primary wasn't found
-                        if not target_time_clicked and target_time_alternate:
-                            for i, time_text in enumerate(available_times):
-                                if target_time_alternate in time_text:
-                                    logger.debug(f"Found alternate time: {time_text}")
-                                    swiper_slides = container.query_selector_all('div.swiper-slide')
-                                    if i < len(swiper_slides):
-                                        logger.debug(f"Clicking alternate time slot {i}")
-                                        swiper_slides[i].click()
-                                        target_time_clicked = True
-                                        break
-                        
-                        break
-
-                if not target_time_clicked:
-                    return False, f"No matching time slot found for {target_time_primary}"
-
-                # Book button
-                book_button = page.wait_for_selector('button.bg-\\[\\#26E164\\]:has-text("Book")', state="visible", timeout=2000)
-                if book_button:
-                    book_button.click()
-                    page.wait_for_timeout(1000)
-                else:
-                    return False, "Book button not found"
-                
-                # Login process
-                login_button = page.wait_for_selector('button.font-bold.text-brand-neutral:has-text("Log In")', state="visible", timeout=2000)
-                if login_button:
-                    login_button.click()
-                    page.wait_for_timeout(1000)
-                else:
-                    # page.screenshot(path="debug_no_login_button.png")
-                    return False, "Login button not found"
+                # If we have an alternate time and primary wasn't found
+                if not target_time_clicked and target_time_alternate:
+                    for i, time_text in enumerate(available_times):
+                        if target_time_alternate in time_text:
+                            logger.debug(f"Found alternate time: {time_text}")
+                            swiper_slides = container.query_selector_all('div.swiper-slide')
+                            if i < len(swiper_slides):
+                                logger.debug(f"Clicking alternate time slot {i}")
+                                swiper_slides[i].click()
+                                target_time_clicked = True
+                                break
                 
-                # Fill login form
-                email_input = page.wait_for_selector('input#email', state="visible", timeout=2000)
-                password_input = page.wait_for_selector('input#password', state="visible", timeout=2000)
+                break
+
+        if not target_time_clicked:
+            return f"No matching time slot found for {target_time_primary}"
+
+        # Book button
+        book_button = page.wait_for_selector('button.bg-\\[\\#26E164\\]:has-text("Book")', state="visible", timeout=STEP_TIMEOUTS_MS["slot_selected"])
+        if book_button:
+            book_button.click()
+        else:
+            return "Book button not found"
+        return None
+
+    def _checkout(self, page, using_cached_session: bool = False) -> tuple[bool, str]:
+        """
+        Completes a booking after Book was clicked: login (unless the cached
+        session is accepted), participant, second Book, SMS code and Confirm.
+        """
+        try:
+            # Login process (skipped when rec.us still accepts the cached session)
+            capture_session = True
+            if using_cached_session and self._session_accepted(page):
+                logger.info("Cached rec.us session accepted; skipping login")
+                capture_session = False
+            else:
+                if using_cached_session:
+                    logger.info("Cached rec.us session was rejected; falling back to full login")
+                    session_cache.invalidate(self.email)
+                login_error = self._login(page)
+                if login_error:
+                    return False, login_error
+            
+            # Select participant
+            try:
+                participant_selector = page.wait_for_selector('button[id^="headlessui-listbox-button"]', 
+                                                          state="visible", 
+                                                          timeout=STEP_TIMEOUTS_MS["participant"])
                 
-                if email_input and password_input:
-                    email_input.fill(self.email)
-                    password_input.fill(self.password)
-                    
-                    # Submit login
-                    submit_button = page.wait_for_selector('button[type="submit"]', state="visible", timeout=2000)
-                    if submit_button:
-                        submit_button.click()
-                        page.wait_for_timeout(2000)
+                if participant_selector:
+                    if capture_session:
+                        # The checkout form only renders once rec.us accepted the login
+                        self._capture_session(page)
+                    participant_selector.click()
+                    account_owner = page.wait_for_selector('div.flex.w-full.items-center:has(small:has-text("Account Owner"))', 
+                                                        state="visible", 
+                                                        timeout=STEP_TIMEOUTS_MS["participant"])
+                    if account_owner:
+                        account_owner.click()
                     else:
-                        logger.error("Submit button not found")
-                        return False, "Submit button not found"
+                        logger.error("Account Owner option not found")
+                        try:
+                            alt_account_owner = page.wait_for_selector('div.flex.items-center:has-text("Account Owner")', 
+                                                                   state="visible", 
+                                                                   timeout=STEP_TIMEOUTS_MS["participant"])
+                            if alt_account_owner:
+                                alt_account_owner.click()
+                            else:
+                                return False, "Account Owner option not found (both selectors)"
+                        except Exception as e:
+                            logger.error(f"Alternative account owner selector failed: {str(e)}")
+                            return False, "Account Owner option not found"
                 else:
-                    logger.error("Email or password input not found")
-                    return False, "Email or password input not found"
-                
-                # Select participant
-                try:
-                    participant_selector = page.wait_for_selector('button[id^="headlessui-listbox-button"]', 
-                                                              state="visible", 
-                                                              timeout=5000)
+                    logger.error("Participant selector not found even with increased timeout")
+                    return False, "Participant selector not found"
                     
-                    if participant_selector:
-                        participant_selector.click()
-                        page.wait_for_timeout(1000)  # Increased wait time after click
-                        account_owner = page.wait_for_selector('div.flex.w-full.items-center:has(small:has-text("Account Owner"))', 
-                                                            state="visible", 
-                                                            timeout=3000)
-                        if account_owner:
-                            account_owner.click()
-                            page.wait_for_timeout(1000)  # Increased wait time
-                        else:
-                            logger.error("Account Owner option not found")
-                            try:
-                                alt_account_owner = page.wait_for_selector('div.flex.items-center:has-text("Account Owner")', 
-                                                                       state="visible", 
-                                                                       timeout=2000)
-                                if alt_account_owner:
-                                    alt_account_owner.click()
-                                    page.wait_for_timeout(1000)
-                                else:
-                                    return False, "Account Owner option not found (both selectors)"
-                            except Exception as e:
-                                logger.error(f"Alternative account owner selector failed: {str(e)}")
-                                return False, "Account Owner option not found"
-                    else:
-                        logger.error("Participant selector not found even with increased timeout")
-                        return False, "Participant selector not found"
-                        
-                except Exception as e:
-                    logger.error(f"Error during participant selection: {str(e)}")
-                
-                # Click Book button again
-                book_button = page.wait_for_selector('button.bg-\\[\\#26E164\\]:has-text("Book")', state="visible", timeout=2000)
-                if book_button:
-                    book_button.click()
-                    page.wait_for_timeout(1000)
-                else:
-                    # page.screenshot(path="debug_no_second_book_button.png")
-                    return False, "Second Book button not found"
-                
-                send_code_button = page.wait_for_selector('button[type="submit"]:has-text("Send Code")', 
-                                                     state="visible", timeout=2000)
-                if send_code_button:
-                    send_code_button.click()
-                    page.wait_for_timeout(1000)
-                else:
-                    logger.error("Send Code button not found")
-                    return False, "Send Code button not found"
-                
-                # Wait for code input
-                code_input = page.wait_for_selector('input#totp[name="totp"][type="number"]', 
-                                               state="visible", timeout=5000)
-                if code_input:
-                    # Poll for code
-                    max_attempts = 10
-                    verification_code = None
+            except Exception as e:
+                logger.error(f"Error during participant selection: {str(e)}")
+            
+            # Click Book button again
+            book_button = page.wait_for_selector('button.bg-\\[\\#26E164\\]:has-text("Book")', state="visible", timeout=STEP_TIMEOUTS_MS["checkout"])
+            if book_button:
+                book_button.click()
+            else:
+                # page.screenshot(path="debug_no_second_book_button.png")
+                return False, "Second Book button not found"
+            
+            send_code_button = page.wait_for_selector('button[type="submit"]:has-text("Send Code")', 
+                                                 state="visible", timeout=STEP_TIMEOUTS_MS["checkout"])
+            if send_code_button:
+                # Only codes sent after this click belong to this booking (small margin for clock skew)
+                code_requested_at = time.time() - 2
+                send_code_button.click()
+            else:
+                logger.error("Send Code button not found")
+                return False, "Send Code button not found"
+            
+            # Wait for code input
+            code_input = page.wait_for_selector('input#totp[name="totp"][type="number"]', 
+                                           state="visible", timeout=STEP_TIMEOUTS_MS["code_input"])
+            if code_input:
+                # Block until the SMS webhook publishes the code
+                logger.debug(f"Waiting for verification code, email: {self.email}")
+                wait_started = time.perf_counter()
+                verification_code = wait_for_verification_code(self.email, since=code_requested_at)
+                logger.info(f"Verification code wait took {time.perf_counter() - wait_started:.2f}s")
+
+                if verification_code:
+                    logger.debug(f"Filling code input with: {verification_code}")
+                    code_input.fill(verification_code)
                     
-                    logger.debug(f"Polling for verification code, user_id: {self.user_id}")
-                    for attempt in range(max_attempts):
+                    # Click Confirm button
+                    logger.debug("Looking for Confirm button")
+                    confirm_button = page.wait_for_selector('button[type="button"]:has-text("Confirm")', 
+                                                       state="visible", timeout=STEP_TIMEOUTS_MS["checkout"])
+                    if confirm_button:
+                        logger.debug("Clicking Confirm button")
+                        confirm_button.click()
+                        # The confirmation dialog closes once rec.us has accepted the code
                         try:
-                            logger.debug(f"Code polling attempt {attempt+1}/{max_attempts}")
-                            response = requests.get(f'http://localhost:8000/get_code?user_id={self.user_id}')
-                            if response.status_code == 200:
-                                data = response.json()
-                                logger.debug(f"Code poll response: {data}")
-                                if data.get('status') == 'available':
-                                    verification_code = data.get('code')
-                                    logger.debug(f"Verification code received: {verification_code}")
-                                    break
-                        except Exception as e:
-                            logger.error(f"Error checking for code: {str(e)}")
-                        
-                        time.sleep(1)
-                    
-                    if verification_code:
-                        logger.debug(f"Filling code input with: {verification_code}")
-                        code_input.fill(verification_code)
-                        
-                        # Click Confirm button
-                        logger.debug("Looking for Confirm button")
-                        confirm_button = page.wait_for_selector('button[type="button"]:has-text("Confirm")', 
-                                                           state="visible", timeout=2000)
-                        if confirm_button:
-                            logger.debug("Clicking Confirm button")
-                            confirm_button.click()
-                            page.wait_for_timeout(2000)
-                            logger.info("Court booked successfully")
-                            return True, "Court booked successfully"
-                        else:
-                            logger.error("Confirm button not found")
-                            # page.screenshot(path="debug_no_confirm_button.png")
-                            return False, "Confirm button not found"
+                            page.wait_for_selector('button[type="button"]:has-text("Confirm")', state="hidden", timeout=STEP_TIMEOUTS_MS["confirm"])
+                        except Exception:
+                            logger.warning("Confirm dialog still open after confirmation timeout")
+                        logger.info("Court booked successfully")
+                        return True, "Court booked successfully"
                     else:
-                        logger.error(f"No verification code received after {max_attempts} attempts")
-                        return False, f"No verification code received after {max_attempts} attempts"
+                        logger.error("Confirm button not found")
+                        # page.screenshot(path="debug_no_confirm_button.png")
+                        return False, "Confirm button not found"
                 else:
-                    logger.error("Code input field not found")
-                    return False, "Code input field not found"
-                
+                    logger.error(f"No verification code received within {VERIFICATION_CODE_TIMEOUT_SECONDS:.0f}s")
+                    return False, f"No verification code received within {VERIFICATION_CODE_TIMEOUT_SECONDS:.0f}s"
+            else:
+                logger.error("Code input field not found")
+                return False, "Code input field not found"
+            
+        except Exception as e:
+            error_msg = f"Booking failed with exception: {str(e)}"
+            logger.error(error_msg)
+            return False, error_msg
+
+    def book_court_prestaged(self, court_name: str, booking_time, release_at: datetime,
+                             playtime_duration: int = 60,
+                             tries: Optional[list] = None) -> Tuple[bool, str, BookingTimeline]:
+        """
+        Books a slot the moment it is released.
+
+        PRESTAGE_LEAD_SECONDS before release_at (timezone-aware), a pooled browser
+        opens the listing for the booking date and logs in, then holds. At
+        release_at it refreshes only the court listing, clicks the slot and
+        completes checkout. release_at is on rec.us's clock; the local fire time
+        is corrected by the clock_sync offset. Returns (success, message, timeline).
+        """
+        clock_sync.ensure_fresh()
+        timeline = BookingTimeline(release_at=clock_sync.to_local(release_at.timestamp()))
+        timeline.notes["clock_offset_ms"] = round(clock_sync.offset * 1000, 1)
+        logger.info(f"Pre-staged booking for {court_name} at {booking_time}, release {release_at.isoformat()} "
+                    f"(clock offset {timeline.notes['clock_offset_ms']:+.0f} ms)")
+
+        # Don't hold a browser longer than the lead time
+        sleep_until(timeline.release_at - PRESTAGE_LEAD_SECONDS)
+
+        storage_state = session_cache.load(self.email)
+        context_options = {"storage_state": storage_state} if storage_state else None
+        try:
+            success, message = browser_pool.run(self._book_court_prestaged, court_name, booking_time, timeline,
+                                                tries if tries is not None else [],
+                                                context_options=context_options, profile="book")
+        except Exception as e:
+            success, message = False, f"Booking failed with exception: {str(e)}"
+            logger.error(message)
+        timeline.outcome = "booked" if success else "failed"
+        clock_sync.record_fire(timeline.as_dict()["fire_error_ms"])
+        logger.info(f"Pre-staged booking timeline: {timeline.summary()}")
+        return success, message, timeline
+
+    def _book_court_prestaged(self, context, court_name: str, booking_time, timeline: BookingTimeline,
+                              tries: list) -> tuple[bool, str]:
+        page = context.new_page()
+        try:
+            # Stage: page loaded on the booking date and the account logged in
+            timeline.mark("stage_started")
+            timeline.notes["navigation"] = self._open_listing(page, booking_time)
+            logged_in = self._ensure_logged_in(page)
+            timeline.notes["logged_in_before_release"] = logged_in
+            timeline.mark("staged")
+            logger.info(f"Staged {(timeline.staged - timeline.stage_started):.2f}s; holding "
+                        f"{max(0.0, timeline.release_at - timeline.staged):.1f}s for release")
+
+            # Fire: refetch just the listing, then click as fast as possible
+            sleep_until(timeline.release_at, page)
+            timeline.mark("fired")
+            try:
+                self._select_date(page, booking_time)
             except Exception as e:
-                error_msg = f"Booking failed with exception: {str(e)}"
-                logger.error(error_msg)
-                return False, error_msg
-            finally:
-                browser.close()
+                logger.warning(f"Listing refresh at release failed ({str(e)}); reloading the page")
+                self._open_listing(page, booking_time)
+            slot_error = self._select_slot_with_retry(page, court_name, booking_time,
+                                                      default_retry_policy.deadline(timeline.release_at), tries)
+            if slot_error:
+                return False, slot_error
+            timeline.mark("clicked")
+
+            success, message = self._checkout(page, using_cached_session=logged_in)
+            if success:
+                timeline.mark("confirmed")
+            return success, message
+        except Exception as e:
+            error_msg = f"Booking failed with exception: {str(e)}"
+            logger.error(error_msg)
+            return False, error_msg
+
+    def _ensure_logged_in(self, page) -> bool:
+        """Logs in from the page header unless the current session already is. Returns whether it is logged in."""
+        header_login = 'button:has-text("Log In")'
+        if not page.locator(header_login).first.is_visible():
+            return True
+        login_error = self._login(page, header_login)
+        if login_error:
+            logger.warning(f"Could not log in before release ({login_error}); checkout will log in")
+            return False
+        if page.locator(header_login).first.is_visible():
+            return False
+        self._capture_session(page)
+        return True
+
+    def _open_listing(self, page, target_date: datetime) -> str:
+        """
+        Puts page on the court listing for target_date, through a deep link when
+        rec.us honours one and the calendar click path otherwise.
+        """
+        return deep_link_navigator.navigate(page, target_date, lambda: self._navigate_to_date(page, target_date))
+
+    def _navigate_to_date(self, page, target_date: datetime):
+        """
+        Loads the organization page, opens the calendar and selects target_date.
+
+        Every step waits on a readiness signal (selector, caption change or DOM
+        mutations settling) bounded by STEP_TIMEOUTS_MS instead of a fixed sleep.
+        Raises if any step cannot be completed.
+        """
+        page.goto(REC_US_ORG_URL, wait_until="networkidle", timeout=STEP_TIMEOUTS_MS["page_load"])
+        page.wait_for_selector("a.no-underline.hover\\:underline", state="attached", timeout=STEP_TIMEOUTS_MS["page_load"])
+        logger.debug("[TennisBooker._navigate_to_date] Initial page loaded.")
+        self._select_date(page, target_date)
+
+    def _select_date(self, page, target_date: datetime):
+        """
+        Picks target_date in the calendar of an already loaded organization page
+        and waits for the court listing to re-render. Only the listing is
+        refetched; the page itself is not reloaded.
+        """
+        # Use str(day) to avoid leading zero (e.g., '8' instead of '08')
+        target_day = str(target_date.day)
+        target_month = target_date.strftime("%B")  # Full month name
+        target_year = target_date.strftime("%Y")
+        logger.debug(f"[TennisBooker._select_date] Target date: Day={target_day}, Month={target_month}, Year={target_year}")
+
+        # Find and click the button with the specified classes
+        button_selector = 'button.rounded-2xl.border.border-gray-200.px-4.py-1.hover\\:border-black.bg-gray-200'
+        page.wait_for_selector(button_selector, state="visible", timeout=STEP_TIMEOUTS_MS["open_calendar"]).click()
+        page.wait_for_selector('.rdp', state="visible", timeout=STEP_TIMEOUTS_MS["open_calendar"])
+        logger.debug("[TennisBooker._select_date] Calendar visible. Navigating month...")
+
+        # Navigate to the correct month
+        for _ in range(12): # Limit attempts to prevent infinite loops
+            current_month_text = page.locator(MONTH_CAPTION_SELECTOR).text_content().strip()
+            current_month, current_year = current_month_text.split()
+            if current_month == target_month and current_year == target_year:
+                logger.debug(f"[TennisBooker._select_date] Target month found: {target_month} {target_year}")
+                break
+
+            page.locator('button[name="next-month"]').click()
+            # Wait for the caption to change rather than for a fixed delay
+            page.wait_for_function(MONTH_CHANGED_SCRIPT, arg=current_month_text, timeout=STEP_TIMEOUTS_MS["month_change"])
+        else:
+            raise RuntimeError(f"Failed to navigate to {target_month} {target_year} after 12 attempts")
+
+        _arm_dom_settle(page)
+        self._click_day(page, target_day)
+        _wait_for_dom_settle(page, STEP_TIMEOUTS_MS["day_listing"])
+
+    def _click_day(self, page, target_day: str):
+        """Clicks the calendar button for target_day in the displayed month."""
+        try:
+            # First try: Use the most specific selector for the active day in current month
+            specific_selector = f'button[name="day"]:has-text("{target_day}"):not(.day-outside):not(.opacity-50)'
+            page.locator(specific_selector).first.click(timeout=STEP_TIMEOUTS_MS["open_calendar"])
+            logger.debug(f"[TennisBooker._click_day] Clicked day {target_day} using primary selector.")
+            return
+        except Exception as e:
+            logger.warning(f"[TennisBooker._click_day] Primary day selector failed: {str(e)}. Trying alternatives...")
+
+        # Second try: Get all day buttons with the target day text and filter out the one from previous/next month
+        for button in page.locator(f'button[name="day"]:has-text("{target_day}")').all():
+            class_attr = button.get_attribute("class")
+            if class_attr and "day-outside" not in class_attr and "opacity-50" not in class_attr:
+                button.click()
+                logger.debug(f"[TennisBooker._click_day] Clicked day {target_day} using secondary selector.")
+                return
+
+        # Last resort: just click the nth button (careful, this is brittle)
+        logger.warning("[TennisBooker._click_day] Secondary day selector failed. Trying nth(1) fallback.")
+        page.locator(f'button[name="day"]:has-text("{target_day}")').nth(1).click(timeout=STEP_TIMEOUTS_MS["open_calendar"])
+
+    def refresh_session(self) -> bool:
+        """
+        Re-opens rec.us with this user's cached session so the site can renew its tokens,
+        then stores the renewed storage_state. Returns False if there was nothing to refresh
+        or rec.us no longer accepts the session.
+        """
+        storage_state = session_cache.load(self.email)
+        if not storage_state:
+            return False
+        try:
+            return browser_pool.run(self._refresh_session, context_options={"storage_state": storage_state}, profile="book")
+        except Exception as e:
+            logger.error(f"Session refresh failed for {self.email}: {str(e)}")
+            return False
+
+    def _refresh_session(self, context) -> bool:
+        page = context.new_page()
+        page.goto(REC_US_ORG_URL, wait_until="networkidle", timeout=STEP_TIMEOUTS_MS["page_load"])
+        page.wait_for_selector("a.no-underline.hover\\:underline", state="attached", timeout=STEP_TIMEOUTS_MS["page_load"])
+        # A visible "Log In" control means the site treated us as anonymous
+        if page.locator('button:has-text("Log In")').first.is_visible():
+            logger.info(f"Cached rec.us session for {self.email} is no longer accepted")
+            session_cache.invalidate(self.email)
+            return False
+        return self._capture_session(page)
+
+    def _capture_session(self, page) -> bool:
+        try:
+            return session_cache.save(self.email, page.context.storage_state())
+        except Exception as e:
+            logger.warning(f"Could not capture rec.us session for caching: {str(e)}")
+            return False
+
+    def _session_accepted(self, page) -> bool:
+        """After clicking Book, tells whether rec.us went straight to checkout (logged in) or asked to log in."""
+        participant_selector = 'button[id^="headlessui-listbox-button"]'
+        login_selector = 'button.font-bold.text-brand-neutral:has-text("Log In")'
+        try:
+            page.wait_for_selector(f'{participant_selector}, {login_selector}', state="visible", timeout=STEP_TIMEOUTS_MS["login"])
+        except Exception:
+            return False
+        return page.locator(participant_selector).first.is_visible()
+
+    def _login(self, page, login_button_selector: str = 'button.font-bold.text-brand-neutral:has-text("Log In")') -> Optional[str]:
+        """Runs the rec.us login modal. Returns an error message, or None on success."""
+        login_button = page.wait_for_selector(login_button_selector, state="visible", timeout=STEP_TIMEOUTS_MS["login"])
+        if login_button:
+            login_button.click()
+        else:
+            # page.screenshot(path="debug_no_login_button.png")
+            return "Login button not found"
+        
+        # Fill login form
+        email_input = page.wait_for_selector('input#email', state="visible", timeout=STEP_TIMEOUTS_MS["login"])
+        password_input = page.wait_for_selector('input#password', state="visible", timeout=STEP_TIMEOUTS_MS["login"])
+        
+        if email_input and password_input:
+            email_input.fill(self.email)
+            password_input.fill(self.password)
+            
+            # Submit login
+            submit_button = page.wait_for_selector('button[type="submit"]', state="visible", timeout=STEP_TIMEOUTS_MS["login"])
+            if submit_button:
+                submit_button.click()
+                # The login form goes away once rec.us accepted the credentials
+                try:
+                    page.wait_for_selector('input#password', state="hidden", timeout=STEP_TIMEOUTS_MS["login_submit"])
+                except Exception:
+                    logger.error("Login form still visible after submit timeout")
+                    return "Login rejected: login form still visible after submit"
+            else:
+                logger.error("Submit button not found")
+                return "Submit button not found"
+        else:
+            logger.error("Email or password input not found")
+            return "Email or password input not found"
+        return None
+
+    def get_availability_snapshot(self, date_str: str) -> Dict[str, List[str]]:
+        """
+        Get available time slots for every tennis court on a date from a single page load.
+
+        Args:
+            date_str: Date string in YYYY-MM-DD format
+
+        Returns:
+            Mapping of court name to available time slots in HH:MM format (24-hour).
+            Empty if availability could not be retrieved. Concurrent calls for the
+            same date share one fetch (see singleflight.py), so the mapping is
+            shared and must not be modified.
+        """
+        return single_flight.do(("availability", date_str), self._fetch_availability_snapshot, date_str)
+
+    def _fetch_availability_snapshot(self, date_str: str) -> Dict[str, List[str]]:
+        logger.info(f"[TennisBooker.get_availability_snapshot] START for {date_str}")
+        try:
+            return browser_pool.run(self._get_availability_snapshot, date_str, profile="scrape")
+        except AdmissionRejected:
+            raise
+        except Exception as e:
+            logger.error(f"[TennisBooker.get_availability_snapshot] Could not run scrape in browser pool: {str(e)}", exc_info=True)
+            return {}
+
+    def _get_availability_snapshot(self, context, date_str: str) -> Dict[str, List[str]]:
+        target_date = datetime.strptime(date_str, "%Y-%m-%d")
+
+        try:
+            page = context.new_page()
+            logger.debug("[TennisBooker.get_availability_snapshot] Browser context ready. Navigating to date...")
+            self._open_listing(page, target_date)
+
+            logger.debug("[TennisBooker.get_availability_snapshot] Parsing page content for courts and times...")
+            snapshot = parse_availability_snapshot(page.content())
+            logger.info(f"[TennisBooker.get_availability_snapshot] FINISHED. {len(snapshot)} courts: {snapshot}")
+            return snapshot
+
+        except Exception as e:
+            logger.error(f"[TennisBooker.get_availability_snapshot] An unexpected error occurred during scraping: {str(e)}", exc_info=True)
+            # page.screenshot(path="scraping_error.png") # Capture state on error
+            return {} # Return empty snapshot on error
 
     def get_available_times(self, court_name: str, date_str: str) -> List[str]:
         """
@@ -331,188 +741,90 @@ class TennisBooker:
         Returns:
             List of available time slots in HH:MM format (24-hour)
         """
-
         logger.info(f"[TennisBooker.get_available_times] START for '{court_name}' on {date_str}")
+        snapshot = self.get_availability_snapshot(date_str)
+        if court_name not in snapshot:
+            logger.warning(f"[TennisBooker.get_available_times] Court '{court_name}' was not found for {date_str}.")
+            return []
+        times_list = snapshot[court_name]
+        logger.info(f"[TennisBooker.get_available_times] FINISHED. Extracted times: {times_list}")
+        return times_list
+
+    def check_slot_available(self, court_name: str, booking_time) -> Optional[bool]:
+        """
+        Booking preflight: tells whether the court has a slot starting at booking_time.
+
+        Returns None when availability could not be retrieved, so callers can still
+        attempt the booking rather than fail on a scraping problem.
+        """
+        try:
+            snapshot = self.get_availability_snapshot(booking_time.strftime("%Y-%m-%d"))
+        except AdmissionRejected:
+            logger.info("[TennisBooker.check_slot_available] Browser queue saturated; skipping preflight.")
+            return None
+        if not snapshot:
+            return None
+        return booking_time.strftime("%H:%M") in snapshot.get(court_name, [])
+
+    def watch_availability(self, date_str: str, on_snapshot: Callable[[str, Dict[str, List[str]]], None], stop) -> None:
+        """
+        Watch mode: keeps a page open on the court listing for date_str and calls
+        on_snapshot(date_str, snapshot) with every court's times whenever the
+        listing changes, until stop (a threading.Event) is set.
+
+        Each session opens the listing under the 'watch' admission kind, which
+        only gets a slot no booking or scrape is waiting for. A
+        MutationObserver on the court containers reports changes the page
+        makes by itself; the session re-selects the date (no page reload) when
+        it has been quiet for SLOT_WATCH_REFRESH_SECONDS, and ends after
+        SLOT_WATCH_SESSION_SECONDS. The browser is then free for
+        SLOT_WATCH_REFRESH_SECONDS until the next session, so a watch never
+        keeps scrapes waiting longer than one session. A failed session is
+        retried after the refresh interval.
+        """
+        while not stop.is_set():
+            try:
+                browser_pool.run(self._watch_availability, date_str, on_snapshot, stop,
+                                 profile="scrape", admission_kind="watch")
+            except TimeoutError:
+                logger.info(f"[TennisBooker.watch_availability] No browser free for the watch of {date_str}; waiting")
+            except Exception as e:
+                logger.error(f"[TennisBooker.watch_availability] Watch session for {date_str} failed: {str(e)}", exc_info=True)
+            stop.wait(SLOT_WATCH_REFRESH_SECONDS)
+
+    def _watch_availability(self, context, date_str: str, on_snapshot, stop) -> int:
         target_date = datetime.strptime(date_str, "%Y-%m-%d")
-        # Use str(day) to avoid leading zero (e.g., '8' instead of '08')
-        target_day = str(target_date.day) 
-        target_month = target_date.strftime("%B")  # Full month name
-        target_year = target_date.strftime("%Y")
-        logger.debug(f"[TennisBooker.get_available_times] Target date parsed: Day={target_day}, Month={target_month}, Year={target_year}")
+        session_ends = time.time() + SLOT_WATCH_SESSION_SECONDS
+        page = context.new_page()
+        self._open_listing(page, target_date)
+        page.evaluate(WATCH_LISTING_SCRIPT)
+        on_snapshot(date_str, parse_availability_snapshot(page.content()))
+        snapshots = 1
 
-        with sync_playwright() as playwright:
-            browser = None # Initialize browser variable
+        while not stop.is_set() and time.time() < session_ends:
+            seen = page.evaluate("() => window.__recListingVersion")
+            remaining = session_ends - time.time()
+            # Armed before waiting, so it sees the re-render from its first mutation
+            _arm_dom_settle(page)
             try:
-                logger.debug("[TennisBooker.get_available_times] Launching Playwright browser...")
-                browser = playwright.chromium.launch()
-                context = browser.new_context(java_script_enabled = True)
-                page = context.new_page()
-                logger.debug("[TennisBooker.get_available_times] Browser launched. Navigating to page...")
-
-                page.goto("https://www.rec.us/organizations/san-francisco-rec-park", wait_until="networkidle")
-                page.wait_for_selector("a.no-underline.hover\\:underline", state="attached")
-                logger.debug("[TennisBooker.get_available_times] Initial page loaded.")
-
-                # Find and click the button with the specified classes
-                button_selector = 'button.rounded-2xl.border.border-gray-200.px-4.py-1.hover\\:border-black.bg-gray-200'
+                page.wait_for_function(f"() => window.__recListingVersion > {seen}",
+                                       timeout=max(1.0, min(SLOT_WATCH_REFRESH_SECONDS, remaining)) * 1000)
+                # The page re-rendered the listing itself; let it finish
+                _wait_for_dom_settle(page, STEP_TIMEOUTS_MS["day_listing"])
+            except Exception:
+                # The next session reopens the listing anyway
+                if stop.is_set() or time.time() >= session_ends:
+                    break
                 try:
-                    logger.debug("[TennisBooker.get_available_times] Waiting for initial button...")
-                    button = page.wait_for_selector(button_selector, state="visible", timeout=5000)
-                    if button:
-                        logger.debug("[TennisBooker.get_available_times] Clicking initial button...")
-                        button.click()
-                        logger.info("[TennisBooker.get_available_times] Successfully clicked the initial button")
-                    else:
-                        logger.warning("[TennisBooker.get_available_times] Initial button selector found no element.")
+                    self._select_date(page, target_date)
                 except Exception as e:
-                    logger.error(f"[TennisBooker.get_available_times] Error clicking initial button: {str(e)}", exc_info=True)
-                    # page.screenshot(path="button_error.png")
-                    # Decide if we should re-raise or return empty list
-                    return [] # Return empty on error here
-                
-                logger.debug("[TennisBooker.get_available_times] Waiting for calendar...")
-                page.wait_for_selector('.rdp', state="visible")
-                logger.debug("[TennisBooker.get_available_times] Calendar visible. Navigating month...")
-        
-                # Navigate to the correct month
-                navigation_attempts = 0
-                while navigation_attempts < 12: # Limit attempts to prevent infinite loops
-                    # Get current month and year from the calendar
-                    current_month_element = page.locator('div[role="presentation"][id^="react-day-picker-"]')
-                    current_month_text = current_month_element.text_content()
-                    current_month, current_year = current_month_text.strip().split()
-                    logger.debug(f"[TennisBooker.get_available_times] Current calendar month: {current_month} {current_year}")
-                    
-                    # If we're at the correct month and year, break
-                    if current_month == target_month and current_year == target_year:
-                        logger.info(f"[TennisBooker.get_available_times] Target month found: {target_month} {target_year}")
-                        break
-                        
-                    # Click next month button
-                    logger.debug("[TennisBooker.get_available_times] Clicking next month...")
-                    next_month_button = page.locator('button[name="next-month"]')
-                    next_month_button.click()
-                    # Wait for calendar to update
-                    page.wait_for_timeout(500)
-                    navigation_attempts += 1
-                else:
-                    logger.error("[TennisBooker.get_available_times] Failed to navigate to target month after 12 attempts.")
-                    return []
-                
-                # Find and click on the target day
-                try:
-                    # First try: Use the most specific selector for the active day in current month
-                    specific_selector = f'button[name="day"]:has-text("{target_day}"):not(.day-outside):not(.opacity-50)'
-                    logger.debug(f"[TennisBooker.get_available_times] Attempting to click day with selector: {specific_selector}")
-                    page.locator(specific_selector).first.click()
-                    logger.info(f"[TennisBooker.get_available_times] Clicked day {target_day} using primary selector.")
-                except Exception as e:
-                    logger.warning(f"[TennisBooker.get_available_times] Primary day selector failed: {str(e)}. Trying alternatives...")
-                    try:
-                        # Second try: Get all day buttons with the target day text and filter out the one from previous/next month
-                        all_day_buttons = page.locator(f'button[name="day"]:has-text("{target_day}")').all()
-                        logger.debug(f"[TennisBooker.get_available_times] Found {len(all_day_buttons)} buttons matching day {target_day}")
-                        
-                        current_month_button = None
-                        for button in all_day_buttons:
-                            class_attr = button.get_attribute("class")
-                            if class_attr and "day-outside" not in class_attr and "opacity-50" not in class_attr:
-                                current_month_button = button
-                                logger.debug("[TennisBooker.get_available_times] Found valid button for current month.")
-                                break
-                        
-                        if current_month_button:
-                            current_month_button.click()
-                            logger.info(f"[TennisBooker.get_available_times] Clicked day {target_day} using secondary selector.")
-                        else:
-                            # Last resort: just click the nth button (careful, this is brittle)
-                            logger.warning("[TennisBooker.get_available_times] Secondary day selector failed. Trying nth(1) fallback.")
-                            page.locator(f'button[name="day"]:has-text("{target_day}")').nth(1).click()
-                            logger.info(f"[TennisBooker.get_available_times] Clicked day {target_day} using nth(1) selector.")
-                    except Exception as e2:
-                        logger.error(f"[TennisBooker.get_available_times] All attempts to click day {target_day} failed: {str(e2)}", exc_info=True)
-                        # page.screenshot(path="day_selection_error.png")
-                        return []
-                
-                # Wait after clicking the day for content to load
-                logger.debug("[TennisBooker.get_available_times] Waiting for court times to load after day click...")
-                page.wait_for_timeout(5000) # Consider adjusting or using explicit waits if possible
-
-                logger.debug("[TennisBooker.get_available_times] Parsing page content for courts and times...")
-                html = page.content()
-                soup = BeautifulSoup(html, "html.parser")
-                times_list = []
-                found_court = False
-                
-                for container in soup.find_all('div', class_="rounded-xl border border-gray-200 p-3"):
-                    court_name_tag = container.find('p', class_="text-[1rem] font-medium text-black md:text-[1.125rem] mb-1")
-                    sport_tag = container.find('p', class_="text-[0.875rem] font-medium text-black md:text-[1rem] mb-2")
-                    
-                    if court_name_tag and sport_tag:
-                        current_court_name = court_name_tag.get_text(strip=True)
-                        current_sport = sport_tag.get_text(strip=True)
-                        logger.debug(f"[TennisBooker.get_available_times] Checking container: Court='{current_court_name}', Sport='{current_sport}'")
-                        
-                        if current_court_name == court_name and current_sport == "Tennis":
-                            logger.info(f"[TennisBooker.get_available_times] Found target court container: '{court_name}'")
-                            found_court = True
-                            swiper_wrapper = None
-                            for rel_div in container.select("div.relative"):
-                                potential_swiper = rel_div.find("div", class_="swiper-wrapper")
-                                if potential_swiper:
-                                    swiper_wrapper = potential_swiper
-                                    logger.debug("[TennisBooker.get_available_times] Found swiper-wrapper.")
-                                    break
-                                    
-                            if swiper_wrapper:
-                                # Iterate over each swiper slide that has "swiper-slide" in its class
-                                for slide in swiper_wrapper.find_all('div', class_=lambda c: c and 'swiper-slide' in c):
-                                    time_tag = slide.find('p', class_="text-[0.875rem] font-medium")
-                                    if time_tag:
-                                        time_text = time_tag.get_text(strip=True)
-                                        logger.debug(f"[TennisBooker.get_available_times] Found raw time text: '{time_text}'")
-                                        # Convert from "7:30 AM" format to "07:30" format (24-hour)
-                                        if ":" in time_text:
-                                            try:
-                                                parsed_time = datetime.strptime(time_text, "%I:%M %p") # e.g., 7:30 AM
-                                                formatted_time = parsed_time.strftime("%H:%M") # e.g., 07:30
-                                                times_list.append(formatted_time)
-                                                logger.debug(f"[TennisBooker.get_available_times] Parsed time: {formatted_time}")
-                                            except ValueError:
-                                                # Handle cases like '12:00 PM' which might need special handling or just use raw
-                                                try:
-                                                     parsed_time = datetime.strptime(time_text, "%I:%M") # Handle case without AM/PM maybe?
-                                                     formatted_time = parsed_time.strftime("%H:%M")
-                                                     times_list.append(formatted_time)
-                                                     logger.warning(f"[TennisBooker.get_available_times] Parsed time '{time_text}' without AM/PM to {formatted_time}")
-                                                except ValueError:
-                                                     logger.error(f"[TennisBooker.get_available_times] Error parsing time '{time_text}'. Appending raw.", exc_info=False)
-                                                     times_list.append(time_text) # Add raw time as fallback
-                                        else:
-                                             logger.warning(f"[TennisBooker.get_available_times] Time text '{time_text}' does not contain ':'. Skipping parsing.")
-                                             # Decide if you want to add non-standard times or ignore them
-                                             # times_list.append(time_text)
-                                else:
-                                     logger.debug("[TennisBooker.get_available_times] Slide found without time tag.")
-                            else:
-                                logger.warning("[TennisBooker.get_available_times] Swiper wrapper not found in the target court container.")
-                            # Found the target court, no need to check other containers
-                            break 
-                
-                if not found_court:
-                    logger.warning(f"[TennisBooker.get_available_times] Container for court '{court_name}' was not found on the page.")
-
-                logger.info(f"[TennisBooker.get_available_times] FINISHED. Extracted times: {times_list}")
-                return times_list
-
-            except Exception as e:
-                logger.error(f"[TennisBooker.get_available_times] An unexpected error occurred during scraping: {str(e)}", exc_info=True)
-                # page.screenshot(path="scraping_error.png") # Capture state on error
-                return [] # Return empty list on error
-            finally:
-                 if browser:
-                      logger.debug("[TennisBooker.get_available_times] Closing Playwright browser.")
-                      browser.close()
+                    logger.warning(f"[TennisBooker.watch_availability] Listing refresh for {date_str} failed ({str(e)}); reloading the page")
+                    self._open_listing(page, target_date)
+                    page.evaluate(WATCH_LISTING_SCRIPT)
+            on_snapshot(date_str, parse_availability_snapshot(page.content()))
+            snapshots += 1
+        logger.info(f"[TennisBooker.watch_availability] Session for {date_str} ended after {snapshots} snapshots")
+        return snapshots
 
 if __name__ == "__main__":
     # Configure logging to show debug messages
@@ -0,0 +1,157 @@
+import os
+import time
+import logging
+import threading
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from availability_store import AvailabilityStore, availability_store
+
+logger = logging.getLogger(__name__)
+
+# --- Availability Cache Configuration ---
+# Entries younger than this are served without refreshing
+AVAILABILITY_CACHE_TTL_SECONDS = float(os.getenv("AVAILABILITY_CACHE_TTL", "60"))
+# Older entries are still served while they are refreshed, up to this age
+AVAILABILITY_CACHE_MAX_STALE_SECONDS = float(os.getenv("AVAILABILITY_CACHE_MAX_STALE", "600"))
+# Court/date entries kept in the store; the least recently used are evicted. The
+# prefetcher's window (active courts x 8 dates) should fit, or it refetches evicted entries
+AVAILABILITY_CACHE_MAX_ENTRIES = int(os.getenv("AVAILABILITY_CACHE_MAX_ENTRIES", "512"))
+# Stale entries are refreshed in-process only if the host's refresher has not beaten for this long
+AVAILABILITY_REFRESHER_TIMEOUT_SECONDS = float(os.getenv("AVAILABILITY_REFRESHER_TIMEOUT", "60"))
+# --- End Availability Cache Configuration ---
+
+# Scrapes one date: {court_name: [HH:MM, ...]}, empty if it failed
+SnapshotLoader = Callable[[str], Dict[str, List[str]]]
+
+# availability_store beat name of the process that keeps the store fresh
+REFRESHER = "availability_prefetcher"
+
+
+class AvailabilityCache:
+    """
+    TTL read policy over the host-wide availability_store.
+
+    get() serves entries younger than the TTL directly. Older entries, up to
+    AVAILABILITY_CACHE_MAX_STALE_SECONDS, are served at once
+    (stale-while-revalidate): the refresher (availability_prefetcher on the
+    scheduler leader) revalidates them, and only when it has stopped beating
+    does this process start one background refresh per date itself. Missing
+    or too-stale entries make the caller wait for a scrape, whose snapshot is
+    written through to the store for every worker. A scrape returns every
+    court on the date, so each one fills the entries of all courts. Failed
+    (empty) scrapes are not stored. The store is kept to max_entries entries,
+    whatever dates on-demand lookups ask for. Counters are per process.
+    """
+
+    def __init__(self, store: AvailabilityStore = availability_store, ttl: float = AVAILABILITY_CACHE_TTL_SECONDS,
+                 max_stale: float = AVAILABILITY_CACHE_MAX_STALE_SECONDS,
+                 max_entries: int = AVAILABILITY_CACHE_MAX_ENTRIES):
+        self.store = store
+        self.ttl = ttl
+        self.max_stale = max(max_stale, ttl)
+        self.max_entries = max(1, max_entries)
+        self._lock = threading.Lock()
+        self._refreshing = set()
+        self._counters = {"hits": 0, "stale_hits": 0, "misses": 0, "refreshes": 0, "refresh_errors": 0, "evictions": 0}
+
+    def put(self, date_str: str, snapshot: Dict[str, List[str]], courts: Iterable[str] = ()):
+        """Stores a date's snapshot; courts it does not list are stored as empty."""
+        if snapshot:
+            evicted = self.store.put(date_str, {**{court: [] for court in courts}, **snapshot}, max_entries=self.max_entries)
+            if evicted:
+                with self._lock:
+                    self._counters["evictions"] += evicted
+
+    def refresher_alive(self) -> bool:
+        beat = self.store.last_beat(REFRESHER)
+        return beat is not None and time.time() - beat <= AVAILABILITY_REFRESHER_TIMEOUT_SECONDS
+
+    def _refresh(self, courts: List[str], date_str: str, loader: SnapshotLoader):
+        try:
+            self.put(date_str, loader(date_str), courts)
+        except Exception as e:
+            with self._lock:
+                self._counters["refresh_errors"] += 1
+            logger.warning(f"[AvailabilityCache] Background refresh of {date_str} failed: {str(e)}")
+        finally:
+            with self._lock:
+                self._refreshing.discard(date_str)
+
+    def _usable(self, fetched_at: float, courts: List[str], date_str: str, loader: SnapshotLoader) -> Optional[Tuple[float, str]]:
+        """(age, 'hit' | 'stale') if an entry fetched at fetched_at can be served, starting a refresh if needed; else None."""
+        age = max(0.0, time.time() - fetched_at)
+        if age <= self.ttl:
+            with self._lock:
+                self._counters["hits"] += 1
+            return age, "hit"
+        if age > self.max_stale:
+            return None
+        start_refresh = not self.refresher_alive()
+        with self._lock:
+            self._counters["stale_hits"] += 1
+            start_refresh = start_refresh and date_str not in self._refreshing
+            if start_refresh:
+                self._refreshing.add(date_str)
+                self._counters["refreshes"] += 1
+        if start_refresh:
+            threading.Thread(target=self._refresh, args=(courts, date_str, loader),
+                             name=f"availability-refresh-{date_str}", daemon=True).start()
+        return age, "stale"
+
+    def get(self, court_name: str, date_str: str, loader: SnapshotLoader) -> Tuple[List[str], float, str]:
+        """
+        Available times for court_name on date_str as (times, age in seconds,
+        'hit' | 'stale' | 'miss'). Scrapes through loader on a miss.
+        """
+        entry = self.store.get(court_name, date_str)
+        if entry is not None:
+            times, fetched_at = entry
+            usable = self._usable(fetched_at, [court_name], date_str, loader)
+            if usable:
+                return (times, *usable)
+
+        with self._lock:
+            self._counters["misses"] += 1
+        snapshot = loader(date_str)
+        self.put(date_str, snapshot, [court_name])
+        return list(snapshot.get(court_name, [])), 0.0, "miss"
+
+    def cached_snapshot(self, date_str: str, loader: SnapshotLoader) -> Optional[Tuple[Dict[str, List[str]], float, str]]:
+        """
+        get_snapshot() without the scrape: (snapshot, age, 'hit' | 'stale') if
+        the store can serve date_str, else None (counted as a miss) and the
+        caller fetches it and put()s the result.
+        """
+        entry = self.store.get_date(date_str)
+        if entry is not None:
+            snapshot, fetched_at = entry
+            usable = self._usable(fetched_at, [], date_str, loader)
+            if usable:
+                return (snapshot, *usable)
+        with self._lock:
+            self._counters["misses"] += 1
+        return None
+
+    def get_snapshot(self, date_str: str, loader: SnapshotLoader) -> Tuple[Dict[str, List[str]], float, str]:
+        """
+        Every stored court's times on date_str as (snapshot, age of its oldest
+        entry, 'hit' | 'stale' | 'miss'), with the same policy as get().
+        """
+        cached = self.cached_snapshot(date_str, loader)
+        if cached is not None:
+            return cached
+        snapshot = loader(date_str)
+        self.put(date_str, snapshot)
+        return snapshot, 0.0, "miss"
+
+    def invalidate(self, date_str: Optional[str] = None):
+        """Drops the entries of one date, or everything, for every process."""
+        self.store.delete(date_str)
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            counters = {**self._counters, "refreshing": len(self._refreshing), "max_entries": self.max_entries}
+        return {**counters, "refresher_alive": self.refresher_alive(), "store": self.store.stats()}
+
+
+availability_cache = AvailabilityCache()
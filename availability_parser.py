@@ -0,0 +1,240 @@
+import os
+import re
+import logging
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+from bs4 import BeautifulSoup
+
+try:
+    import lxml.html
+except ImportError:  # optional, faster backend
+    lxml = None
+
+try:
+    from selectolax.lexbor import LexborHTMLParser
+except ImportError:  # optional, fastest backend
+    LexborHTMLParser = None
+
+logger = logging.getLogger(__name__)
+
+# Class attributes of the rec.us court listing. Each must be the element's whole class list,
+# in this order; whitespace between the classes does not matter (as with BeautifulSoup)
+CONTAINER_CLASS = "rounded-xl border border-gray-200 p-3"
+COURT_NAME_CLASS = "text-[1rem] font-medium text-black md:text-[1.125rem] mb-1"
+SPORT_CLASS = "text-[0.875rem] font-medium text-black md:text-[1rem] mb-2"
+SLOT_TIME_CLASS = "text-[0.875rem] font-medium"
+
+Snapshot = Dict[str, List[str]]
+
+# "7:30 AM" / "12:05 pm": the shape rec.us uses for every slot label
+_SLOT_TIME_RE = re.compile(r"(\d{1,2}):(\d{2}) ([AaPp][Mm])")
+
+
+def _normalize_slot_time(time_text: str) -> Optional[str]:
+    """Converts a slot label like "7:30 AM" to "07:30" (24-hour). Returns None for labels without a time."""
+    if ":" not in time_text:
+        logger.warning(f"[parse_availability_snapshot] Time text '{time_text}' does not contain ':'. Skipping parsing.")
+        return None
+    try:
+        return datetime.strptime(time_text, "%I:%M %p").strftime("%H:%M") # e.g., 7:30 AM -> 07:30
+    except ValueError:
+        pass
+    try:
+        formatted_time = datetime.strptime(time_text, "%I:%M").strftime("%H:%M") # Handle case without AM/PM
+        logger.warning(f"[parse_availability_snapshot] Parsed time '{time_text}' without AM/PM to {formatted_time}")
+        return formatted_time
+    except ValueError:
+        logger.error(f"[parse_availability_snapshot] Error parsing time '{time_text}'. Using raw text.")
+        return time_text # Add raw time as fallback
+
+
+def _fast_normalize_slot_time(time_text: str) -> Optional[str]:
+    """_normalize_slot_time without strptime for well-formed labels; anything else takes the slow path."""
+    match = _SLOT_TIME_RE.fullmatch(time_text)
+    if match:
+        hour, minute = int(match.group(1)), int(match.group(2))
+        if 1 <= hour <= 12 and minute < 60:
+            if match.group(3)[0] in "Pp":
+                hour = hour % 12 + 12
+            else:
+                hour = hour % 12
+            return f"{hour:02d}:{minute:02d}"
+    return _normalize_slot_time(time_text)
+
+
+def _parse_with_beautifulsoup(html: str) -> Snapshot:
+    """Reference implementation: html.parser plus class lookups."""
+    soup = BeautifulSoup(html, "html.parser")
+    snapshot: Snapshot = {}
+
+    for container in soup.find_all('div', class_=CONTAINER_CLASS):
+        court_name_tag = container.find('p', class_=COURT_NAME_CLASS)
+        sport_tag = container.find('p', class_=SPORT_CLASS)
+        if not court_name_tag or not sport_tag:
+            continue
+
+        court_name = court_name_tag.get_text(strip=True)
+        sport = sport_tag.get_text(strip=True)
+        # The first container for a court wins, as when courts were looked up one at a time
+        if sport != "Tennis" or court_name in snapshot:
+            continue
+
+        times_list: List[str] = []
+        swiper_wrapper = None
+        for rel_div in container.select("div.relative"):
+            swiper_wrapper = rel_div.find("div", class_="swiper-wrapper")
+            if swiper_wrapper:
+                break
+
+        if swiper_wrapper:
+            # Iterate over each swiper slide that has "swiper-slide" in its class
+            for slide in swiper_wrapper.find_all('div', class_=lambda c: c and 'swiper-slide' in c):
+                time_tag = slide.find('p', class_=SLOT_TIME_CLASS)
+                if time_tag:
+                    formatted_time = _normalize_slot_time(time_tag.get_text(strip=True))
+                    if formatted_time:
+                        times_list.append(formatted_time)
+        else:
+            logger.warning(f"[parse_availability_snapshot] Swiper wrapper not found for court '{court_name}'.")
+        snapshot[court_name] = times_list
+
+    return snapshot
+
+
+def _has_class_xpath(class_name: str) -> str:
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {class_name} ')"
+
+
+def _class_list_xpath(class_list: str) -> str:
+    return f'normalize-space(@class)="{class_list}"'
+
+
+_LXML_CONTAINERS = f'//div[{_class_list_xpath(CONTAINER_CLASS)}]'
+_LXML_COURT_NAME = f'.//p[{_class_list_xpath(COURT_NAME_CLASS)}]'
+_LXML_SPORT = f'.//p[{_class_list_xpath(SPORT_CLASS)}]'
+_LXML_RELATIVE = f'.//div[{_has_class_xpath("relative")}]'
+_LXML_WRAPPER = f'.//div[{_has_class_xpath("swiper-wrapper")}]'
+_LXML_SLIDES = ".//div[contains(@class, 'swiper-slide')]"
+_LXML_SLOT_TIME = f'.//p[{_class_list_xpath(SLOT_TIME_CLASS)}]'
+
+
+def _lxml_text(element) -> str:
+    # Same as BeautifulSoup's get_text(strip=True): every text node stripped, then joined
+    return "".join(text.strip() for text in element.itertext())
+
+
+def _parse_with_lxml(html: str) -> Snapshot:
+    root = lxml.html.document_fromstring(html)
+    snapshot: Snapshot = {}
+
+    for container in root.xpath(_LXML_CONTAINERS):
+        court_name_tags = container.xpath(_LXML_COURT_NAME)
+        sport_tags = container.xpath(_LXML_SPORT)
+        if not court_name_tags or not sport_tags:
+            continue
+
+        court_name = _lxml_text(court_name_tags[0])
+        if _lxml_text(sport_tags[0]) != "Tennis" or court_name in snapshot:
+            continue
+
+        times_list: List[str] = []
+        swiper_wrapper = None
+        for rel_div in container.xpath(_LXML_RELATIVE):
+            wrappers = rel_div.xpath(_LXML_WRAPPER)
+            if wrappers:
+                swiper_wrapper = wrappers[0]
+                break
+
+        if swiper_wrapper is not None:
+            for slide in swiper_wrapper.xpath(_LXML_SLIDES):
+                time_tags = slide.xpath(_LXML_SLOT_TIME)
+                if time_tags:
+                    formatted_time = _fast_normalize_slot_time(_lxml_text(time_tags[0]))
+                    if formatted_time:
+                        times_list.append(formatted_time)
+        else:
+            logger.warning(f"[parse_availability_snapshot] Swiper wrapper not found for court '{court_name}'.")
+        snapshot[court_name] = times_list
+
+    return snapshot
+
+
+def _selectolax_text(node) -> str:
+    return node.text(deep=True, separator="", strip=True)
+
+
+def _selectolax_find(node, tag: str, class_list: str) -> List:
+    """Descendants of node whose class tokens are exactly class_list's; CSS [class="..."] would compare the raw attribute."""
+    tokens = class_list.split()
+    return [match for match in node.css(f'{tag}[class~="{tokens[0]}"]')
+            if (match.attributes.get("class") or "").split() == tokens]
+
+
+def _selectolax_find_first(node, tag: str, class_list: str):
+    matches = _selectolax_find(node, tag, class_list)
+    return matches[0] if matches else None
+
+
+def _parse_with_selectolax(html: str) -> Snapshot:
+    tree = LexborHTMLParser(html)
+    snapshot: Snapshot = {}
+
+    for container in _selectolax_find(tree, "div", CONTAINER_CLASS):
+        court_name_tag = _selectolax_find_first(container, "p", COURT_NAME_CLASS)
+        sport_tag = _selectolax_find_first(container, "p", SPORT_CLASS)
+        if court_name_tag is None or sport_tag is None:
+            continue
+
+        court_name = _selectolax_text(court_name_tag)
+        if _selectolax_text(sport_tag) != "Tennis" or court_name in snapshot:
+            continue
+
+        times_list: List[str] = []
+        swiper_wrapper = None
+        for rel_div in container.css("div.relative"):
+            swiper_wrapper = rel_div.css_first("div.swiper-wrapper")
+            if swiper_wrapper is not None:
+                break
+
+        if swiper_wrapper is not None:
+            for slide in swiper_wrapper.css('div[class*="swiper-slide"]'):
+                time_tag = _selectolax_find_first(slide, "p", SLOT_TIME_CLASS)
+                if time_tag is not None:
+                    formatted_time = _fast_normalize_slot_time(_selectolax_text(time_tag))
+                    if formatted_time:
+                        times_list.append(formatted_time)
+        else:
+            logger.warning(f"[parse_availability_snapshot] Swiper wrapper not found for court '{court_name}'.")
+        snapshot[court_name] = times_list
+
+    return snapshot
+
+
+# Backend name -> parser; only backends whose library is installed are listed
+PARSERS: Dict[str, Callable[[str], Snapshot]] = {"html.parser": _parse_with_beautifulsoup}
+if lxml is not None:
+    PARSERS["lxml"] = _parse_with_lxml
+if LexborHTMLParser is not None:
+    PARSERS["selectolax"] = _parse_with_selectolax
+
+# Fastest installed backend unless AVAILABILITY_PARSER names another one
+AVAILABILITY_PARSER = os.getenv("AVAILABILITY_PARSER") or next(
+    name for name in ("selectolax", "lxml", "html.parser") if name in PARSERS)
+if AVAILABILITY_PARSER not in PARSERS:
+    logger.warning(f"[availability_parser] Parser backend '{AVAILABILITY_PARSER}' is not installed; using html.parser.")
+    AVAILABILITY_PARSER = "html.parser"
+
+
+def parse_availability_snapshot(html: str, backend: Optional[str] = None) -> Snapshot:
+    """
+    Extracts the available slots of every tennis court from a rendered organization page.
+
+    Args:
+        html: Page HTML, e.g. from page.content()
+        backend: Key of PARSERS; defaults to AVAILABILITY_PARSER. All backends return the same result.
+
+    Returns:
+        Mapping of court name to time slots in HH:MM format (24-hour), in page order
+    """
+    return PARSERS[backend or AVAILABILITY_PARSER](html)
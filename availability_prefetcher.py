@@ -0,0 +1,213 @@
+import os
+import math
+import time
+import logging
+import threading
+from collections import deque
+from datetime import datetime, time as clock, timedelta
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from admission import AdmissionRejected, admission_controller
+from automation import TennisBooker
+from availability_cache import REFRESHER, availability_cache
+from availability_scanner import BOOKING_WINDOW_DAYS, booking_window_dates
+from availability_store import availability_store
+from booking_window import SF_TIMEZONE, release_instant
+from models import Court
+
+logger = logging.getLogger(__name__)
+
+# --- Availability Prefetch Configuration ---
+AVAILABILITY_PREFETCH_ENABLED = os.getenv("AVAILABILITY_PREFETCH_ENABLED", "true").lower() == "true"
+# How often the scheduler job looks for court/dates that are due
+AVAILABILITY_PREFETCH_TICK_SECONDS = int(os.getenv("AVAILABILITY_PREFETCH_TICK", "15"))
+# Global cap on prefetch scrapes (one per date) in any 60 seconds
+AVAILABILITY_PREFETCH_BUDGET_PER_MINUTE = int(os.getenv("AVAILABILITY_PREFETCH_BUDGET_PER_MINUTE", "6"))
+# Refresh interval of a court/date nobody asks for; keep it under AVAILABILITY_CACHE_MAX_STALE
+AVAILABILITY_PREFETCH_MAX_INTERVAL_SECONDS = float(os.getenv("AVAILABILITY_PREFETCH_MAX_INTERVAL", "300"))
+# Refresh interval of the most requested court/dates
+AVAILABILITY_PREFETCH_MIN_INTERVAL_SECONDS = float(os.getenv("AVAILABILITY_PREFETCH_MIN_INTERVAL", "60"))
+# Around a court/date's release instant it is refreshed this often ...
+AVAILABILITY_PREFETCH_RELEASE_INTERVAL_SECONDS = float(os.getenv("AVAILABILITY_PREFETCH_RELEASE_INTERVAL", "30"))
+# ... from this long before the release until this long after it
+AVAILABILITY_PREFETCH_RELEASE_LEAD_SECONDS = float(os.getenv("AVAILABILITY_PREFETCH_RELEASE_LEAD", "120"))
+AVAILABILITY_PREFETCH_RELEASE_TAIL_SECONDS = float(os.getenv("AVAILABILITY_PREFETCH_RELEASE_TAIL", "900"))
+# --- End Availability Prefetch Configuration ---
+
+# Active courts are re-read from the database this often
+_COURTS_MAX_AGE_SECONDS = 600
+# First and last slot start of a day, for rules that release slot by slot ("rolling")
+_FIRST_SLOT = clock(6, 0)
+_LAST_SLOT = clock(22, 0)
+
+
+class AvailabilityPrefetcher:
+    """
+    Keeps the shared availability_store warm for every active court over the booking window.
+
+    tick() runs on the scheduler leader every AVAILABILITY_PREFETCH_TICK_SECONDS
+    and is the store's refresher: each tick beats as REFRESHER so the workers
+    leave stale entries to it, and drops past dates.
+    Each (court, date) gets a refresh interval: AVAILABILITY_PREFETCH_RELEASE_INTERVAL
+    around the date's release instant for that court, otherwise
+    AVAILABILITY_PREFETCH_MAX_INTERVAL shrunk by recent demand (lookups from
+    every worker, counted in the store by record_demand) down to
+    AVAILABILITY_PREFETCH_MIN_INTERVAL. A scrape returns every court on a date,
+    so a date is refetched once any of its courts is due, most overdue dates
+    first, and never more than AVAILABILITY_PREFETCH_BUDGET_PER_MINUTE scrapes
+    per minute. Scrapes use the 'scrape' admission kind and stop for the tick
+    when the browser queue is saturated, or while a slot watch session holds
+    a browser: with the default budget there is a single scrape slot, and a
+    watch already refreshes the shared store for its date, so user lookups
+    that miss the store only compete with the watch for it.
+    """
+
+    def __init__(self, budget_per_minute: int = AVAILABILITY_PREFETCH_BUDGET_PER_MINUTE):
+        self.budget_per_minute = max(1, budget_per_minute)
+        self._lock = threading.Lock()
+        self._scrapes: Deque[float] = deque()
+        self._courts: List[str] = []
+        self._courts_loaded_at: Optional[float] = None
+        self._counters = {"ticks": 0, "scrapes": 0, "empty": 0, "errors": 0, "rejected": 0, "over_budget": 0, "yielded_to_watch": 0}
+        self._last_tick: Optional[Dict[str, Any]] = None
+
+    @staticmethod
+    def record_demand(court_name: str, date_str: str):
+        """Counts one user lookup of court_name on date_str, from any worker."""
+        try:
+            availability_store.record_demand(court_name, date_str)
+        except Exception as e:
+            logger.warning(f"[AvailabilityPrefetcher] Could not record demand: {str(e)}")
+
+    def active_courts(self) -> List[str]:
+        now = time.monotonic()
+        if self._courts_loaded_at is None or now - self._courts_loaded_at > _COURTS_MAX_AGE_SECONDS:
+            courts = [court["name"] for court in Court.get_all_active()]
+            # Keep the previous list when the database is unreachable
+            if courts or self._courts_loaded_at is None:
+                self._courts = courts
+            self._courts_loaded_at = now
+        return self._courts
+
+    @staticmethod
+    def near_release(court_name: str, date_str: str, now: datetime) -> bool:
+        """Whether slots of court_name on date_str are being released around now."""
+        day = datetime.strptime(date_str, "%Y-%m-%d").date()
+        first = release_instant(court_name, datetime.combine(day, _FIRST_SLOT, tzinfo=SF_TIMEZONE))
+        last = release_instant(court_name, datetime.combine(day, _LAST_SLOT, tzinfo=SF_TIMEZONE))
+        return (first - timedelta(seconds=AVAILABILITY_PREFETCH_RELEASE_LEAD_SECONDS) <= now
+                <= last + timedelta(seconds=AVAILABILITY_PREFETCH_RELEASE_TAIL_SECONDS))
+
+    def interval(self, court_name: str, date_str: str, now: datetime, demand: float = 0.0) -> float:
+        """Seconds after which court_name's entry for date_str should be refetched, given its demand."""
+        if self.near_release(court_name, date_str, now):
+            return AVAILABILITY_PREFETCH_RELEASE_INTERVAL_SECONDS
+        return max(AVAILABILITY_PREFETCH_MIN_INTERVAL_SECONDS, AVAILABILITY_PREFETCH_MAX_INTERVAL_SECONDS / (1 + demand))
+
+    def due_dates(self, now: Optional[datetime] = None) -> List[Tuple[str, float]]:
+        """
+        Dates with at least one due court as (date_str, overdue ratio), most
+        overdue first. The ratio is age / interval of the date's most overdue
+        court; uncached entries count as infinitely overdue.
+        """
+        now = now or datetime.now(SF_TIMEZONE)
+        courts = self.active_courts()
+        dates = booking_window_dates(BOOKING_WINDOW_DAYS + 1, start=now)
+        fetched_at = availability_store.fetched_at(dates)
+        demand = availability_store.demand()
+        due = []
+        for date_str in dates:
+            worst = 0.0
+            for court_name in courts:
+                key = (court_name, date_str)
+                if key not in fetched_at:
+                    worst = math.inf
+                    break
+                interval = self.interval(court_name, date_str, now, demand.get(key, 0.0))
+                worst = max(worst, (now.timestamp() - fetched_at[key]) / interval)
+            if worst >= 1:
+                due.append((date_str, worst))
+        return sorted(due, key=lambda item: item[1], reverse=True)
+
+    def _take_budget(self) -> bool:
+        now = time.monotonic()
+        with self._lock:
+            while self._scrapes and now - self._scrapes[0] >= 60:
+                self._scrapes.popleft()
+            if len(self._scrapes) >= self.budget_per_minute:
+                return False
+            self._scrapes.append(now)
+            return True
+
+    def tick(self) -> Dict[str, Any]:
+        """Refetches due dates within the scrape budget. Returns a summary of the tick."""
+        started = time.monotonic()
+        availability_store.beat(REFRESHER)
+        availability_store.prune(datetime.now(SF_TIMEZONE).strftime("%Y-%m-%d"))
+        due = self.due_dates()
+        booker = TennisBooker("", "")
+        courts = self.active_courts()
+        fetched, skipped = [], []
+        for index, (date_str, _) in enumerate(due):
+            if admission_controller.busy("watch"):
+                logger.info("[AvailabilityPrefetcher] A slot watch holds a browser; stopping this tick")
+                self._counters["yielded_to_watch"] += 1
+                skipped = [date for date, _ in due[index:]]
+                break
+            if not self._take_budget():
+                skipped = [date for date, _ in due[index:]]
+                self._counters["over_budget"] += len(skipped)
+                break
+            try:
+                snapshot = booker.get_availability_snapshot(date_str)
+            except AdmissionRejected:
+                logger.info("[AvailabilityPrefetcher] Browser queue saturated; stopping this tick")
+                self._counters["rejected"] += 1
+                skipped = [date for date, _ in due[index:]]
+                break
+            except Exception as e:
+                logger.error(f"[AvailabilityPrefetcher] Prefetch of {date_str} failed: {str(e)}", exc_info=True)
+                self._counters["errors"] += 1
+                continue
+            self._counters["scrapes"] += 1
+            if not snapshot:
+                self._counters["empty"] += 1
+                continue
+            availability_cache.put(date_str, snapshot, courts)
+            availability_store.beat(REFRESHER)
+            fetched.append(date_str)
+
+        self._counters["ticks"] += 1
+        self._last_tick = {
+            "at": time.time(),
+            "due": len(due),
+            "fetched": fetched,
+            "skipped": skipped,
+            "seconds": round(time.monotonic() - started, 2),
+        }
+        if due:
+            logger.info(f"[AvailabilityPrefetcher] {len(due)} date(s) due, fetched {fetched}, "
+                        f"skipped {skipped} in {self._last_tick['seconds']}s")
+        return self._last_tick
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        demand = {f"{court} {date}": round(value, 2) for (court, date), value in availability_store.demand().items()}
+        with self._lock:
+            in_budget = sum(1 for scraped in self._scrapes if now - scraped < 60)
+        return {
+            **self._counters,
+            "budget_per_minute": self.budget_per_minute,
+            "scrapes_last_minute": in_budget,
+            "active_courts": len(self._courts),
+            "last_tick": self._last_tick,
+            "demand": demand,
+        }
+
+
+availability_prefetcher = AvailabilityPrefetcher()
+
+
+def prefetch_tick():
+    """Scheduler job entry point."""
+    availability_prefetcher.tick()
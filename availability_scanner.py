@@ -0,0 +1,182 @@
+import os
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional
+from zoneinfo import ZoneInfo
+
+from playwright.async_api import async_playwright
+
+from admission import admission_controller
+from automation import (
+    REC_US_ORG_URL,
+    MONTH_CAPTION_SELECTOR,
+    MONTH_CHANGED_SCRIPT,
+    ARM_DOM_SETTLE_SCRIPT,
+    DOM_SETTLE_QUIET_MS,
+    STEP_TIMEOUTS_MS,
+    TennisBooker,
+    parse_availability_snapshot,
+)
+from availability_cache import availability_cache
+from resource_profiles import apply_profile_async
+from singleflight import single_flight
+
+logger = logging.getLogger(__name__)
+
+# Maximum number of dates scraped at the same time, each in its own context of
+# one Chromium that holds a single 'scrape' admission slot for the whole scan
+SCANNER_CONCURRENCY = int(os.getenv("SCANNER_CONCURRENCY", "4"))
+BOOKING_WINDOW_DAYS = 7
+
+# date (YYYY-MM-DD) -> court name -> available times (HH:MM)
+RangeAvailability = Dict[str, Dict[str, List[str]]]
+
+
+def booking_window_dates(days: int = BOOKING_WINDOW_DAYS, start: Optional[datetime] = None) -> List[str]:
+    """The bookable dates starting tomorrow (SF time), as YYYY-MM-DD strings."""
+    if start is None:
+        start = datetime.now(ZoneInfo("America/Los_Angeles")) + timedelta(days=1)
+    return [(start + timedelta(days=offset)).strftime("%Y-%m-%d") for offset in range(days)]
+
+
+def date_range(start_date: str, end_date: str) -> List[str]:
+    """All dates from start_date to end_date inclusive (YYYY-MM-DD)."""
+    start = datetime.strptime(start_date, "%Y-%m-%d")
+    end = datetime.strptime(end_date, "%Y-%m-%d")
+    return [(start + timedelta(days=offset)).strftime("%Y-%m-%d") for offset in range((end - start).days + 1)]
+
+
+@asynccontextmanager
+async def _launch_browser():
+    async with async_playwright() as playwright:
+        browser = await playwright.chromium.launch(headless=True)
+        try:
+            yield browser
+        finally:
+            await browser.close()
+
+
+async def _navigate_to_date(page, target_date: datetime):
+    """Async counterpart of TennisBooker._navigate_to_date."""
+    target_day = str(target_date.day)
+    target_month = target_date.strftime("%B")
+    target_year = target_date.strftime("%Y")
+
+    await page.goto(REC_US_ORG_URL, wait_until="networkidle", timeout=STEP_TIMEOUTS_MS["page_load"])
+    await page.wait_for_selector("a.no-underline.hover\\:underline", state="attached", timeout=STEP_TIMEOUTS_MS["page_load"])
+
+    button_selector = 'button.rounded-2xl.border.border-gray-200.px-4.py-1.hover\\:border-black.bg-gray-200'
+    button = await page.wait_for_selector(button_selector, state="visible", timeout=STEP_TIMEOUTS_MS["open_calendar"])
+    await button.click()
+    await page.wait_for_selector('.rdp', state="visible", timeout=STEP_TIMEOUTS_MS["open_calendar"])
+
+    for _ in range(12):
+        current_month_text = (await page.locator(MONTH_CAPTION_SELECTOR).text_content()).strip()
+        current_month, current_year = current_month_text.split()
+        if current_month == target_month and current_year == target_year:
+            break
+        await page.locator('button[name="next-month"]').click()
+        await page.wait_for_function(MONTH_CHANGED_SCRIPT, arg=current_month_text, timeout=STEP_TIMEOUTS_MS["month_change"])
+    else:
+        raise RuntimeError(f"Failed to navigate to {target_month} {target_year} after 12 attempts")
+
+    await page.evaluate(ARM_DOM_SETTLE_SCRIPT, DOM_SETTLE_QUIET_MS)
+    day_selector = f'button[name="day"]:has-text("{target_day}"):not(.day-outside):not(.opacity-50)'
+    await page.locator(day_selector).first.click(timeout=STEP_TIMEOUTS_MS["open_calendar"])
+    try:
+        await page.wait_for_function("() => window.__recDomSettled === true", timeout=STEP_TIMEOUTS_MS["day_listing"])
+    except Exception:
+        if await page.locator('div.rounded-xl.border.border-gray-200.p-3').count() == 0:
+            raise
+
+
+async def _scan_date(browser, semaphore: asyncio.Semaphore, date_str: str) -> Dict[str, List[str]]:
+    async with semaphore:
+        started = time.perf_counter()
+        context = await browser.new_context(java_script_enabled=True)
+        stats = await apply_profile_async(context, "scrape")
+        try:
+            page = await context.new_page()
+            await _navigate_to_date(page, datetime.strptime(date_str, "%Y-%m-%d"))
+            snapshot = parse_availability_snapshot(await page.content())
+            logger.info(f"[AvailabilityScanner] {date_str}: {len(snapshot)} courts in {time.perf_counter() - started:.2f}s")
+            return snapshot
+        finally:
+            stats.finish()
+            await context.close()
+
+
+async def scan_availability_async(dates: Iterable[str], concurrency: int = SCANNER_CONCURRENCY) -> RangeAvailability:
+    """
+    Scrapes availability for several dates concurrently in one browser.
+
+    Each date gets its own context; at most `concurrency` run at once. Dates
+    that fail to scrape map to an empty dict.
+    """
+    dates = list(dates)
+    if not dates:
+        return {}
+
+    async with _launch_browser() as browser:
+        semaphore = asyncio.Semaphore(max(1, concurrency))
+        snapshots = await asyncio.gather(*(_scan_date(browser, semaphore, date_str) for date_str in dates),
+                                         return_exceptions=True)
+
+    results: RangeAvailability = {}
+    for date_str, snapshot in zip(dates, snapshots):
+        if isinstance(snapshot, BaseException):
+            logger.error(f"[AvailabilityScanner] Failed to scan {date_str}: {str(snapshot)}")
+            results[date_str] = {}
+        else:
+            results[date_str] = snapshot
+    return results
+
+
+def _scrape_dates(dates: List[str], concurrency: int) -> RangeAvailability:
+    """Scrapes dates under one 'scrape' admission slot and writes the results through to the shared store."""
+    try:
+        with admission_controller.admit("scrape"):
+            results = asyncio.run(scan_availability_async(dates, concurrency))
+    except TimeoutError as e:
+        logger.error(f"[AvailabilityScanner] {str(e)}; {len(dates)} date(s) not scanned")
+        return {date_str: {} for date_str in dates}
+    for date_str, snapshot in results.items():
+        availability_cache.put(date_str, snapshot)
+    return results
+
+
+def scan_availability(dates: Optional[Iterable[str]] = None, concurrency: int = SCANNER_CONCURRENCY) -> RangeAvailability:
+    """
+    Synchronous entry point for Flask routes and scheduler jobs.
+
+    Dates default to the 7-day booking window. Dates the shared store can
+    serve (see availability_cache) come from it; the rest are scraped
+    concurrently in one browser, which takes a single admission slot however
+    many dates it covers. Concurrent scans of the same dates share one
+    scrape. Dates that fail map to an empty dict.
+
+    Raises:
+        AdmissionRejected: If the browser queue is saturated
+    """
+    dates = list(dates) if dates is not None else booking_window_dates()
+    started = time.perf_counter()
+    booker = TennisBooker("", "")
+    results: RangeAvailability = {}
+    missing = []
+    for date_str in dates:
+        cached = availability_cache.cached_snapshot(date_str, booker.get_availability_snapshot)
+        if cached is None:
+            missing.append(date_str)
+        else:
+            results[date_str] = cached[0]
+
+    if missing:
+        results.update(single_flight.do(("availability-scan", tuple(missing)), _scrape_dates, missing, concurrency))
+
+    failed = sum(1 for date_str in missing if not results.get(date_str))
+    logger.info(f"[AvailabilityScanner] Scanned {len(dates)} date(s) ({len(missing) - failed} via browser, "
+                f"{len(dates) - len(missing)} from the store, {failed} failed) in {time.perf_counter() - started:.2f}s")
+    return {date_str: results.get(date_str, {}) for date_str in dates}
@@ -0,0 +1,253 @@
+import os
+import json
+import math
+import time
+import sqlite3
+import logging
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# --- Availability Store Configuration ---
+AVAILABILITY_STORE_PATH = os.getenv(
+    "AVAILABILITY_STORE_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".availability.sqlite3"),
+)
+# Lookups older than this count half as much toward a court/date's demand
+AVAILABILITY_DEMAND_HALF_LIFE_SECONDS = float(os.getenv("AVAILABILITY_DEMAND_HALF_LIFE", "600"))
+# --- End Availability Store Configuration ---
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS availability (
+    court_name TEXT NOT NULL,
+    date_str TEXT NOT NULL,
+    times TEXT NOT NULL,
+    fetched_at REAL NOT NULL,
+    last_used REAL,
+    PRIMARY KEY (court_name, date_str)
+);
+CREATE TABLE IF NOT EXISTS availability_demand (
+    court_name TEXT NOT NULL,
+    date_str TEXT NOT NULL,
+    count REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (court_name, date_str)
+);
+CREATE TABLE IF NOT EXISTS slot_events (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    at REAL NOT NULL,
+    type TEXT NOT NULL,
+    court_name TEXT NOT NULL,
+    date_str TEXT NOT NULL,
+    time TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS availability_meta (
+    name TEXT PRIMARY KEY,
+    value REAL NOT NULL
+);
+"""
+# Columns added to availability after its first release; older store files get them on open
+_ADDED_COLUMNS = {"last_used": "REAL"}
+
+# Demand below this is forgotten
+_MIN_DEMAND = 0.01
+# Slot events are kept this long for streams that reconnect
+_SLOT_EVENTS_KEPT_SECONDS = 24 * 3600
+
+CourtDate = Tuple[str, str]
+
+
+def decay(count: float, updated_at: float, now: float) -> float:
+    return count * math.pow(0.5, max(0.0, now - updated_at) / AVAILABILITY_DEMAND_HALF_LIFE_SECONDS)
+
+
+class AvailabilityStore:
+    """
+    Latest available times per (court, date), shared by every process on the host.
+
+    Backed by a SQLite file in WAL mode, so gunicorn workers read the same
+    snapshot without a network round-trip while one process writes. The
+    prefetcher on the scheduler leader is the refresher; a request that finds
+    nothing usable writes through what it had to fetch itself. Timestamps are
+    epoch seconds so ages agree across processes. Lookups are counted per
+    (court, date) with exponential decay so the refresher sees the demand of
+    every worker. Slot-added/removed events from watch mode are appended to
+    a log that any worker can tail (slot_events_after) to stream them.
+    Reads and writes mark an entry used; the size bound evicts the least
+    recently used entries.
+    """
+
+    def __init__(self, path: str = AVAILABILITY_STORE_PATH):
+        self.path = path
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+            existing = {row["name"] for row in conn.execute("PRAGMA table_info(availability)")}
+            for column, column_type in _ADDED_COLUMNS.items():
+                if column not in existing:
+                    conn.execute(f"ALTER TABLE availability ADD COLUMN {column} {column_type}")
+            conn.execute("UPDATE availability SET last_used = fetched_at WHERE last_used IS NULL")
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def put(self, date_str: str, snapshot: Dict[str, List[str]], fetched_at: Optional[float] = None,
+            max_entries: Optional[int] = None) -> int:
+        """
+        Replaces the entries of every court in snapshot for date_str. With
+        max_entries, the least recently used (read or written) entries beyond
+        it are evicted. Returns the number evicted.
+        """
+        fetched_at = fetched_at or time.time()
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.executemany(
+                "INSERT OR REPLACE INTO availability (court_name, date_str, times, fetched_at, last_used) "
+                "VALUES (?, ?, ?, ?, ?)",
+                [(court, date_str, json.dumps(list(times)), fetched_at, time.time()) for court, times in snapshot.items()],
+            )
+            evicted = 0
+            if max_entries is not None:
+                evicted = conn.execute(
+                    "DELETE FROM availability WHERE rowid IN (SELECT rowid FROM availability ORDER BY last_used "
+                    "LIMIT MAX(0, (SELECT COUNT(*) FROM availability) - ?))", (max_entries,)).rowcount
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return evicted
+
+    def get(self, court_name: str, date_str: str) -> Optional[Tuple[List[str], float]]:
+        """(times, fetched_at) of court_name on date_str, None if not stored. Marks the entry used."""
+        conn = self._connect()
+        row = conn.execute(
+            "SELECT times, fetched_at FROM availability WHERE court_name = ? AND date_str = ?",
+            (court_name, date_str)).fetchone()
+        if row:
+            conn.execute("UPDATE availability SET last_used = ? WHERE court_name = ? AND date_str = ?",
+                         (time.time(), court_name, date_str))
+        return (json.loads(row["times"]), row["fetched_at"]) if row else None
+
+    def get_date(self, date_str: str) -> Optional[Tuple[Dict[str, List[str]], float]]:
+        """
+        ({court_name: times}, fetched_at of its oldest entry) of every court
+        stored for date_str, None if none are. Marks the entries used.
+        """
+        conn = self._connect()
+        rows = conn.execute(
+            "SELECT court_name, times, fetched_at FROM availability WHERE date_str = ?", (date_str,)).fetchall()
+        if not rows:
+            return None
+        conn.execute("UPDATE availability SET last_used = ? WHERE date_str = ?", (time.time(), date_str))
+        return {row["court_name"]: json.loads(row["times"]) for row in rows}, min(row["fetched_at"] for row in rows)
+
+    def fetched_at(self, dates: Iterable[str]) -> Dict[CourtDate, float]:
+        """When each stored court/date on the given dates was fetched."""
+        dates = list(dates)
+        if not dates:
+            return {}
+        rows = self._connect().execute(
+            f"SELECT court_name, date_str, fetched_at FROM availability WHERE date_str IN ({','.join('?' * len(dates))})",
+            dates).fetchall()
+        return {(row["court_name"], row["date_str"]): row["fetched_at"] for row in rows}
+
+    def delete(self, date_str: Optional[str] = None):
+        """Drops the entries of one date, or everything."""
+        if date_str is None:
+            self._connect().execute("DELETE FROM availability")
+        else:
+            self._connect().execute("DELETE FROM availability WHERE date_str = ?", (date_str,))
+
+    def record_demand(self, court_name: str, date_str: str):
+        """Counts one lookup of court_name on date_str."""
+        now = time.time()
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT count, updated_at FROM availability_demand WHERE court_name = ? AND date_str = ?",
+                               (court_name, date_str)).fetchone()
+            count = decay(row["count"], row["updated_at"], now) + 1 if row else 1.0
+            conn.execute("INSERT OR REPLACE INTO availability_demand (court_name, date_str, count, updated_at) "
+                         "VALUES (?, ?, ?, ?)", (court_name, date_str, count, now))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def demand(self) -> Dict[CourtDate, float]:
+        """Current decayed lookup count of every court/date that has one."""
+        now = time.time()
+        demand = {}
+        for row in self._connect().execute("SELECT court_name, date_str, count, updated_at FROM availability_demand"):
+            value = decay(row["count"], row["updated_at"], now)
+            if value >= _MIN_DEMAND:
+                demand[(row["court_name"], row["date_str"])] = value
+        return demand
+
+    def prune(self, before_date: str) -> int:
+        """Drops entries and demand of dates before before_date (YYYY-MM-DD) and old slot events. Returns the entries removed."""
+        conn = self._connect()
+        removed = conn.execute("DELETE FROM availability WHERE date_str < ?", (before_date,)).rowcount
+        conn.execute("DELETE FROM availability_demand WHERE date_str < ?", (before_date,))
+        horizon = time.time() - AVAILABILITY_DEMAND_HALF_LIFE_SECONDS * math.log2(1 / _MIN_DEMAND)
+        conn.execute("DELETE FROM availability_demand WHERE updated_at < ?", (horizon,))
+        conn.execute("DELETE FROM slot_events WHERE at < ?", (time.time() - _SLOT_EVENTS_KEPT_SECONDS,))
+        return removed
+
+    def add_slot_events(self, events: List[Dict[str, Any]]) -> List[int]:
+        """Appends watch-mode events ({type, court_name, date, time, at}) to the log. Returns their ids."""
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            ids = [conn.execute("INSERT INTO slot_events (at, type, court_name, date_str, time) VALUES (?, ?, ?, ?, ?)",
+                                (event["at"], event["type"], event["court_name"], event["date"], event["time"])).lastrowid
+                   for event in events]
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return ids
+
+    def slot_events_after(self, last_id: int, limit: int = 100) -> List[Dict[str, Any]]:
+        """Events logged after event last_id, oldest first."""
+        rows = self._connect().execute(
+            "SELECT id, at, type, court_name, date_str, time FROM slot_events WHERE id > ? ORDER BY id LIMIT ?",
+            (last_id, limit)).fetchall()
+        return [{"id": row["id"], "at": row["at"], "type": row["type"], "court_name": row["court_name"],
+                 "date": row["date_str"], "time": row["time"]} for row in rows]
+
+    def last_slot_event_id(self) -> int:
+        return self._connect().execute("SELECT COALESCE(MAX(id), 0) FROM slot_events").fetchone()[0]
+
+    def beat(self, name: str):
+        """Records that a process playing role name (e.g. the prefetcher) is alive."""
+        self._connect().execute("INSERT OR REPLACE INTO availability_meta (name, value) VALUES (?, ?)", (name, time.time()))
+
+    def last_beat(self, name: str) -> Optional[float]:
+        row = self._connect().execute("SELECT value FROM availability_meta WHERE name = ?", (name,)).fetchone()
+        return row["value"] if row else None
+
+    def stats(self) -> Dict[str, Any]:
+        row = self._connect().execute(
+            "SELECT COUNT(*) AS entries, COUNT(DISTINCT date_str) AS dates, MIN(fetched_at) AS oldest, "
+            "MAX(fetched_at) AS newest FROM availability").fetchone()
+        now = time.time()
+        return {
+            "path": self.path,
+            "entries": row["entries"],
+            "dates": row["dates"],
+            "oldest_age_seconds": round(now - row["oldest"], 1) if row["oldest"] else None,
+            "newest_age_seconds": round(now - row["newest"], 1) if row["newest"] else None,
+        }
+
+
+availability_store = AvailabilityStore()
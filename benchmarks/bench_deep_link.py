@@ -0,0 +1,78 @@
+"""
+Benchmark: deep-linked listing vs. the calendar click path.
+
+Opens the rec.us page fixture for a date either straight from the URL
+(?date=...) or by clicking through the calendar, and reports both timings.
+A third pass renames the date parameter so the fixture ignores it, which
+checks that an unsupported deep link is detected and falls back to clicking.
+
+Usage:
+    python benchmarks/bench_deep_link.py [--runs N] [--days-ahead N]
+"""
+import os
+import sys
+import time
+import argparse
+import statistics
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from playwright.sync_api import sync_playwright
+
+import recus_navigator
+from automation import TennisBooker, parse_availability_snapshot
+from recus_navigator import DeepLinkNavigator
+from benchmarks.bench_waits import serve_fixture, report, COURT_NAME
+
+
+def time_navigation(browser, booker: TennisBooker, navigator: DeepLinkNavigator, target_date: datetime, runs: int):
+    durations, methods, result = [], [], None
+    for _ in range(runs):
+        context = browser.new_context(java_script_enabled=True)
+        serve_fixture(context)
+        page = context.new_page()
+        started = time.perf_counter()
+        methods.append(navigator.navigate(page, target_date, lambda: booker._navigate_to_date(page, target_date)))
+        durations.append(time.perf_counter() - started)
+        result = parse_availability_snapshot(page.content()).get(COURT_NAME, [])
+        context.close()
+    return durations, methods, result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--days-ahead", type=int, default=6)
+    args = parser.parse_args()
+
+    target_date = datetime.now() + timedelta(days=args.days_ahead)
+    booker = TennisBooker("bench@example.com", "unused")
+    print(f"Fixture listing for {COURT_NAME} on {target_date:%Y-%m-%d}, {args.runs} run(s) each")
+
+    with sync_playwright() as playwright:
+        browser = playwright.chromium.launch(headless=True)
+
+        recus_navigator.REC_US_DEEP_LINK_ENABLED = False
+        click_durations, _, click_times = time_navigation(browser, booker, DeepLinkNavigator(), target_date, args.runs)
+
+        recus_navigator.REC_US_DEEP_LINK_ENABLED = True
+        navigator = DeepLinkNavigator()
+        link_durations, link_methods, link_times = time_navigation(browser, booker, navigator, target_date, args.runs)
+
+        recus_navigator.DEEP_LINK_PARAMS["date"] = "unsupported-date"
+        _, fallback_methods, fallback_times = time_navigation(browser, booker, DeepLinkNavigator(), target_date, 1)
+
+        browser.close()
+
+    report("click path", click_durations)
+    report("deep link", link_durations)
+    print(f"Median time saved per navigation: "
+          f"{(statistics.median(click_durations) - statistics.median(link_durations)) * 1000:.0f} ms")
+    print(f"Deep link methods: {link_methods}")
+    print(f"Unsupported deep link handled via: {fallback_methods[0]}")
+    if not (click_times == link_times == fallback_times):
+        print(f"WARNING: results differ\n  click path: {click_times}\n  deep link:  {link_times}\n"
+              f"  fallback:   {fallback_times}")
+    else:
+        print(f"All paths returned the same {len(click_times)} slot(s)")
@@ -0,0 +1,113 @@
+"""
+Benchmark: availability parser backends over the saved page corpus.
+
+For every page in benchmarks/fixtures/parser_corpus/ and every installed
+backend in availability_parser.PARSERS, checks the result is identical to the
+html.parser reference and reports the median parse time and peak memory.
+Peak memory is measured in a fresh subprocess per backend and page (growth of
+max RSS during one parse, which includes C-level allocations of lxml and
+lexbor) alongside the tracemalloc peak of Python objects.
+
+Usage:
+    python benchmarks/bench_parsers.py [--runs N]
+"""
+import os
+import sys
+import glob
+import json
+import time
+import logging
+import argparse
+import resource
+import statistics
+import subprocess
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import availability_parser
+from availability_parser import PARSERS, parse_availability_snapshot
+
+CORPUS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "parser_corpus")
+
+
+def _status_kb(field: str) -> int:
+    with open("/proc/self/status") as status_file:
+        for line in status_file:
+            if line.startswith(field + ":"):
+                return int(line.split()[1])
+    raise KeyError(field)
+
+
+def _reset_peak_rss() -> bool:
+    """Resets the kernel's RSS high-water mark for this process (Linux 4.0+)."""
+    try:
+        with open("/proc/self/clear_refs", "w") as clear_refs:
+            clear_refs.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def measure_memory(backend: str, path: str):
+    """Runs in a child process: prints the RSS growth and tracemalloc peak of one parse, in KB."""
+    with open(path, encoding="utf-8") as f:
+        html = f.read()
+    if _reset_peak_rss():
+        rss_before = _status_kb("VmRSS")
+        read_peak = lambda: _status_kb("VmHWM")
+    else:
+        rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        read_peak = lambda: resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    tracemalloc.start()
+    parse_availability_snapshot(html, backend)
+    _, python_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    rss_growth = read_peak() - rss_before
+    print(json.dumps({"rss_kb": rss_growth, "python_kb": python_peak // 1024}))
+
+
+def child_memory(backend: str, path: str):
+    output = subprocess.run([sys.executable, __file__, "--memory", backend, path],
+                            check=True, capture_output=True, text=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--memory", nargs=2, metavar=("BACKEND", "PAGE"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    # The edge-case page logs a warning per odd slot label; keep the report readable
+    logging.basicConfig(level=logging.CRITICAL)
+
+    if args.memory:
+        measure_memory(*args.memory)
+        sys.exit(0)
+
+    pages = sorted(glob.glob(os.path.join(CORPUS_DIR, "*.html")))
+    print(f"Backends: {', '.join(PARSERS)} (default: {availability_parser.AVAILABILITY_PARSER}); {args.runs} run(s) per page")
+    print(f"{'page':<20} {'backend':<12} {'median ms':>10} {'min ms':>8} {'peak RSS KB':>12} {'py peak KB':>11}  result")
+
+    mismatches = 0
+    for path in pages:
+        with open(path, encoding="utf-8") as f:
+            html = f.read()
+        reference = parse_availability_snapshot(html, "html.parser")
+        slots = sum(len(times) for times in reference.values())
+        for backend in PARSERS:
+            durations = []
+            for _ in range(args.runs):
+                started = time.perf_counter()
+                result = parse_availability_snapshot(html, backend)
+                durations.append(time.perf_counter() - started)
+            memory = child_memory(backend, path)
+            same = result == reference
+            mismatches += not same
+            print(f"{os.path.basename(path):<20} {backend:<12} {statistics.median(durations) * 1000:>10.2f} "
+                  f"{min(durations) * 1000:>8.2f} {memory['rss_kb']:>12} {memory['python_kb']:>11}  "
+                  f"{'identical' if same else 'DIFFERS'} ({len(reference)} courts, {slots} slots)")
+
+    if mismatches:
+        print(f"{mismatches} backend result(s) differ from html.parser")
+        sys.exit(1)
@@ -0,0 +1,117 @@
+"""
+Benchmark: fixed sleeps vs. event-driven waits in the availability flow.
+
+Runs TennisBooker._get_availability_snapshot end to end against the recorded
+rec.us fixture (benchmarks/fixtures/rec_us_org_page.html), once with the
+current readiness-signal waits and once with the fixed sleeps the flow used
+before (500 ms per calendar month, 5 s after clicking the day).
+
+Usage:
+    python benchmarks/bench_waits.py [--runs N] [--days-ahead N]
+"""
+import os
+import sys
+import time
+import types
+import argparse
+import statistics
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from playwright.sync_api import sync_playwright
+
+import automation
+import recus_navigator
+from automation import TennisBooker, REC_US_ORG_URL, MONTH_CAPTION_SELECTOR
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+COURT_NAME = "Alice Marble Tennis Courts"
+
+
+def serve_fixture(context, fixture_name: str = "rec_us_org_page.html"):
+    """Routes the rec.us organization page to a local fixture and blocks all other traffic."""
+    with open(os.path.join(FIXTURE_DIR, fixture_name), encoding="utf-8") as f:
+        html = f.read()
+
+    def handle(route):
+        if route.request.url.split("?")[0] == REC_US_ORG_URL:
+            route.fulfill(status=200, content_type="text/html; charset=utf-8", body=html)
+        else:
+            route.abort()
+
+    context.route("**/*", handle)
+
+
+def _legacy_navigate_to_date(self, page, target_date):
+    """The click path as it was before readiness waits: fixed sleeps between steps."""
+    target_day = str(target_date.day)
+    target_month = target_date.strftime("%B")
+    target_year = target_date.strftime("%Y")
+
+    page.goto(REC_US_ORG_URL, wait_until="networkidle")
+    page.wait_for_selector("a.no-underline.hover\\:underline", state="attached")
+    page.wait_for_selector('button.rounded-2xl.border.border-gray-200.px-4.py-1.hover\\:border-black.bg-gray-200',
+                           state="visible", timeout=5000).click()
+    page.wait_for_selector('.rdp', state="visible")
+    for _ in range(12):
+        current_month, current_year = page.locator(MONTH_CAPTION_SELECTOR).text_content().strip().split()
+        if current_month == target_month and current_year == target_year:
+            break
+        page.locator('button[name="next-month"]').click()
+        page.wait_for_timeout(500)
+    page.locator(f'button[name="day"]:has-text("{target_day}"):not(.day-outside):not(.opacity-50)').first.click()
+    page.wait_for_timeout(5000)
+
+
+def time_flow(browser, booker: TennisBooker, date_str: str, runs: int):
+    durations = []
+    result = None
+    for _ in range(runs):
+        context = browser.new_context(java_script_enabled=True)
+        serve_fixture(context)
+        started = time.perf_counter()
+        result = booker._get_availability_snapshot(context, date_str).get(COURT_NAME, [])
+        durations.append(time.perf_counter() - started)
+        context.close()
+    return durations, result
+
+
+def report(label: str, durations):
+    print(f"{label:<14} median {statistics.median(durations) * 1000:8.0f} ms   "
+          f"min {min(durations) * 1000:8.0f} ms   max {max(durations) * 1000:8.0f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--days-ahead", type=int, default=6,
+                        help="target date offset; crossing a month boundary exercises next-month waits")
+    args = parser.parse_args()
+    # Both runs should take the calendar click path this benchmark is about
+    recus_navigator.REC_US_DEEP_LINK_ENABLED = False
+
+    date_str = (datetime.now() + timedelta(days=args.days_ahead)).strftime("%Y-%m-%d")
+    print(f"Fixture availability scrape for {COURT_NAME} on {date_str}, {args.runs} run(s) each")
+    print(f"Step budgets: {automation.STEP_TIMEOUTS_MS}")
+
+    with sync_playwright() as playwright:
+        browser = playwright.chromium.launch(headless=True)
+
+        legacy = TennisBooker("bench@example.com", "unused")
+        legacy._navigate_to_date = types.MethodType(_legacy_navigate_to_date, legacy)
+        legacy_durations, legacy_times = time_flow(browser, legacy, date_str, args.runs)
+
+        current = TennisBooker("bench@example.com", "unused")
+        current_durations, current_times = time_flow(browser, current, date_str, args.runs)
+
+        browser.close()
+
+    report("fixed sleeps", legacy_durations)
+    report("event waits", current_durations)
+    saved = statistics.median(legacy_durations) - statistics.median(current_durations)
+    print(f"Median time saved per scrape: {saved * 1000:.0f} ms")
+    if legacy_times != current_times:
+        print(f"WARNING: results differ\n  fixed sleeps: {legacy_times}\n  event waits:  {current_times}")
+    else:
+        print(f"Both flows returned the same {len(current_times)} slot(s)")
@@ -0,0 +1,179 @@
+import os
+import json
+import time
+import sqlite3
+import logging
+import threading
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# --- Queue Configuration ---
+BOOKING_QUEUE_PATH = os.getenv(
+    "BOOKING_QUEUE_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".booking_queue.sqlite3"),
+)
+# --- End Queue Configuration ---
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS booking_jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    attempt_id INTEGER NOT NULL,
+    payload TEXT NOT NULL DEFAULT '{}',
+    status TEXT NOT NULL DEFAULT 'queued',
+    run_at REAL NOT NULL,
+    enqueued_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    worker_pid INTEGER,
+    error TEXT,
+    dedupe_key TEXT
+);
+CREATE INDEX IF NOT EXISTS booking_jobs_ready ON booking_jobs (status, run_at);
+CREATE INDEX IF NOT EXISTS booking_jobs_attempt ON booking_jobs (attempt_id);
+"""
+
+# Columns added after the first release of the queue file
+_ADDED_COLUMNS = {"dedupe_key": "TEXT"}
+
+
+def _pid_alive(pid: Optional[int]) -> bool:
+    if not pid:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class BookingQueue:
+    """
+    Durable local queue of booking attempts, shared by the web app and worker.py.
+
+    Backed by a SQLite file in WAL mode so any number of processes on the host
+    can enqueue and claim. Jobs survive restarts; a job left 'running' by a
+    worker process that died is put back in the queue by requeue_orphaned().
+    """
+
+    def __init__(self, path: str = BOOKING_QUEUE_PATH):
+        self.path = path
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+            existing = {row["name"] for row in conn.execute("PRAGMA table_info(booking_jobs)")}
+            for column, column_type in _ADDED_COLUMNS.items():
+                if column not in existing:
+                    conn.execute(f"ALTER TABLE booking_jobs ADD COLUMN {column} {column_type}")
+            conn.execute("CREATE INDEX IF NOT EXISTS booking_jobs_dedupe ON booking_jobs (dedupe_key, status)")
+
+    def _connect(self) -> sqlite3.Connection:
+        # A connection inherited across fork (worker.py opens the queue before
+        # starting its children) must not be used by the child: reconnect per pid
+        conn = getattr(self._local, "conn", None)
+        if conn is None or getattr(self._local, "pid", None) != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def enqueue(self, attempt_id: int, payload: Optional[Dict[str, Any]] = None, run_at: Optional[float] = None,
+                dedupe_key: Optional[str] = None) -> int:
+        """
+        Adds a booking job, runnable from run_at (epoch seconds, default now).
+        If another attempt already has a queued or running job with the same
+        dedupe_key (the same user, court and slot), no job is added and that
+        job's id is returned instead. Returns the job id.
+        """
+        now = time.time()
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if dedupe_key:
+                duplicate = conn.execute(
+                    "SELECT id, attempt_id FROM booking_jobs WHERE dedupe_key = ? AND status IN ('queued', 'running') "
+                    "AND attempt_id != ? ORDER BY id LIMIT 1", (dedupe_key, attempt_id)).fetchone()
+                if duplicate:
+                    conn.execute("COMMIT")
+                    logger.info(f"[BookingQueue] Attempt {attempt_id} collapsed into job {duplicate['id']} "
+                                f"of attempt {duplicate['attempt_id']}")
+                    return duplicate["id"]
+            cursor = conn.execute(
+                "INSERT INTO booking_jobs (attempt_id, payload, run_at, enqueued_at, dedupe_key) VALUES (?, ?, ?, ?, ?)",
+                (attempt_id, json.dumps(payload or {}), run_at or now, now, dedupe_key),
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        logger.info(f"[BookingQueue] Enqueued attempt {attempt_id} as job {cursor.lastrowid}")
+        return cursor.lastrowid
+
+    def claim(self) -> Optional[Dict[str, Any]]:
+        """Atomically takes the oldest runnable job for this process, or returns None."""
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT * FROM booking_jobs WHERE status = 'queued' AND run_at <= ? ORDER BY run_at, id LIMIT 1",
+                (time.time(),),
+            ).fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+            conn.execute(
+                "UPDATE booking_jobs SET status = 'running', started_at = ?, worker_pid = ? WHERE id = ?",
+                (time.time(), os.getpid(), row["id"]),
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        job = dict(row, status="running", worker_pid=os.getpid())
+        job["payload"] = json.loads(job["payload"])
+        return job
+
+    def finish(self, job_id: int, error: Optional[str] = None):
+        self._connect().execute(
+            "UPDATE booking_jobs SET status = ?, finished_at = ?, error = ? WHERE id = ?",
+            ("failed" if error else "done", time.time(), error, job_id),
+        )
+
+    def requeue_orphaned(self) -> int:
+        """Puts jobs whose worker process is gone back in the queue. Returns how many."""
+        conn = self._connect()
+        orphaned = [row["id"] for row in conn.execute(
+            "SELECT id, worker_pid FROM booking_jobs WHERE status = 'running'") if not _pid_alive(row["worker_pid"])]
+        for job_id in orphaned:
+            conn.execute("UPDATE booking_jobs SET status = 'queued', worker_pid = NULL WHERE id = ?", (job_id,))
+        if orphaned:
+            logger.warning(f"[BookingQueue] Re-queued {len(orphaned)} job(s) left running by dead workers")
+        return len(orphaned)
+
+    def jobs_for_attempt(self, attempt_id: int) -> List[Dict[str, Any]]:
+        rows = self._connect().execute(
+            "SELECT id, status, run_at, enqueued_at, started_at, finished_at, error FROM booking_jobs "
+            "WHERE attempt_id = ? ORDER BY id", (attempt_id,)).fetchall()
+        return [dict(row) for row in rows]
+
+    def position(self, job_id: int) -> Optional[int]:
+        """How many runnable jobs are ahead of job_id (0 = next), or None if it is not queued."""
+        conn = self._connect()
+        row = conn.execute("SELECT run_at, status FROM booking_jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None or row["status"] != "queued":
+            return None
+        return conn.execute(
+            "SELECT COUNT(*) FROM booking_jobs WHERE status = 'queued' AND (run_at < ? OR (run_at = ? AND id < ?))",
+            (row["run_at"], row["run_at"], job_id)).fetchone()[0]
+
+    def stats(self) -> Dict[str, int]:
+        rows = self._connect().execute("SELECT status, COUNT(*) AS n FROM booking_jobs GROUP BY status").fetchall()
+        return {row["status"]: row["n"] for row in rows}
+
+
+booking_queue = BookingQueue()
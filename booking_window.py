@@ -0,0 +1,76 @@
+import os
+import json
+import logging
+from datetime import datetime, time, timedelta
+from typing import Any, Dict, List
+from zoneinfo import ZoneInfo
+
+logger = logging.getLogger(__name__)
+
+SF_TIMEZONE = ZoneInfo("America/Los_Angeles")
+
+# --- Booking Window Configuration ---
+# A rule says how many days ahead a slot becomes bookable and at what local
+# time. release_time "rolling" means at the slot's own start time, i.e.
+# exactly days_ahead * 24h before play. BOOKING_WINDOW_RULES (JSON) overrides
+# the default and can add per-court rules keyed by court name, e.g.
+#   {"default": {"days_ahead": 7, "release_time": "08:00"},
+#    "Alice Marble Tennis Courts": {"days_ahead": 2, "release_time": "rolling"}}
+DEFAULT_RULE = {"days_ahead": 7, "release_time": "08:00"}
+# Pre-warm (session refresh, browser launch) this long before the release instant
+PREWARM_LEAD_SECONDS = int(os.getenv("PREWARM_LEAD_SECONDS", "300"))
+# Extra attempts after the release-instant fire, in seconds after release
+RETRY_OFFSETS_SECONDS = [float(s) for s in os.getenv("BOOKING_RETRY_OFFSETS", "5,15,45").split(",") if s.strip()]
+# --- End Booking Window Configuration ---
+
+
+def _load_rules() -> Dict[str, Dict[str, Any]]:
+    rules = {"default": dict(DEFAULT_RULE)}
+    raw = os.getenv("BOOKING_WINDOW_RULES")
+    if raw:
+        try:
+            rules.update(json.loads(raw))
+        except ValueError as e:
+            logger.error(f"[booking_window] Ignoring invalid BOOKING_WINDOW_RULES: {str(e)}")
+    return rules
+
+
+BOOKING_WINDOW_RULES = _load_rules()
+
+
+def rule_for(court_name: str) -> Dict[str, Any]:
+    return {**BOOKING_WINDOW_RULES["default"], **BOOKING_WINDOW_RULES.get(court_name, {})}
+
+
+def release_instant(court_name: str, booking_time: datetime) -> datetime:
+    """The moment (SF time) the slot at booking_time on court_name becomes bookable."""
+    rule = rule_for(court_name)
+    local_booking_time = booking_time.astimezone(SF_TIMEZONE) if booking_time.tzinfo else booking_time.replace(tzinfo=SF_TIMEZONE)
+    release_day = local_booking_time.date() - timedelta(days=int(rule["days_ahead"]))
+    if rule["release_time"] == "rolling":
+        release_clock = local_booking_time.time().replace(tzinfo=None)
+    else:
+        hour, minute = (int(part) for part in rule["release_time"].split(":"))
+        release_clock = time(hour, minute)
+    return datetime.combine(release_day, release_clock, tzinfo=SF_TIMEZONE)
+
+
+def job_chain(release_at: datetime, prestage_lead_seconds: float, now: datetime) -> List[Dict[str, Any]]:
+    """
+    The jobs to register for one attempt as [{"phase", "run_date"}, ...]:
+    a pre-warm at T-PREWARM_LEAD_SECONDS, the fire (started prestage_lead_seconds
+    early so the page is staged when T0 arrives) and a burst of retries after
+    T0. Phases whose time has already passed are left out; if the release
+    instant itself is past, only retries counted from now remain.
+    """
+    if release_at <= now:
+        return [{"phase": "retry", "run_date": now + timedelta(seconds=offset)} for offset in RETRY_OFFSETS_SECONDS]
+
+    chain = []
+    prewarm_at = release_at - timedelta(seconds=PREWARM_LEAD_SECONDS)
+    fire_at = release_at - timedelta(seconds=prestage_lead_seconds)
+    if prewarm_at > now and prewarm_at < fire_at:
+        chain.append({"phase": "prewarm", "run_date": prewarm_at})
+    chain.append({"phase": "fire", "run_date": max(fire_at, now)})
+    chain.extend({"phase": "retry", "run_date": release_at + timedelta(seconds=offset)} for offset in RETRY_OFFSETS_SECONDS)
+    return chain
@@ -0,0 +1,276 @@
+import os
+import atexit
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional
+
+from playwright.sync_api import sync_playwright
+
+from admission import admission_controller
+from resource_profiles import apply_profile
+
+logger = logging.getLogger(__name__)
+
+# --- Pool Configuration ---
+# All values can be overridden through environment variables.
+POOL_SIZE = int(os.getenv("BROWSER_POOL_SIZE", "2"))
+# Recycle a browser after it has served this many contexts
+MAX_USES_PER_BROWSER = int(os.getenv("BROWSER_POOL_MAX_USES", "50"))
+# Recycle a browser once its process tree uses more than this much memory
+MAX_BROWSER_RSS_MB = int(os.getenv("BROWSER_POOL_MAX_RSS_MB", "600"))
+# How long a caller waits for a free browser before giving up
+BORROW_TIMEOUT_SECONDS = float(os.getenv("BROWSER_POOL_BORROW_TIMEOUT", "120"))
+# --- End Pool Configuration ---
+
+# Sync Playwright objects are bound to the thread that created them, so each
+# pooled browser lives on its own worker thread and callers hand work to it.
+_driver_start_lock = threading.Lock()
+
+
+def _child_pids(pid: int) -> List[int]:
+    """Returns the direct children of a process (Linux /proc only)."""
+    children = []
+    try:
+        for entry in os.listdir("/proc"):
+            if not entry.isdigit():
+                continue
+            try:
+                with open(f"/proc/{entry}/stat") as stat_file:
+                    # Field 4 is the parent pid; split after the ')' of the comm field
+                    fields = stat_file.read().rsplit(")", 1)[1].split()
+                if int(fields[1]) == pid:
+                    children.append(int(entry))
+            except (OSError, IndexError, ValueError):
+                continue
+    except OSError:
+        pass
+    return children
+
+
+def _tree_rss_mb(root_pid: int) -> Optional[float]:
+    """Sums the resident memory of a process and all of its descendants."""
+    total_kb = 0
+    pending = [root_pid]
+    seen = set()
+    while pending:
+        pid = pending.pop()
+        if pid in seen:
+            continue
+        seen.add(pid)
+        try:
+            with open(f"/proc/{pid}/status") as status_file:
+                for line in status_file:
+                    if line.startswith("VmRSS:"):
+                        total_kb += int(line.split()[1])
+                        break
+        except (OSError, ValueError):
+            if pid == root_pid:
+                return None
+            continue
+        pending.extend(_child_pids(pid))
+    return total_kb / 1024.0
+
+
+class _PooledBrowser(threading.Thread):
+    """A worker thread that owns one Playwright driver and one Chromium browser."""
+
+    def __init__(self, pool: "BrowserPool", index: int):
+        super().__init__(name=f"browser-pool-{index}", daemon=True)
+        self.pool = pool
+        self.index = index
+        self.tasks: "queue.Queue[Optional[tuple]]" = queue.Queue()
+        self.playwright = None
+        self.browser = None
+        self.driver_pid: Optional[int] = None
+        self.uses = 0
+        self.launches = 0
+
+    # --- Browser lifecycle (worker thread only) ---
+    def _launch(self):
+        with _driver_start_lock:
+            existing_children = set(_child_pids(os.getpid()))
+            self.playwright = sync_playwright().start()
+            new_children = set(_child_pids(os.getpid())) - existing_children
+        # The Playwright driver is the only process spawned while the lock is held
+        self.driver_pid = new_children.pop() if len(new_children) == 1 else None
+        self.browser = self.playwright.chromium.launch(headless=True)
+        self.uses = 0
+        self.launches += 1
+        logger.info(f"[BrowserPool] Browser {self.index} launched (launch #{self.launches}, driver pid {self.driver_pid})")
+
+    def _close(self):
+        try:
+            if self.browser:
+                self.browser.close()
+        except Exception as e:
+            logger.warning(f"[BrowserPool] Error closing browser {self.index}: {str(e)}")
+        try:
+            if self.playwright:
+                self.playwright.stop()
+        except Exception as e:
+            logger.warning(f"[BrowserPool] Error stopping Playwright driver {self.index}: {str(e)}")
+        self.browser = None
+        self.playwright = None
+        self.driver_pid = None
+
+    def rss_mb(self) -> Optional[float]:
+        """Memory used by this browser's driver and Chromium processes, if measurable."""
+        if not self.driver_pid:
+            return None
+        return _tree_rss_mb(self.driver_pid)
+
+    def _is_healthy(self) -> bool:
+        try:
+            return self.browser is not None and self.browser.is_connected()
+        except Exception:
+            return False
+
+    def _needs_recycle(self) -> bool:
+        if self.uses >= MAX_USES_PER_BROWSER:
+            logger.info(f"[BrowserPool] Browser {self.index} reached {self.uses} uses; recycling.")
+            return True
+        rss = self.rss_mb()
+        if rss is not None and rss > MAX_BROWSER_RSS_MB:
+            logger.info(f"[BrowserPool] Browser {self.index} using {rss:.0f} MB (> {MAX_BROWSER_RSS_MB} MB); recycling.")
+            return True
+        return False
+
+    # --- Task execution ---
+    def run(self):
+        while True:
+            task = self.tasks.get()
+            if task is None:
+                break
+            func, args, kwargs, context_options, profile, future = task
+            if not future.set_running_or_notify_cancel():
+                self.pool._release(self)
+                continue
+            try:
+                if not self._is_healthy():
+                    if self.browser is not None:
+                        logger.warning(f"[BrowserPool] Browser {self.index} failed health check; relaunching.")
+                    self._close()
+                    self._launch()
+                context = self.browser.new_context(java_script_enabled=True, **(context_options or {}))
+                self.uses += 1
+                stats = apply_profile(context, profile) if profile else None
+                try:
+                    future.set_result(func(context, *args, **kwargs))
+                finally:
+                    if stats:
+                        stats.finish()
+                    try:
+                        context.close()
+                    except Exception as e:
+                        logger.warning(f"[BrowserPool] Error closing context on browser {self.index}: {str(e)}")
+            except BaseException as e:
+                future.set_exception(e)
+            try:
+                if self._is_healthy() and self._needs_recycle():
+                    self._close()
+            except Exception as e:
+                logger.error(f"[BrowserPool] Error recycling browser {self.index}: {str(e)}")
+            self.pool._release(self)
+        self._close()
+
+
+class BrowserPool:
+    """
+    Process-wide pool of warm Chromium browsers.
+
+    Each call to run() borrows an idle browser, opens a fresh isolated context
+    on it, calls func(context, *args, **kwargs) on the browser's own thread and
+    closes the context afterwards. Browsers are launched lazily, health-checked
+    before each use and recycled after too many uses or too much memory.
+    """
+
+    def __init__(self, size: int = POOL_SIZE):
+        self.size = max(1, size)
+        self._workers: List[_PooledBrowser] = []
+        self._idle: "queue.Queue[_PooledBrowser]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def _ensure_workers(self):
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("Browser pool has been shut down")
+            while len(self._workers) < self.size:
+                worker = _PooledBrowser(self, len(self._workers))
+                worker.start()
+                self._workers.append(worker)
+                self._idle.put(worker)
+
+    def _release(self, worker: _PooledBrowser):
+        self._idle.put(worker)
+
+    def run(self, func: Callable[..., Any], *args,
+            context_options: Optional[Dict[str, Any]] = None,
+            profile: Optional[str] = None,
+            timeout: Optional[float] = None,
+            admission_kind: Optional[str] = None, **kwargs) -> Any:
+        """
+        Runs func with a new browser context from the pool and returns its result.
+
+        Args:
+            func: Callable taking a Playwright BrowserContext as its first argument
+            context_options: Extra keyword arguments for browser.new_context()
+            profile: Name of a resource profile from resource_profiles.PROFILES to apply to the context
+            timeout: Seconds to wait for a free browser (defaults to BORROW_TIMEOUT_SECONDS)
+            admission_kind: 'book', 'scrape' or 'watch' for the admission controller
+                (defaults to 'book' for the "book" profile, else 'scrape')
+
+        Raises:
+            TimeoutError: If no browser became free in time
+            AdmissionRejected: If this is scrape work and the admission queue is saturated
+        """
+        self._ensure_workers()
+        wait_started = time.monotonic()
+        with admission_controller.admit(admission_kind or ("book" if profile == "book" else "scrape"),
+                                        timeout=timeout or BORROW_TIMEOUT_SECONDS):
+            try:
+                worker = self._idle.get(timeout=timeout or BORROW_TIMEOUT_SECONDS)
+            except queue.Empty:
+                raise TimeoutError("Timed out waiting for a free browser in the pool")
+            logger.debug(f"[BrowserPool] Borrowed browser {worker.index} after {time.monotonic() - wait_started:.3f}s")
+
+            future: Future = Future()
+            worker.tasks.put((func, args, kwargs, context_options, profile, future))
+            return future.result()
+
+    def stats(self) -> Dict[str, Any]:
+        """Current pool state for logging and debugging."""
+        return {
+            "size": self.size,
+            "started": len(self._workers),
+            "idle": self._idle.qsize(),
+            "browsers": [
+                {
+                    "index": worker.index,
+                    "uses": worker.uses,
+                    "launches": worker.launches,
+                    "rss_mb": worker.rss_mb(),
+                }
+                for worker in self._workers
+            ],
+        }
+
+    def shutdown(self, timeout: float = 10):
+        """Stops all workers and closes their browsers."""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            workers = list(self._workers)
+        logger.info(f"[BrowserPool] Shutting down {len(workers)} browser(s)")
+        for worker in workers:
+            worker.tasks.put(None)
+        for worker in workers:
+            worker.join(timeout=timeout)
+
+
+browser_pool = BrowserPool()
+atexit.register(browser_pool.shutdown)
@@ -0,0 +1,161 @@
+import os
+import time
+import logging
+import statistics
+import threading
+from collections import deque
+from email.utils import parsedate_to_datetime
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+# --- Clock Sync Configuration ---
+# Any rec.us URL that answers quickly with a Date header
+CLOCK_SYNC_URL = os.getenv("CLOCK_SYNC_URL", "https://www.rec.us/organizations/san-francisco-rec-park")
+# Requests per calibration; spread over sub-second phases, so this many take about as many seconds
+CLOCK_SYNC_SAMPLES = int(os.getenv("CLOCK_SYNC_SAMPLES", "8"))
+# Recalibrate before a fire when the estimate is older than this
+CLOCK_SYNC_MAX_AGE_SECONDS = float(os.getenv("CLOCK_SYNC_MAX_AGE", "900"))
+CLOCK_SYNC_TIMEOUT_SECONDS = float(os.getenv("CLOCK_SYNC_TIMEOUT", "5"))
+# --- End Clock Sync Configuration ---
+
+# Recent fire errors kept for the metrics percentiles
+_FIRE_SAMPLES = 200
+
+# (local send time, local receive time, server Date header as epoch seconds)
+Sample = Tuple[float, float, float]
+
+
+def offset_bounds(sample: Sample) -> Tuple[float, float]:
+    """
+    Bounds on (server clock - local clock) from one request. The server
+    stamped its Date somewhere between send and receive, and the header is
+    truncated to the second, so the true server time was in [date, date + 1).
+    """
+    sent, received, server = sample
+    return server - received, server + 1 - sent
+
+
+def estimate_offset(samples: List[Sample]) -> Dict[str, float]:
+    """
+    NTP-style estimate from several samples. Each sample bounds the offset
+    (see offset_bounds); samples taken at different sub-second phases
+    narrow the intersection of those bounds well below the header's
+    one-second resolution. If the bounds disagree (a cached or skewed
+    response), falls back to the median of the RTT-midpoint estimates.
+    """
+    bounds = [offset_bounds(sample) for sample in samples]
+    low = max(bound[0] for bound in bounds)
+    high = min(bound[1] for bound in bounds)
+    rtts = [received - sent for sent, received, _ in samples]
+    midpoints = [server + 0.5 - (sent + received) / 2 for sent, received, server in samples]
+    if low <= high:
+        offset, uncertainty, method = (low + high) / 2, (high - low) / 2, "intersection"
+    else:
+        offset, uncertainty, method = statistics.median(midpoints), 0.5 + max(rtts) / 2, "midpoint"
+    return {
+        "offset": offset,
+        "uncertainty": uncertainty,
+        "rtt_min": min(rtts),
+        "rtt_jitter": statistics.pstdev(rtts),
+        "method": method,
+    }
+
+
+class ClockSync:
+    """
+    Estimates how far the local clock is from rec.us's.
+
+    calibrate() sends CLOCK_SYNC_SAMPLES HEAD requests to CLOCK_SYNC_URL and
+    estimates the offset from their Date headers and round-trip times (see
+    estimate_offset). to_local() turns a rec.us instant (e.g. a slot's release
+    time) into the local time to act at. Pre-staged bookings report how far
+    from that instant they fired through record_fire(); stats() has both.
+    """
+
+    def __init__(self, url: str = CLOCK_SYNC_URL, samples: int = CLOCK_SYNC_SAMPLES):
+        self.url = url
+        self.samples = max(1, samples)
+        self._session = requests.Session()
+        self._lock = threading.Lock()
+        self._estimate: Optional[Dict[str, Any]] = None
+        self._fire_errors_ms: Deque[float] = deque(maxlen=_FIRE_SAMPLES)
+
+    def _sample(self) -> Optional[Sample]:
+        sent = time.time()
+        response = self._session.head(self.url, timeout=CLOCK_SYNC_TIMEOUT_SECONDS, allow_redirects=False)
+        received = time.time()
+        date_header = response.headers.get("Date")
+        if not date_header:
+            return None
+        return sent, received, parsedate_to_datetime(date_header).timestamp()
+
+    def calibrate(self) -> Optional[Dict[str, Any]]:
+        """Samples rec.us now and stores the new estimate. Returns it, or None if sampling failed."""
+        started = time.time()
+        samples: List[Sample] = []
+        for index in range(self.samples):
+            # Step the send time through the second so the one-second Date buckets split the offset range
+            time.sleep(max(0.0, started + index * (1 + 1 / self.samples) - time.time()))
+            try:
+                sample = self._sample()
+            except requests.RequestException as e:
+                logger.warning(f"[ClockSync] Sample from {self.url} failed: {str(e)}")
+                continue
+            if sample:
+                samples.append(sample)
+        if not samples:
+            logger.error("[ClockSync] No usable Date headers; keeping the previous estimate")
+            return None
+
+        estimate = {**estimate_offset(samples), "samples": len(samples), "calibrated_at": time.time()}
+        with self._lock:
+            self._estimate = estimate
+        logger.info(f"[ClockSync] rec.us clock offset {estimate['offset'] * 1000:+.0f} ms "
+                    f"(+/- {estimate['uncertainty'] * 1000:.0f} ms, RTT jitter {estimate['rtt_jitter'] * 1000:.0f} ms, "
+                    f"{estimate['method']}, {len(samples)} samples)")
+        return estimate
+
+    def ensure_fresh(self, max_age: float = CLOCK_SYNC_MAX_AGE_SECONDS):
+        with self._lock:
+            estimate = self._estimate
+        if estimate is None or time.time() - estimate["calibrated_at"] > max_age:
+            self.calibrate()
+
+    @property
+    def offset(self) -> float:
+        """Seconds to add to the local clock to get rec.us time (0 until calibrated)."""
+        with self._lock:
+            return self._estimate["offset"] if self._estimate else 0.0
+
+    def to_local(self, server_timestamp: float) -> float:
+        return server_timestamp - self.offset
+
+    def record_fire(self, error_ms: Optional[float]):
+        """Records how late (ms, negative = early) a booking fired against the release instant."""
+        if error_ms is not None:
+            with self._lock:
+                self._fire_errors_ms.append(error_ms)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            estimate = dict(self._estimate) if self._estimate else None
+            fire_errors = sorted(self._fire_errors_ms)
+        if estimate:
+            for key in ("offset", "uncertainty", "rtt_min", "rtt_jitter"):
+                estimate[f"{key}_ms"] = round(estimate.pop(key) * 1000, 1)
+            estimate["age_seconds"] = round(time.time() - estimate.pop("calibrated_at"), 1)
+        return {
+            "estimate": estimate,
+            "fire_error_ms": {
+                "count": len(fire_errors),
+                "p50": statistics.median(fire_errors) if fire_errors else None,
+                "p95": fire_errors[min(len(fire_errors) - 1, int(len(fire_errors) * 0.95))] if fire_errors else None,
+                "max_abs": max(abs(error) for error in fire_errors) if fire_errors else None,
+            },
+        }
+
+
+clock_sync = ClockSync()
@@ -1,4 +1,5 @@
 from automation import TennisBooker
+from singleflight import single_flight
 import logging
 from typing import List
 
@@ -39,8 +40,9 @@ def get_sf_tennis_courts() -> List[str]:
 def update_court_list() -> List[str]:
     """
     Gets the current list of tennis courts, with fallback to default list.
+    Concurrent syncs share one scrape.
     """
-    courts = get_sf_tennis_courts()
+    courts = single_flight.do(("courts",), get_sf_tennis_courts)
     if not courts:
         # Fallback to minimum default list if scraping fails
         courts = [
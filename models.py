@@ -1,5 +1,6 @@
 import logging
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
+import hashlib
 import json
 from typing import Dict, Any, List, Optional
 import os # Added for environment variable access
@@ -366,8 +367,13 @@ class UserInformation:
             return False
 
     @staticmethod
-    def get_and_clear_verification_code(email: str, max_age_minutes: int = 5) -> Optional[str]:
-        """Gets the latest verification code if it's recent enough, then clears it."""
+    def get_and_clear_verification_code(email: str, max_age_minutes: int = 5, since: float = 0.0) -> Optional[str]:
+        """
+        Gets the latest verification code if it's recent enough, then clears it.
+
+        A code stored before `since` (epoch seconds) is left in place and not
+        returned, so a booking never picks up the code of an earlier attempt.
+        """
         if not email:
             logger.error("get_and_clear_verification_code requires an email.")
             return None
@@ -407,6 +413,9 @@ class UserInformation:
                     # Optionally clear the expired code here as well
                     # supabase.table("users").update({"verification_code": None, "verification_code_timestamp": None}).eq("rec_account_email", email).execute()
                     return None
+                if timestamp.timestamp() < since:
+                    logger.info(f"Stored verification code for {email} (received at {timestamp_str}) predates the request; ignoring it.")
+                    return None
             except ValueError as e:
                 logger.error(f"Error parsing verification code timestamp '{timestamp_str}' for user {email}: {e}")
                 return None
@@ -430,12 +439,24 @@ class UserInformation:
             return None
 
 class BookingAttempt:
+    # Statuses of an attempt that is still going to book, or already did
+    ACTIVE_STATUSES = ("scheduled", "queued", "running", "completed")
+
     def __init__(self, court_name: str, booking_time: datetime, user_email: str, status: str = "scheduled"):
         self.court_name = court_name
         self.booking_time = booking_time
         self.status = status
         self.error_message = None
         self.user_email = user_email
+        self.idempotency_key = BookingAttempt.make_idempotency_key(user_email, court_name, booking_time)
+
+    @staticmethod
+    def make_idempotency_key(user_email: str, court_name: str, booking_time: datetime) -> str:
+        """Same user, court and slot (to the minute, in UTC) give the same key."""
+        slot = booking_time.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M") if booking_time.tzinfo \
+            else booking_time.strftime("%Y-%m-%dT%H:%M")
+        raw = f"{user_email.strip().lower()}|{court_name.strip()}|{slot}"
+        return hashlib.sha256(raw.encode()).hexdigest()[:32]
 
     def save(self) -> Optional[Dict[str, Any]]: 
         """Save booking attempt using the email provided during initialization."""
@@ -450,7 +471,8 @@ class BookingAttempt:
             "status": self.status,
             "error_message": self.error_message,
             "created_at": datetime.now().isoformat(),
-            "user_email": self.user_email 
+            "user_email": self.user_email,
+            "idempotency_key": self.idempotency_key
         }
         try:
             response = supabase.table("booking_attempts").insert(data).execute()
@@ -471,6 +493,63 @@ class BookingAttempt:
         response = supabase.table("booking_attempts").select("*").eq("id", id).execute()
         return response.data[0] if response.data else None
 
+    @staticmethod
+    def get_active_by_key(idempotency_key: str) -> Optional[Dict[str, Any]]:
+        """The scheduled, queued, running or completed attempt with this idempotency key, if any."""
+        response = supabase.table("booking_attempts").select("*") \
+            .eq("idempotency_key", idempotency_key) \
+            .in_("status", list(BookingAttempt.ACTIVE_STATUSES)) \
+            .order("id") \
+            .limit(1) \
+            .execute()
+        return response.data[0] if response.data else None
+
+    @staticmethod
+    def get_scheduled_after(after: datetime, before: Optional[datetime] = None,
+                            page_size: int = 1000) -> List[Dict[str, Any]]:
+        """
+        Attempts with status 'scheduled' whose slot is after `after` (and
+        before `before`, if given), soonest first. One query on the
+        (status, booking_time) index, read in pages of page_size rows
+        (PostgREST caps each response).
+        """
+        attempts = []
+        while True:
+            query = supabase.table("booking_attempts") \
+                .select("id, court_name, booking_time, user_email") \
+                .eq("status", "scheduled") \
+                .gt("booking_time", after.isoformat())
+            if before is not None:
+                query = query.lt("booking_time", before.isoformat())
+            response = query \
+                .order("booking_time") \
+                .order("id") \
+                .range(len(attempts), len(attempts) + page_size - 1) \
+                .execute()
+            attempts.extend(response.data or [])
+            if len(response.data or []) < page_size:
+                return attempts
+
+    @staticmethod
+    def record_timeline(id: int, timeline: Dict[str, Any]) -> bool:
+        """Stores the stage/fire/click/confirm timeline of a pre-staged attempt (jsonb `timeline` column)."""
+        try:
+            supabase.table("booking_attempts").update({"timeline": timeline}).eq("id", id).execute()
+            return True
+        except Exception as e:
+            logger.warning(f"Could not record timeline for booking attempt {id}: {str(e)}")
+            return False
+
+    @staticmethod
+    def record_tries(id: int, tries: List[Dict[str, Any]]) -> bool:
+        """Stores every booking try with its latency and error class (jsonb `tries` column)."""
+        try:
+            supabase.table("booking_attempts").update({"tries": tries}).eq("id", id).execute()
+            return True
+        except Exception as e:
+            logger.warning(f"Could not record tries for booking attempt {id}: {str(e)}")
+            return False
+
     @staticmethod
     def update_status(id: int, status: str, error_message: str = None) -> Dict[str, Any]:
         """Update booking attempt status"""
@@ -479,4 +558,48 @@ class BookingAttempt:
             "error_message": error_message
         }
         response = supabase.table("booking_attempts").update(data).eq("id", id).execute()
-        return response.data[0] if response.data else None
\ No newline at end of file
+        return response.data[0] if response.data else None
+
+
+class SlotWatch:
+    """A court/date watched for freed-up slots, optionally booked automatically (slot_watches table)."""
+
+    @staticmethod
+    def create(user_email: str, court_name: str, date: str, earliest_time: str = "00:00",
+               latest_time: str = "23:59", auto_book: bool = False) -> Optional[Dict[str, Any]]:
+        data = {
+            "user_email": user_email,
+            "court_name": court_name,
+            "date": date,
+            "earliest_time": earliest_time,
+            "latest_time": latest_time,
+            "auto_book": auto_book,
+            "status": "active",
+        }
+        try:
+            response = supabase.table("slot_watches").insert(data).execute()
+            return response.data[0] if response.data else None
+        except Exception as e:
+            logger.error(f"Error creating slot watch for {court_name} on {date}: {str(e)}")
+            return None
+
+    @staticmethod
+    def get_active(from_date: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Active watches, soonest date first; only dates on or after from_date (YYYY-MM-DD) if given."""
+        try:
+            query = supabase.table("slot_watches").select("*").eq("status", "active")
+            if from_date:
+                query = query.gte("date", from_date)
+            return query.order("date").order("id").execute().data or []
+        except Exception as e:
+            logger.error(f"Error retrieving active slot watches: {str(e)}")
+            return []
+
+    @staticmethod
+    def update_status(id: int, status: str, attempt_id: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        """Sets a watch to 'booked' (with the attempt it started) or 'cancelled'."""
+        data = {"status": status}
+        if attempt_id is not None:
+            data["attempt_id"] = attempt_id
+        response = supabase.table("slot_watches").update(data).eq("id", id).execute()
+        return response.data[0] if response.data else None
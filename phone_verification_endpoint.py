@@ -1,5 +1,6 @@
 import re
 import logging
+import threading
 from flask import Flask, request, jsonify
 from datetime import datetime, timedelta
 
@@ -7,6 +8,7 @@ from datetime import datetime, timedelta
 # If they are in a parent directory, you might need path adjustments
 from database import supabase # Import the initialized Supabase client
 from models import UserInformation
+from verification_broker import verification_broker, LONG_POLL_SECONDS
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -50,7 +52,10 @@ def sms_webhook():
     verification_code = numbers[-1]
     logger.info(f"Extracted verification code '{verification_code}' for user {user_email} (from phone {phone_number})")
 
-    # 3. Store the code using the UserInformation model method
+    # 3. Hand the code to any booking waiting on /wait_code right away
+    verification_broker.publish(user_email, verification_code)
+
+    # 4. Also store the code using the UserInformation model method (for /get_code and restarts)
     success = UserInformation.update_verification_code(user_email, verification_code)
     
     if success:
@@ -63,17 +68,25 @@ def sms_webhook():
 
 @app.route('/get_code', methods=['GET'])
 def get_verification_code():
-    """Endpoint for the main application to retrieve the latest verification code for a user."""
+    """
+    Endpoint for the main application to retrieve the latest verification code
+    for a user, optionally only one received after `since` (epoch seconds).
+    """
     user_email = request.args.get('email')
     if not user_email:
         logger.warning("/get_code called without email parameter.")
         return jsonify({'status': 'error', 'message': 'email query parameter is required'}), 400
     
+    try:
+        since = float(request.args.get('since', 0))
+    except ValueError:
+        return jsonify({'status': 'error', 'message': 'since must be a number'}), 400
+
     logger.info(f"Attempting to retrieve verification code for user: {user_email}")
 
     # Retrieve and clear the code using the UserInformation model method
-    # It handles checking the timestamp and clearing the code.
-    code = UserInformation.get_and_clear_verification_code(user_email, max_age_minutes=5)
+    # It handles checking the timestamp (max age, and not older than `since`) and clearing the code.
+    code = UserInformation.get_and_clear_verification_code(user_email, max_age_minutes=5, since=since)
     
     if code:
         logger.info(f"Returning verification code '{code}' for user: {user_email}")
@@ -87,9 +100,41 @@ def get_verification_code():
         return jsonify({'status': 'not_available'})
 
 
+@app.route('/wait_code', methods=['GET'])
+def wait_for_verification_code():
+    """
+    Long-poll version of /get_code: holds the request open until the /sms
+    webhook publishes a code for this user (sent after `since`, epoch seconds)
+    or `timeout` seconds pass.
+    """
+    user_email = request.args.get('email')
+    if not user_email:
+        return jsonify({'status': 'error', 'message': 'email query parameter is required'}), 400
+    try:
+        since = float(request.args.get('since', 0))
+        timeout = min(float(request.args.get('timeout', LONG_POLL_SECONDS)), LONG_POLL_SECONDS)
+    except ValueError:
+        return jsonify({'status': 'error', 'message': 'since and timeout must be numbers'}), 400
+
+    code = verification_broker.wait_for_code(user_email, timeout=timeout, since=since)
+    if code:
+        logger.info(f"Delivered verification code to waiting booking for user: {user_email}")
+        # The code was also stored by the webhook; clear it off the request path
+        threading.Thread(target=UserInformation.get_and_clear_verification_code,
+                         args=(user_email,), kwargs={'since': since}, daemon=True).start()
+        return jsonify({'status': 'available', 'code': code})
+
+    # Not published to this process (e.g. the service restarted); check the stored copy once
+    code = UserInformation.get_and_clear_verification_code(user_email, max_age_minutes=5, since=since)
+    if code:
+        return jsonify({'status': 'available', 'code': code})
+    return jsonify({'status': 'not_available'})
+
+
 # Removed /register, /queue, /status, /list_users routes as they relied on UserManager
 
 if __name__ == "__main__":
     # Make sure HOST and PORT are appropriate for your deployment environment
     # Use environment variables for configuration ideally
-    app.run(host='0.0.0.0', port=8000, debug=True) # Added debug=True for development
+    # threaded=True so /wait_code long-polls do not block the /sms webhook
+    app.run(host='0.0.0.0', port=8000, debug=True, threaded=True) # Added debug=True for development
@@ -0,0 +1,198 @@
+import os
+import time
+import logging
+import threading
+import weakref
+from collections import deque
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+from urllib.parse import urlencode
+
+from booking_window import SF_TIMEZONE
+
+logger = logging.getLogger(__name__)
+
+# --- Deep Link Configuration ---
+# Off until the query parameters below are confirmed against the live site
+REC_US_DEEP_LINK_ENABLED = os.getenv("REC_US_DEEP_LINK_ENABLED", "false").lower() in ("1", "true", "yes")
+# How long to wait for the page to show the deep-linked date before falling back
+REC_US_DEEP_LINK_TIMEOUT_MS = int(os.getenv("REC_US_DEEP_LINK_TIMEOUT_MS", "4000"))
+# After a deep link is ignored by the site, use the click path for this long
+REC_US_DEEP_LINK_COOLDOWN_SECONDS = int(os.getenv("REC_US_DEEP_LINK_COOLDOWN", "3600"))
+# Query parameter names for the listing's filters. Not taken from the live site:
+# they are the filter names themselves, so set the real ones here once confirmed
+DEEP_LINK_PARAMS = {
+    "date": os.getenv("REC_US_DEEP_LINK_DATE_PARAM", "date"),
+    "sport": os.getenv("REC_US_DEEP_LINK_SPORT_PARAM", "sport"),
+    "location": os.getenv("REC_US_DEEP_LINK_LOCATION_PARAM", "location"),
+}
+# --- End Deep Link Configuration ---
+
+DATE_BUTTON_SELECTOR = 'button.rounded-2xl.border.border-gray-200.px-4.py-1.hover\\:border-black.bg-gray-200'
+
+# True once the date button's label names one of the given dates. A candidate
+# must not be followed by another digit so "oct 1" does not match "oct 17".
+DATE_LABEL_MATCHES_SCRIPT = """
+([selector, candidates]) => {
+    const button = document.querySelector(selector);
+    if (!button) return false;
+    const label = button.textContent.trim().toLowerCase();
+    return candidates.some((candidate) => {
+        const index = label.indexOf(candidate);
+        return index >= 0 && !/[0-9]/.test(label.charAt(index + candidate.length));
+    });
+}
+"""
+
+
+def date_label_candidates(target_date: datetime) -> List[str]:
+    """Lower-cased ways the date button may spell target_date ('oct 7', 'october 7', '10/7', '2025-10-07')."""
+    day = str(target_date.day)
+    candidates = [
+        f"{target_date.strftime('%b')} {day}".lower(),
+        f"{target_date.strftime('%B')} {day}".lower(),
+        f"{target_date.strftime('%b')} {target_date.strftime('%d')}".lower(),
+        f"{target_date.month}/{day}",
+        target_date.strftime("%Y-%m-%d"),
+    ]
+    # The unselected button reads "Today", which is also right for today's listing
+    if target_date.date() == datetime.now(SF_TIMEZONE).date():
+        candidates.append("today")
+    return candidates
+
+
+class DeepLinkNavigator:
+    """
+    Opens the rec.us listing for a date straight from the URL.
+
+    The organization page is loaded with the date, sport and (optionally)
+    location in its query string. If the page does not pick the date up, the
+    caller's click path (calendar button, month paging, day click) is used
+    instead and deep links are skipped for REC_US_DEEP_LINK_COOLDOWN_SECONDS.
+    Each call logs how long it took and how much it saved against the recent
+    click path average.
+    """
+
+    def __init__(self, base_url: Optional[str] = None, history: int = 20):
+        # Defaults to automation.REC_US_ORG_URL, looked up on first use (automation imports this module)
+        self._base_url = base_url
+        self._lock = threading.Lock()
+        self._disabled_until = 0.0
+        self._click_path_seconds = deque(maxlen=history)
+        self._counts = {"deep_link": 0, "click_path": 0, "fallback": 0}
+        self._saved_seconds = 0.0
+        # Contexts that already carry the listing observer init script
+        self._armed_contexts = weakref.WeakSet()
+
+    @property
+    def base_url(self) -> str:
+        if self._base_url is None:
+            from automation import REC_US_ORG_URL
+            self._base_url = REC_US_ORG_URL
+        return self._base_url
+
+    @property
+    def available(self) -> bool:
+        return REC_US_DEEP_LINK_ENABLED and time.monotonic() >= self._disabled_until
+
+    def _disable(self, reason: str):
+        with self._lock:
+            self._disabled_until = time.monotonic() + REC_US_DEEP_LINK_COOLDOWN_SECONDS
+        logger.warning(f"[DeepLinkNavigator] {reason}. Using the calendar click path for the next "
+                       f"{REC_US_DEEP_LINK_COOLDOWN_SECONDS}s.")
+
+    def build_url(self, target_date: datetime, sport: str = "tennis", location: Optional[str] = None) -> str:
+        params = {
+            DEEP_LINK_PARAMS["date"]: target_date.strftime("%Y-%m-%d"),
+            DEEP_LINK_PARAMS["sport"]: sport,
+        }
+        if location:
+            params[DEEP_LINK_PARAMS["location"]] = location
+        return f"{self.base_url}?{urlencode(params)}"
+
+    def click_path_average(self) -> Optional[float]:
+        with self._lock:
+            if not self._click_path_seconds:
+                return None
+            return sum(self._click_path_seconds) / len(self._click_path_seconds)
+
+    def _open(self, page, target_date: datetime, sport: str, location: Optional[str]) -> bool:
+        """Loads the deep link; returns False if the page ignored it."""
+        from automation import STEP_TIMEOUTS_MS, ARM_DOM_SETTLE_SCRIPT, DOM_SETTLE_QUIET_MS, _wait_for_dom_settle
+
+        # Arm the listing observer before the page's own scripts run so the
+        # render for the deep-linked date is not missed. Init scripts stay for
+        # every later load in the context, so it is added once per context.
+        context = page.context
+        with self._lock:
+            armed = context in self._armed_contexts
+            self._armed_contexts.add(context)
+        if not armed:
+            context.add_init_script(
+                f"document.addEventListener('DOMContentLoaded', () => ({ARM_DOM_SETTLE_SCRIPT})({DOM_SETTLE_QUIET_MS}));"
+            )
+        page.goto(self.build_url(target_date, sport, location), wait_until="networkidle",
+                  timeout=STEP_TIMEOUTS_MS["page_load"])
+        try:
+            page.wait_for_function(DATE_LABEL_MATCHES_SCRIPT,
+                                   arg=[DATE_BUTTON_SELECTOR, date_label_candidates(target_date)],
+                                   timeout=REC_US_DEEP_LINK_TIMEOUT_MS)
+        except Exception:
+            return False
+        _wait_for_dom_settle(page, STEP_TIMEOUTS_MS["day_listing"])
+        return True
+
+    def navigate(self, page, target_date: datetime, click_path: Callable[[], None],
+                 sport: str = "tennis", location: Optional[str] = None) -> str:
+        """
+        Leaves page on the listing for target_date and returns how it got there:
+        'deep_link', 'click_path' (deep links unavailable) or 'fallback'.
+
+        Raises whatever click_path raises if the calendar route fails too.
+        """
+        method = "click_path"
+        if self.available:
+            started = time.perf_counter()
+            try:
+                if self._open(page, target_date, sport, location):
+                    self._record_deep_link(target_date, time.perf_counter() - started)
+                    return "deep_link"
+                self._disable(f"Deep link for {target_date.strftime('%Y-%m-%d')} did not select the date")
+            except Exception as e:
+                logger.warning(f"[DeepLinkNavigator] Deep link failed: {str(e)}")
+            method = "fallback"
+
+        started = time.perf_counter()
+        click_path()
+        elapsed = time.perf_counter() - started
+        with self._lock:
+            self._counts[method] += 1
+            self._click_path_seconds.append(elapsed)
+        logger.info(f"[DeepLinkNavigator] {target_date.strftime('%Y-%m-%d')} via {method.replace('_', ' ')} in {elapsed:.2f}s")
+        return method
+
+    def _record_deep_link(self, target_date: datetime, elapsed: float):
+        baseline = self.click_path_average()
+        saved = baseline - elapsed if baseline is not None else None
+        with self._lock:
+            self._counts["deep_link"] += 1
+            if saved is not None:
+                self._saved_seconds += saved
+        saved_text = f"saved {saved:.2f}s vs click path" if saved is not None else "no click path baseline yet"
+        logger.info(f"[DeepLinkNavigator] {target_date.strftime('%Y-%m-%d')} via deep link in {elapsed:.2f}s ({saved_text})")
+
+    def stats(self) -> Dict[str, Any]:
+        """Call counts by method and total latency saved by deep links so far."""
+        with self._lock:
+            counts = dict(self._counts)
+            saved = self._saved_seconds
+        average = self.click_path_average()
+        return {
+            "available": self.available,
+            "calls": counts,
+            "click_path_avg_seconds": round(average, 3) if average is not None else None,
+            "total_saved_seconds": round(saved, 3),
+        }
+
+
+deep_link_navigator = DeepLinkNavigator()
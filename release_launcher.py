@@ -0,0 +1,88 @@
+import os
+import time
+import logging
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# --- Pre-stage Configuration ---
+# How long before the release instant the booking page is opened, logged in and parked on the date
+PRESTAGE_LEAD_SECONDS = float(os.getenv("PRESTAGE_LEAD_SECONDS", "60"))
+# The final stretch before the release instant is busy-waited for precision
+SPIN_SECONDS = 0.05
+# --- End Pre-stage Configuration ---
+
+
+def _iso(timestamp: Optional[float]) -> Optional[str]:
+    if timestamp is None:
+        return None
+    return datetime.fromtimestamp(timestamp, timezone.utc).isoformat(timespec="milliseconds")
+
+
+def _ms(start: Optional[float], end: Optional[float]) -> Optional[float]:
+    if start is None or end is None:
+        return None
+    return round((end - start) * 1000, 1)
+
+
+@dataclass
+class BookingTimeline:
+    """Wall-clock (epoch seconds) milestones of one pre-staged booking attempt."""
+
+    release_at: float
+    stage_started: Optional[float] = None
+    staged: Optional[float] = None
+    fired: Optional[float] = None
+    clicked: Optional[float] = None
+    confirmed: Optional[float] = None
+    outcome: Optional[str] = None
+    notes: Dict[str, Any] = field(default_factory=dict)
+
+    def mark(self, milestone: str) -> float:
+        now = time.time()
+        setattr(self, milestone, now)
+        return now
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "release_at": _iso(self.release_at),
+            "stage_started": _iso(self.stage_started),
+            "staged": _iso(self.staged),
+            "fired": _iso(self.fired),
+            "clicked": _iso(self.clicked),
+            "confirmed": _iso(self.confirmed),
+            "stage_ms": _ms(self.stage_started, self.staged),
+            # How late the fire was relative to the release instant (negative = early)
+            "fire_error_ms": _ms(self.release_at, self.fired),
+            "fire_to_click_ms": _ms(self.fired, self.clicked),
+            "click_to_confirm_ms": _ms(self.clicked, self.confirmed),
+            "outcome": self.outcome,
+            **self.notes,
+        }
+
+    def summary(self) -> str:
+        data = self.as_dict()
+        return (f"stage {data['stage_ms']} ms, fire error {data['fire_error_ms']} ms, "
+                f"fire->click {data['fire_to_click_ms']} ms, click->confirm {data['click_to_confirm_ms']} ms, "
+                f"outcome {self.outcome}")
+
+
+def sleep_until(target_ts: float, page=None):
+    """
+    Blocks until the wall clock reaches target_ts. With a page, the coarse part
+    of the wait runs through page.wait_for_timeout so Playwright keeps
+    servicing the connection; the last SPIN_SECONDS are busy-waited.
+    """
+    while True:
+        remaining = target_ts - time.time()
+        if remaining <= SPIN_SECONDS:
+            break
+        chunk = min(remaining - SPIN_SECONDS, 1.0)
+        if page is not None:
+            page.wait_for_timeout(chunk * 1000)
+        else:
+            time.sleep(chunk)
+    while time.time() < target_ts:
+        pass
@@ -0,0 +1,196 @@
+import os
+import re
+import random
+import logging
+import threading
+import time
+from typing import Any, Dict, List, Pattern
+
+logger = logging.getLogger(__name__)
+
+# Third-party hosts neither flow needs: analytics, tag managers, session replay, ads, maps
+_TRACKING_DOMAINS = (
+    "google-analytics.com",
+    "googletagmanager.com",
+    "doubleclick.net",
+    "googleadservices.com",
+    "facebook.net",
+    "facebook.com",
+    "segment.io",
+    "segment.com",
+    "hotjar.com",
+    "fullstory.com",
+    "intercom.io",
+    "intercomcdn.com",
+    "mixpanel.com",
+    "amplitude.com",
+    "clarity.ms",
+    "sentry.io",
+    "datadoghq.com",
+    "browser-intake-datadoghq.com",
+)
+_MAP_DOMAINS = (
+    "maps.googleapis.com",
+    "maps.gstatic.com",
+    "api.mapbox.com",
+    "tiles.mapbox.com",
+)
+
+# URLs of the resource types a profile can block, by file extension (query string allowed)
+_RESOURCE_TYPE_EXTENSIONS = {
+    "image": ("png", "jpe?g", "gif", "webp", "avif", "svg", "ico", "bmp"),
+    "media": ("mp4", "webm", "ogg", "mp3", "wav", "m4a"),
+    "font": ("woff2?", "ttf", "otf", "eot"),
+    "manifest": ("webmanifest",),
+    "texttrack": ("vtt",),
+}
+# URL paths that serve a resource type without its extension at the end of the URL,
+# e.g. Next.js's optimizer: /_next/image?url=%2Fcourt.jpg&w=640&q=75
+_RESOURCE_TYPE_PATHS = {
+    "image": ("/_next/image",),
+}
+
+# --- Resource Profiles ---
+# Stylesheets are never blocked: the flows rely on visibility checks, and
+# Tailwind's `hidden` utilities only take effect with CSS loaded. Routes are
+# installed only for the blocked URL patterns, so every other request goes
+# straight through without a round trip to Python.
+PROFILES: Dict[str, Dict[str, Any]] = {
+    # Availability scraping only reads the court listing
+    "scrape": {
+        "blocked_resource_types": {"image", "media", "font", "manifest", "texttrack"},
+        "blocked_domains": _TRACKING_DOMAINS + _MAP_DOMAINS,
+    },
+    # Booking goes through login and checkout; keep anything a payment/captcha widget may need
+    "book": {
+        "blocked_resource_types": {"image", "media", "font"},
+        "blocked_domains": _TRACKING_DOMAINS + _MAP_DOMAINS,
+    },
+}
+# Share of contexts whose requests are counted and sized (Request.sizes() costs a
+# round trip per request); the rest only count blocked requests
+RESOURCE_STATS_SAMPLE_RATE = float(os.getenv("RESOURCE_STATS_SAMPLE_RATE", "0.05"))
+# --- End Resource Profiles ---
+
+
+def blocked_patterns(profile: Dict[str, Any]) -> List[Pattern]:
+    """URL patterns to abort for a profile: one for its blocked hosts, and ones for its blocked file types by extension and by path."""
+    patterns = []
+    if profile["blocked_domains"]:
+        hosts = "|".join(re.escape(domain) for domain in profile["blocked_domains"])
+        patterns.append(re.compile(rf"^[a-z]+://([^/?#]*\.)?({hosts})(:\d+)?([/?#]|$)", re.IGNORECASE))
+    extensions = [extension for resource_type in sorted(profile["blocked_resource_types"])
+                  for extension in _RESOURCE_TYPE_EXTENSIONS.get(resource_type, ())]
+    if extensions:
+        # Extension at the end of the path only, so a file name inside a query string does not count
+        patterns.append(re.compile(rf"^[^?#]*\.({'|'.join(extensions)})([?#]|$)", re.IGNORECASE))
+    paths = [re.escape(path) for resource_type in sorted(profile["blocked_resource_types"])
+             for path in _RESOURCE_TYPE_PATHS.get(resource_type, ())]
+    if paths:
+        patterns.append(re.compile(rf"^[a-z]+://[^/?#]*({'|'.join(paths)})([/?#]|$)", re.IGNORECASE))
+    return patterns
+
+
+class ResourceStats:
+    """Block counts for one context using a profile, plus request and byte counts if it is sampled."""
+
+    _totals: Dict[str, Dict[str, float]] = {}
+    _totals_lock = threading.Lock()
+
+    def __init__(self, profile: str, sampled: bool = False):
+        self.profile = profile
+        self.sampled = sampled
+        self.started = time.perf_counter()
+        self.requests = 0
+        self.blocked = 0
+        self.bytes_received = 0
+
+    def record_finished(self, request):
+        self.requests += 1
+        try:
+            sizes = request.sizes()
+            self.bytes_received += sizes.get("responseBodySize", 0) + sizes.get("responseHeadersSize", 0)
+        except Exception:
+            pass
+
+    def finish(self) -> Dict[str, Any]:
+        """Logs this context's numbers and adds them to the per-profile totals."""
+        elapsed = time.perf_counter() - self.started
+        summary = {
+            "profile": self.profile,
+            "seconds": round(elapsed, 3),
+            "blocked": self.blocked,
+        }
+        if self.sampled:
+            summary.update(requests=self.requests, kilobytes=round(self.bytes_received / 1024, 1))
+            logger.info(f"[ResourceProfile] {self.profile}: {summary['seconds']}s, {self.requests} requests "
+                        f"({self.blocked} blocked), {summary['kilobytes']} KB received")
+        else:
+            logger.debug(f"[ResourceProfile] {self.profile}: {summary['seconds']}s, {self.blocked} blocked")
+        with ResourceStats._totals_lock:
+            totals = ResourceStats._totals.setdefault(
+                self.profile, {"contexts": 0, "seconds": 0.0, "blocked": 0, "sampled": 0, "requests": 0, "bytes": 0})
+            totals["contexts"] += 1
+            totals["seconds"] += elapsed
+            totals["blocked"] += self.blocked
+            if self.sampled:
+                totals["sampled"] += 1
+                totals["requests"] += self.requests
+                totals["bytes"] += self.bytes_received
+        return summary
+
+    @classmethod
+    def totals(cls) -> Dict[str, Dict[str, float]]:
+        """Per-profile averages across all contexts so far (request and byte averages over sampled ones)."""
+        with cls._totals_lock:
+            return {
+                profile: {
+                    "contexts": t["contexts"],
+                    "avg_seconds": round(t["seconds"] / t["contexts"], 3),
+                    "avg_blocked": round(t["blocked"] / t["contexts"], 1),
+                    "sampled_contexts": t["sampled"],
+                    "avg_requests": round(t["requests"] / t["sampled"], 1) if t["sampled"] else None,
+                    "avg_kilobytes": round(t["bytes"] / t["sampled"] / 1024, 1) if t["sampled"] else None,
+                }
+                for profile, t in cls._totals.items() if t["contexts"]
+            }
+
+
+def apply_profile(context, profile_name: str) -> ResourceStats:
+    """Installs a profile's request blocking on a sync Playwright context and starts measuring it."""
+    profile = PROFILES[profile_name]
+    stats = ResourceStats(profile_name, sampled=random.random() < RESOURCE_STATS_SAMPLE_RATE)
+
+    def block(route):
+        stats.blocked += 1
+        route.abort()
+
+    for pattern in blocked_patterns(profile):
+        context.route(pattern, block)
+    if stats.sampled:
+        context.on("requestfinished", stats.record_finished)
+    return stats
+
+
+async def apply_profile_async(context, profile_name: str) -> ResourceStats:
+    """Async Playwright counterpart of apply_profile."""
+    profile = PROFILES[profile_name]
+    stats = ResourceStats(profile_name, sampled=random.random() < RESOURCE_STATS_SAMPLE_RATE)
+
+    async def block(route):
+        stats.blocked += 1
+        await route.abort()
+
+    async def record_finished(request):
+        stats.requests += 1
+        try:
+            sizes = await request.sizes()
+            stats.bytes_received += sizes.get("responseBodySize", 0) + sizes.get("responseHeadersSize", 0)
+        except Exception:
+            pass
+
+    for pattern in blocked_patterns(profile):
+        await context.route(pattern, block)
+    if stats.sampled:
+        context.on("requestfinished", record_finished)
+    return stats
@@ -0,0 +1,76 @@
+import os
+import random
+import time
+import logging
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+# --- Retry Policy Configuration ---
+# Rapid in-session retries only happen within this many seconds after a slot's release
+BOOKING_FAST_RETRY_WINDOW_SECONDS = float(os.getenv("BOOKING_FAST_RETRY_WINDOW", "20"))
+# Jittered delay between tries grows from the base to the cap
+BOOKING_FAST_RETRY_BASE_SECONDS = float(os.getenv("BOOKING_FAST_RETRY_BASE", "0.25"))
+BOOKING_FAST_RETRY_MAX_DELAY_SECONDS = float(os.getenv("BOOKING_FAST_RETRY_MAX_DELAY", "2"))
+BOOKING_FAST_RETRY_MAX_TRIES = int(os.getenv("BOOKING_FAST_RETRY_MAX_TRIES", "15"))
+# --- End Retry Policy Configuration ---
+
+# Errors retrying cannot fix: the account or its credentials are the problem. Login
+# selector misses are left retryable; they are usually a slow or changed page.
+TERMINAL_ERROR_PATTERNS = (
+    "No user information found",
+    "missing password",
+    "Login rejected",
+)
+
+
+def classify_error(error: Optional[str]) -> str:
+    """'terminal' for errors a retry cannot fix, otherwise 'retryable' (slot not listed yet, timeouts, ...)."""
+    if error and any(pattern in error for pattern in TERMINAL_ERROR_PATTERNS):
+        return "terminal"
+    return "retryable"
+
+
+@dataclass
+class RetryPolicy:
+    """How fast, how often and for how long one booking session retries right after release."""
+
+    window_seconds: float = BOOKING_FAST_RETRY_WINDOW_SECONDS
+    base_delay: float = BOOKING_FAST_RETRY_BASE_SECONDS
+    max_delay: float = BOOKING_FAST_RETRY_MAX_DELAY_SECONDS
+    max_tries: int = BOOKING_FAST_RETRY_MAX_TRIES
+
+    def delays(self) -> Iterator[float]:
+        """Jittered delays before each retry (decorrelated jitter, capped at max_delay)."""
+        delay = self.base_delay
+        for _ in range(self.max_tries - 1):
+            delay = min(self.max_delay, random.uniform(self.base_delay, delay * 3))
+            yield delay
+
+    def deadline(self, release_at: Optional[float]) -> Optional[float]:
+        """
+        Wall-clock time after which no more rapid retries start, or None when
+        release_at is not recent enough for rapid retries. release_at is epoch
+        seconds on the local clock; convert a rec.us instant with
+        clock_sync.to_local first.
+        """
+        if release_at is None:
+            return None
+        deadline = release_at + self.window_seconds
+        return deadline if time.time() < deadline else None
+
+
+def try_record(number: int, started: float, latency: float, error: Optional[str]) -> Dict[str, Any]:
+    """One entry of an attempt's `tries` list on its booking_attempts row."""
+    return {
+        "try": number,
+        "at": datetime.fromtimestamp(started, timezone.utc).isoformat(timespec="milliseconds"),
+        "latency_ms": round(latency * 1000, 1),
+        "error": error,
+        "class": classify_error(error) if error else None,
+    }
+
+
+default_retry_policy = RetryPolicy()
@@ -1,104 +1,192 @@
-from datetime import datetime, timedelta, time
-from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
-import os
-from supabase import create_client, Client
+"""
+Release-day batch runner for scheduled bookings.
+
+Loads every 'scheduled' booking attempt whose slot is released on the target
+day (SF time) in one query, groups them by release instant and court, and
+runs each group at its release: the group is pre-warmed once (one session
+refresh per account plus warm pooled browsers) PREWARM_LEAD_SECONDS ahead,
+then all of its attempts fire in parallel, each pre-staged and retried at
+BOOKING_RETRY_OFFSETS. Prints one result line per attempt.
+
+The runner takes over the attempts it loads: their job chains in the web
+app's scheduler are cancelled and they are marked 'running', which scheduler
+recovery skips, so an attempt is never fired twice. (If a run is killed, set
+its unfinished attempts back to 'scheduled' to hand them back to the web app.)
+Every attempt gets its own thread, which sleeps until its fire and retry
+times without a browser; the host-wide browser admission slots (BROWSER_SLOTS)
+alone limit how many hold a browser at once, with bookings ahead of any
+scrapes.
+
+Usage:
+    python scheduled_bookings.py [--date YYYY-MM-DD] [--dry-run]
+"""
+import argparse
+import logging
+import threading
+import time
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Tuple
+
 from dotenv import load_dotenv
 
 # Load environment variables from .env file (optional, useful for local dev)
 load_dotenv()
 
-# --- Configuration ---
-# Load Supabase credentials from environment variables
-SUPABASE_URL = os.environ.get("SUPABASE_URL")
-# Use SUPABASE_KEY (Service Role or other non-anon key) - Keep this secure!
-SUPABASE_KEY = os.environ.get("SUPABASE_KEY") 
-
-# Timezone Configuration
-try:
-    SF_TIMEZONE = ZoneInfo("America/Los_Angeles")
-except ZoneInfoNotFoundError:
-    print("Error: Timezone 'America/Los_Angeles' not found. Please ensure timezone data is available.")
-    exit(1) 
-# --- End Configuration ---
-
-def get_scheduled_bookings_for_a_week_from_now(supabase: Client):
-    """
-    Queries the Supabase database for booking attempts scheduled exactly 3 days from today.
+from booking_window import (
+    BOOKING_WINDOW_RULES,
+    PREWARM_LEAD_SECONDS,
+    RETRY_OFFSETS_SECONDS,
+    SF_TIMEZONE,
+    release_instant,
+)
+from admission import admission_controller
+from release_launcher import PRESTAGE_LEAD_SECONDS, sleep_until
+from models import BookingAttempt
+from scheduler import cancel_booking_chain, run_booking
+
+logger = logging.getLogger(__name__)
 
-    Args:
-        supabase: An initialized Supabase client instance.
+GroupKey = Tuple[datetime, str]
 
-    Returns:
-        list: A list of dictionaries representing the matching rows, or None if an error occurs.
+
+def load_due_attempts(release_day: date) -> List[Dict[str, Any]]:
+    """
+    'scheduled' attempts whose slot is released on release_day, each with its
+    local booking_time and release_at added. One query covers the play dates
+    every booking-window rule can map to release_day.
     """
-    try:
-        # Calculate the target date (7 days from now in SF time)
-        now_sf = datetime.now(SF_TIMEZONE)
-        target_date_sf = now_sf.date() + timedelta(days=3)
-        
-        print(f"Checking for scheduled bookings on: {target_date_sf.strftime('%Y-%m-%d')}")
-
-        # Determine the query range in UTC
-        # Start of the target day in SF time
-        start_of_day_sf = datetime.combine(target_date_sf, time.min, tzinfo=SF_TIMEZONE)
-        # Start of the *next* day in SF time
-        start_of_next_day_sf = start_of_day_sf + timedelta(days=1)
-        
-        # Convert boundaries to UTC ISO format strings (Supabase typically uses TIMESTAMPTZ referenced to UTC)
-        start_utc_iso = start_of_day_sf.astimezone(ZoneInfo("UTC")).isoformat()
-        end_utc_iso = start_of_next_day_sf.astimezone(ZoneInfo("UTC")).isoformat()
-
-        print(f"Querying UTC range: {start_utc_iso} to {end_utc_iso}")
-
-        # Query Supabase
-        response = (
-            supabase.table("booking_attempts")
-            .select("*")
-            .eq("status", "scheduled")
-            .gte("booking_time", start_utc_iso) # booking_time >= start of target day (UTC)
-            .lt("booking_time", end_utc_iso)    # booking_time < start of next day (UTC)
-            .execute()
-        )
-        
-        # Check for errors in the response
-        if hasattr(response, 'error') and response.error:
-             print(f"Supabase query error: {response.error}")
-             return None
-
-        # Return the data part of the response
-        return response.data
-
-    except Exception as e:
-        print(f"An unexpected error occurred during Supabase query: {e}")
-        return None
+    days_ahead = [int(rule.get("days_ahead", BOOKING_WINDOW_RULES["default"]["days_ahead"]))
+                  for rule in BOOKING_WINDOW_RULES.values()]
+    start = datetime.combine(release_day + timedelta(days=min(days_ahead)), datetime.min.time(), tzinfo=SF_TIMEZONE)
+    end = datetime.combine(release_day + timedelta(days=max(days_ahead) + 1), datetime.min.time(), tzinfo=SF_TIMEZONE)
 
-if __name__ == "__main__":
-    print("Running scheduled booking check...")
+    due = []
+    for attempt in BookingAttempt.get_scheduled_after(start, before=end):
+        booking_time = datetime.fromisoformat(attempt["booking_time"]).astimezone(SF_TIMEZONE)
+        release_at = release_instant(attempt["court_name"], booking_time)
+        if release_at.date() == release_day:
+            due.append({**attempt, "local_booking_time": booking_time, "release_at": release_at})
+    return due
 
-    # Validate Supabase configuration
-    if not SUPABASE_URL or not SUPABASE_KEY:
-        print("Error: SUPABASE_URL and SUPABASE_KEY environment variables must be set.")
-        print("Please create a .env file or set them in your environment.")
-    else:
+
+def group_attempts(attempts: List[Dict[str, Any]]) -> Dict[GroupKey, List[Dict[str, Any]]]:
+    groups: Dict[GroupKey, List[Dict[str, Any]]] = defaultdict(list)
+    for attempt in attempts:
+        groups[(attempt["release_at"], attempt["court_name"])].append(attempt)
+    return dict(sorted(groups.items(), key=lambda item: item[0]))
+
+
+def print_plan(groups: Dict[GroupKey, List[Dict[str, Any]]]):
+    """Dry run: the timeline and concurrency the run would use."""
+    by_release: Dict[datetime, int] = defaultdict(int)
+    for (release_at, _), attempts in groups.items():
+        by_release[release_at] += len(attempts)
+
+    print(f"Browser slots: {admission_controller.slots} (host-wide)")
+    for (release_at, court_name), attempts in groups.items():
+        print(f"\n{release_at:%H:%M:%S} {court_name}: {len(attempts)} attempt(s), "
+              f"{len({attempt['user_email'] for attempt in attempts})} account(s)")
+        print(f"  prewarm {release_at - timedelta(seconds=PREWARM_LEAD_SECONDS):%H:%M:%S}, "
+              f"stage {release_at - timedelta(seconds=PRESTAGE_LEAD_SECONDS):%H:%M:%S}, fire {release_at:%H:%M:%S}, "
+              f"retries at +{', +'.join(f'{offset:g}s' for offset in RETRY_OFFSETS_SECONDS) or 'none'}")
+        for attempt in attempts:
+            print(f"  - ID: {attempt['id']}, Time: {attempt['local_booking_time']:%Y-%m-%d %H:%M}, User: {attempt['user_email']}")
+
+    print()
+    for release_at, count in sorted(by_release.items()):
+        print(f"At {release_at:%H:%M:%S}: {count} attempt(s) fire together, "
+              f"at most {min(count, admission_controller.slots)} holding a browser at the same time")
+
+
+def prewarm_group(release_at: datetime, attempts: List[Dict[str, Any]]):
+    """Refreshes each account's session once and warms the pooled browsers for the group."""
+    sleep_until(release_at.timestamp() - PREWARM_LEAD_SECONDS)
+    first_per_user = {attempt["user_email"]: attempt for attempt in attempts}
+    for attempt in first_per_user.values():
+        run_booking(attempt["id"], phase="prewarm")
+
+
+def run_attempt(attempt: Dict[str, Any]) -> Dict[str, Any]:
+    """Fires one attempt at its release, then retries until it books or the offsets run out."""
+    release_at = attempt["release_at"]
+    tries = [("fire", release_at.timestamp())]
+    tries += [("retry", release_at.timestamp() + offset) for offset in RETRY_OFFSETS_SECONDS]
+    result = {"id": attempt["id"], "success": False, "error": None, "tries": 0, "seconds": None}
+    started = None
+    for index, (phase, run_at) in enumerate(tries):
+        final = index == len(tries) - 1
+        if phase == "retry":
+            sleep_until(run_at)
+        started = started or time.time()
+        result["tries"] += 1
+        success, error = run_booking(attempt["id"], release_at=release_at.isoformat(), phase=phase, final=final,
+                                     pending_status='running')
+        result["success"], result["error"] = success, error
+        if success:
+            break
+    result["seconds"] = round(time.time() - started, 1)
+    return result
+
+
+def run_release_day(groups: Dict[GroupKey, List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+    attempts = [attempt for group in groups.values() for attempt in group]
+    for attempt in attempts:
+        cancel_booking_chain(attempt["id"], attempt["local_booking_time"])
+        # Out of 'scheduled', so a scheduler restart does not rebuild the chain we just cancelled
+        BookingAttempt.update_status(attempt["id"], 'running')
+
+    prewarm_threads = [threading.Thread(target=prewarm_group, args=(release_at, group), daemon=True)
+                       for (release_at, _), group in groups.items()]
+    for thread in prewarm_threads:
+        thread.start()
+
+    # One thread per attempt: each waits for its own fire and retry times, so none can delay another's fire
+    results_by_id: Dict[Any, Dict[str, Any]] = {}
+
+    def run(attempt: Dict[str, Any]):
         try:
-            # Initialize Supabase client using SUPABASE_KEY
-            supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
-            print("Supabase client initialized.")
-
-            # Get bookings
-            bookings = get_scheduled_bookings_for_a_week_from_now(supabase)
-            
-            if bookings is not None:
-                if bookings:
-                    print(f"\nFound {len(bookings)} scheduled booking attempt(s) for 3 days from now:")
-                    # Supabase client returns list of dictionaries directly
-                    for booking in bookings:
-                        # Adjust printing based on actual column names in your Supabase table
-                        print(f"- ID: {booking.get('id')}, Court: {booking.get('court_name')}, Time: {booking.get('booking_time')}, Status: {booking.get('status')}")
-                else:
-                    print("\nNo scheduled booking attempts found for 7 days from now.")
-            else:
-                print("\nFailed to retrieve scheduled bookings due to an error during the query.")
-        
+            results_by_id[attempt["id"]] = run_attempt(attempt)
         except Exception as e:
-            print(f"Failed to initialize Supabase client or run check: {e}") 
\ No newline at end of file
+            logger.error(f"Attempt {attempt['id']} failed: {str(e)}", exc_info=True)
+            results_by_id[attempt["id"]] = {"id": attempt["id"], "success": False, "error": str(e), "tries": 0, "seconds": None}
+
+    attempt_threads = [threading.Thread(target=run, args=(attempt,), name=f"release-day-{attempt['id']}", daemon=True)
+                       for attempt in attempts]
+    for thread in attempt_threads:
+        thread.start()
+    for thread in attempt_threads:
+        thread.join()
+    results = [results_by_id[attempt["id"]] for attempt in attempts]
+
+    by_id = {attempt["id"]: attempt for attempt in attempts}
+    print()
+    for result in results:
+        attempt = by_id[result["id"]]
+        outcome = "BOOKED" if result["success"] else f"FAILED ({result['error']})"
+        print(f"- ID: {result['id']}, Court: {attempt['court_name']}, Time: {attempt['local_booking_time']:%Y-%m-%d %H:%M}, "
+              f"{outcome}, {result['tries']} try(ies), {result['seconds']}s")
+    booked = sum(1 for result in results if result["success"])
+    print(f"\n{booked}/{len(results)} attempt(s) booked")
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--date", help="Release day in SF time (default: today)")
+    parser.add_argument("--dry-run", action="store_true", help="Print the planned timeline and concurrency only")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    release_day = date.fromisoformat(args.date) if args.date else datetime.now(SF_TIMEZONE).date()
+    print(f"Loading scheduled booking attempts released on {release_day:%Y-%m-%d}...")
+    attempts = load_due_attempts(release_day)
+    if not attempts:
+        print("No scheduled booking attempts are released on that day.")
+    else:
+        groups = group_attempts(attempts)
+        print(f"Found {len(attempts)} attempt(s) in {len(groups)} group(s)")
+        if args.dry_run:
+            print_plan(groups)
+        else:
+            run_release_day(groups)
@@ -1,20 +1,184 @@
 from automation import TennisBooker
 from models import BookingAttempt, UserInformation
 from extensions import scheduler
+from scheduler_leader import scheduler_leader
+from browser_pool import browser_pool
+from booking_window import release_instant, job_chain
+from release_launcher import PRESTAGE_LEAD_SECONDS
+from clock_sync import clock_sync
+from retry_policy import classify_error, default_retry_policy
 import logging
-from datetime import datetime
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
 from zoneinfo import ZoneInfo
 
 logger = logging.getLogger(__name__)
 
-def booking_job(attempt_id):
+CHAIN_PHASES = ("prewarm", "fire", "retry")
+
+# Links of one attempt's chain run one at a time: a retry that comes due while
+# the fire is still checking out waits for it and then sees its outcome.
+# attempt_id -> [lock, runs holding or waiting for it]; dropped when the last run leaves
+_attempt_locks: Dict[Any, List[Any]] = {}
+_attempt_locks_guard = threading.Lock()
+
+
+@contextmanager
+def _attempt_lock(attempt_id):
+    with _attempt_locks_guard:
+        entry = _attempt_locks.setdefault(attempt_id, [threading.Lock(), 0])
+        entry[1] += 1
+    try:
+        with entry[0]:
+            yield
+    finally:
+        with _attempt_locks_guard:
+            entry[1] -= 1
+            if entry[1] == 0:
+                del _attempt_locks[attempt_id]
+
+
+def chain_job_id(attempt_id, booking_time: datetime, phase: str, index: int = 0) -> str:
+    suffix = f"{phase}{index}" if phase == "retry" else phase
+    return f'booking_{attempt_id}_{booking_time.strftime("%Y%m%d_%H%M")}_{suffix}'
+
+
+def schedule_booking_chain(attempt_id, court_name: str, booking_time: datetime,
+                           now: Optional[datetime] = None) -> List[str]:
+    """
+    Registers the job chain for an attempt from its booking-window release
+    instant: pre-warm, pre-staged fire at T0 and a burst of retries. Returns
+    the job ids.
+    """
+    sf_timezone = ZoneInfo("America/Los_Angeles")
+    release_at = release_instant(court_name, booking_time)
+    chain = job_chain(release_at, PRESTAGE_LEAD_SECONDS, now or datetime.now(sf_timezone))
+    job_ids = []
+    retry_index = 0
+    # Release instants are on rec.us's clock; run the jobs by ours
+    clock_correction = timedelta(seconds=clock_sync.offset)
+    for position, job in enumerate(chain):
+        # Only the last link may mark the attempt failed
+        kwargs = {"phase": job["phase"], "release_at": release_at.isoformat(), "final": position == len(chain) - 1}
+        if job["phase"] == "retry":
+            retry_index += 1
+        job_id = chain_job_id(attempt_id, booking_time, job["phase"], retry_index)
+        scheduler_leader.add_job(
+            func='scheduler:booking_job',  # Use string reference to function
+            trigger='date',
+            run_date=job["run_date"] - clock_correction,
+            args=[attempt_id],
+            kwargs=kwargs,
+            id=job_id,
+            replace_existing=True,
+            misfire_grace_time=60
+        )
+        job_ids.append(job_id)
+    logger.info(f"Scheduled chain for attempt {attempt_id}: release {release_at.isoformat()}, jobs {job_ids}")
+    return job_ids
+
+
+def cancel_booking_chain(attempt_id, booking_time: datetime):
+    """Removes any chain jobs of an attempt that have not run yet (booking_time in SF time, as scheduled)."""
+    scheduler_leader.remove_jobs_with_prefix(f'booking_{attempt_id}_{booking_time.strftime("%Y%m%d_%H%M")}_')
+
+
+# Outcome of the last recover_scheduled_bookings() run in this process
+last_recovery: Dict[str, Any] = {}
+
+
+def recover_scheduled_bookings(attempts: Optional[List[Dict[str, Any]]] = None) -> Dict[str, Any]:
+    """
+    Rebuilds the in-memory job chains after a restart from booking_attempts
+    rows with status 'scheduled' (attempts: rows with id, court_name and
+    booking_time; fetched in one indexed query when None). Triggers are
+    recomputed from the current booking-window rules. Slots already in the
+    past are not fetched, chain links whose time has passed are left out, and
+    attempts whose release passed while the scheduler was down get the
+    catch-up retries. Returns timing and counts, also kept in last_recovery.
+    """
+    sf_timezone = ZoneInfo("America/Los_Angeles")
+    started = time.perf_counter()
+    now = datetime.now(sf_timezone)
+    if attempts is None:
+        attempts = BookingAttempt.get_scheduled_after(now)
+    fetched = time.perf_counter()
+
+    stats = {"attempts": len(attempts), "recovered": 0, "caught_up": 0, "skipped": 0, "errors": 0, "jobs": 0}
+    for attempt in attempts:
+        try:
+            booking_time = datetime.fromisoformat(attempt['booking_time']).astimezone(sf_timezone)
+            if booking_time <= now:
+                stats["skipped"] += 1
+                continue
+            if release_instant(attempt['court_name'], booking_time) <= now:
+                stats["caught_up"] += 1
+            stats["jobs"] += len(schedule_booking_chain(attempt['id'], attempt['court_name'], booking_time, now=now))
+            stats["recovered"] += 1
+        except Exception as e:
+            stats["errors"] += 1
+            logger.error(f"Could not recover booking attempt {attempt.get('id')}: {str(e)}", exc_info=True)
+
+    finished = time.perf_counter()
+    stats["query_ms"] = round((fetched - started) * 1000, 1)
+    stats["schedule_ms"] = round((finished - fetched) * 1000, 1)
+    stats["total_ms"] = round((finished - started) * 1000, 1)
+    last_recovery.clear()
+    last_recovery.update(stats)
+    logger.info(f"Recovered {stats['recovered']}/{stats['attempts']} scheduled attempts ({stats['jobs']} jobs, "
+                f"{stats['caught_up']} past release, {stats['skipped']} skipped, {stats['errors']} errors) "
+                f"in {stats['total_ms']} ms (query {stats['query_ms']} ms)")
+    return stats
+
+
+def start_recovery():
+    """Leader start-up hook: runs recover_scheduled_bookings off the start-up path."""
+    threading.Thread(target=recover_scheduled_bookings, name="booking-recovery", daemon=True).start()
+
+
+def _prewarm(booker: TennisBooker, attempt_id):
+    """Renews the cached rec.us login, makes sure a pooled browser is launched and recalibrates the clock offset."""
+    clock_sync.calibrate()
+    refreshed = booker.refresh_session()
+    browser_pool.run(lambda context: None, admission_kind="book")
+    logger.info(f"Pre-warmed attempt {attempt_id} (session refreshed: {refreshed})")
+
+
+def booking_job(attempt_id, release_at=None, phase=None, final=True):
+    """
+    Runs one booking attempt, or one link of its release chain.
+
+    phase is None for a plain booking. In a chain (see schedule_booking_chain),
+    'prewarm' refreshes the session and browser, 'fire' pre-stages the page
+    and clicks at release_at (ISO timestamp of the instant the slot opens),
+    and 'retry' books again right after release. An attempt that already
+    completed is left alone; a failure only marks it failed on the final link.
+    """
     with scheduler.app.app_context():
+        return run_booking(attempt_id, release_at=release_at, phase=phase, final=final)
+
+
+def run_booking(attempt_id, release_at=None, phase=None, final=True, pending_status='scheduled'):
+    """
+    booking_job without the Flask app context; also used by worker.py.
+    A retryable failure before the final run leaves the attempt in
+    pending_status: 'scheduled' while later links of its chain are pending
+    (recovery rebuilds chains from those rows), 'queued' when worker.py has
+    queued the retry itself. Returns (success, error message) of this run.
+    """
+    with _attempt_lock(attempt_id):
         try:
             # Get the booking attempt using Supabase
             attempt = BookingAttempt.get_by_id(attempt_id)
             if not attempt:
                 logger.error(f"Booking attempt {attempt_id} not found")
-                return
+                return False, f"Booking attempt {attempt_id} not found"
+            if phase in CHAIN_PHASES and attempt.get('status') == 'completed':
+                logger.info(f"Attempt {attempt_id} already completed; skipping {phase}")
+                return True, None
 
             # Use UserInformation instead of BookingPreference
             user_info = UserInformation.get_by_email(attempt['user_email'])
@@ -41,24 +205,63 @@ def booking_job(attempt_id):
                 playtime_duration = 60
             logger.info(f"Using playtime duration: {playtime_duration} minutes")
 
-            # Attempt booking
-            success, error = booker.book_court(
-                attempt['court_name'], 
-                local_booking_time, 
-                playtime_duration=playtime_duration
-            )
+            if phase == "prewarm":
+                _prewarm(booker, attempt_id)
+                return True, None
+
+            # Preflight against the whole-date availability snapshot before opening a booking session
+            # (not before or right after a release: the slot may not be listed yet, and the
+            # booking session itself re-checks the slot list between rapid retries)
+            prestaged = bool(release_at) and phase in (None, "fire")
+            release_at_dt = datetime.fromisoformat(release_at) if release_at else None
+            near_release = (bool(release_at_dt)
+                            and default_retry_policy.deadline(clock_sync.to_local(release_at_dt.timestamp())) is not None)
+            tries = []
+            slot_available = None if prestaged or near_release else booker.check_slot_available(attempt['court_name'], local_booking_time)
+            if slot_available is False:
+                logger.info(f"Preflight found no open slot for attempt {attempt_id} at {local_booking_time.strftime('%H:%M')}")
+                success, error = False, f"No matching time slot found for {local_booking_time.strftime('%-I:%M')}"
+            elif prestaged:
+                success, error, timeline = booker.book_court_prestaged(
+                    attempt['court_name'],
+                    local_booking_time,
+                    release_at_dt,
+                    playtime_duration=playtime_duration,
+                    tries=tries
+                )
+                BookingAttempt.record_timeline(attempt_id, timeline.as_dict())
+            else:
+                # Attempt booking
+                success, error = booker.book_court(
+                    attempt['court_name'], 
+                    local_booking_time, 
+                    playtime_duration=playtime_duration,
+                    release_at=release_at_dt,
+                    tries=tries
+                )
+            if tries:
+                BookingAttempt.record_tries(attempt_id, (attempt.get('tries') or []) + [{**entry, "phase": phase} for entry in tries])
 
             # Update attempt status
             status = 'completed' if success else 'failed'
+            terminal = not success and classify_error(error) == "terminal"
+            if not success and not final and not terminal:
+                # Later links of the chain, or the queued retry, will try again
+                status = pending_status
             error_message = error if error else None
             BookingAttempt.update_status(attempt_id, status, error_message)
+            if (success or terminal) and phase in CHAIN_PHASES:
+                cancel_booking_chain(attempt_id, local_booking_time)
+            return success, error_message
 
         except Exception as e:
             logger.error(f"Error in booking job for attempt {attempt_id}: {str(e)}", exc_info=True)
             # Ensure attempt_id is valid before trying to update status
+            status = 'failed' if final or classify_error(str(e)) == "terminal" else pending_status
             if attempt_id:
                 try:
                     # Update status even if fetching attempt initially failed
-                    BookingAttempt.update_status(attempt_id, 'failed', str(e))
+                    BookingAttempt.update_status(attempt_id, status, str(e))
                 except Exception as update_err:
-                    logger.error(f"Failed to update status to failed for attempt {attempt_id} after error: {update_err}")
\ No newline at end of file
+                    logger.error(f"Failed to update status to {status} for attempt {attempt_id} after error: {update_err}")
+            return False, str(e)
\ No newline at end of file
@@ -0,0 +1,219 @@
+import os
+import json
+import time
+import fcntl
+import sqlite3
+import logging
+import threading
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+from extensions import scheduler
+
+logger = logging.getLogger(__name__)
+
+# --- Scheduler Leader Configuration ---
+_HERE = os.path.dirname(os.path.abspath(__file__))
+# Held (flock) by the one process on this host that runs scheduler jobs
+SCHEDULER_LOCK_PATH = os.getenv("SCHEDULER_LOCK_PATH", os.path.join(_HERE, ".scheduler.lock"))
+# Job changes made by non-leader processes, applied by the leader
+SCHEDULER_OUTBOX_PATH = os.getenv("SCHEDULER_OUTBOX_PATH", os.path.join(_HERE, ".scheduler_outbox.sqlite3"))
+# How often the leader applies forwarded changes and followers retry the lock
+LEADER_POLL_SECONDS = float(os.getenv("SCHEDULER_LEADER_POLL_SECONDS", "0.5"))
+# --- End Scheduler Leader Configuration ---
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS scheduler_outbox (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    op TEXT NOT NULL,
+    args TEXT NOT NULL,
+    sender_pid INTEGER NOT NULL,
+    created_at REAL NOT NULL
+);
+"""
+
+
+def _encode(value):
+    if isinstance(value, datetime):
+        return {"__datetime__": value.isoformat()}
+    raise TypeError(f"Cannot forward {type(value).__name__} to the scheduler leader")
+
+
+def _decode(obj):
+    if "__datetime__" in obj:
+        return datetime.fromisoformat(obj["__datetime__"])
+    return obj
+
+
+class SchedulerLeader:
+    """
+    Elects one process per host to run the APScheduler jobs.
+
+    Every gunicorn worker imports app.py and would otherwise start its own
+    scheduler with its own in-memory jobs. Instead each worker calls start();
+    the one that takes an exclusive flock on SCHEDULER_LOCK_PATH starts the
+    scheduler, the others leave theirs stopped. add_job()/remove_job() made in
+    a follower are written to a SQLite outbox that the leader applies every
+    LEADER_POLL_SECONDS. The OS drops the lock when the leader exits, and the
+    next follower to retry it takes over (callbacks passed to start() run
+    whenever this process becomes leader). Job functions must be string
+    references and their arguments JSON-serializable (datetimes are allowed).
+
+    Periodic jobs every leader must run are declared with add_leader_job() in
+    every process instead: each process registers them on its own scheduler
+    when it is elected, so they survive a failover that the outbox, drained
+    only by the leader of the moment, would not.
+    """
+
+    def __init__(self, lock_path: str = SCHEDULER_LOCK_PATH, outbox_path: str = SCHEDULER_OUTBOX_PATH):
+        self.lock_path = lock_path
+        self.outbox_path = outbox_path
+        self._lock_file = None
+        self._local = threading.local()
+        self._on_elected: List[Callable[[], None]] = []
+        self._leader_jobs: Dict[str, Dict[str, Any]] = {}
+        self._thread: Optional[threading.Thread] = None
+        self._forwarded = 0
+        self._applied = 0
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.outbox_path, timeout=10, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    @property
+    def is_leader(self) -> bool:
+        return self._lock_file is not None
+
+    def _try_acquire(self) -> bool:
+        lock_file = open(self.lock_path, "a+")
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False
+        lock_file.seek(0)
+        lock_file.truncate()
+        lock_file.write(str(os.getpid()))
+        lock_file.flush()
+        self._lock_file = lock_file
+        return True
+
+    def start(self, app, on_elected: Optional[List[Callable[[], None]]] = None):
+        """Binds the scheduler to app and starts it if this process wins the lock."""
+        self._on_elected.extend(on_elected or [])
+        if not scheduler.app:
+            scheduler.init_app(app)
+        self._poll_once()
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="scheduler-leader", daemon=True)
+            self._thread.start()
+
+    def _become_leader(self):
+        if not scheduler.running:
+            scheduler.start()
+        logger.info(f"[SchedulerLeader] Process {os.getpid()} is the scheduler leader")
+        for job_id, kwargs in list(self._leader_jobs.items()):
+            try:
+                scheduler.add_job(id=job_id, replace_existing=True, **kwargs)
+            except Exception as e:
+                logger.error(f"[SchedulerLeader] Could not register leader job {job_id}: {str(e)}", exc_info=True)
+        for callback in self._on_elected:
+            try:
+                callback()
+            except Exception as e:
+                logger.error(f"[SchedulerLeader] Leader start-up callback {callback.__name__} failed: {str(e)}", exc_info=True)
+
+    def _poll_once(self):
+        if not self.is_leader and self._try_acquire():
+            self._become_leader()
+        if self.is_leader:
+            self._drain()
+
+    def _run(self):
+        while True:
+            time.sleep(LEADER_POLL_SECONDS)
+            try:
+                self._poll_once()
+            except Exception as e:
+                logger.error(f"[SchedulerLeader] Poll failed: {str(e)}", exc_info=True)
+
+    def _forward(self, op: str, args: Dict[str, Any]):
+        self._connect().execute(
+            "INSERT INTO scheduler_outbox (op, args, sender_pid, created_at) VALUES (?, ?, ?, ?)",
+            (op, json.dumps(args, default=_encode), os.getpid(), time.time()),
+        )
+        self._forwarded += 1
+        logger.info(f"[SchedulerLeader] Forwarded {op} {args.get('id') or args.get('prefix')} to the leader")
+
+    def _apply(self, op: str, args: Dict[str, Any]):
+        if op == "add_job":
+            scheduler.add_job(**args)
+        elif op == "remove_job":
+            try:
+                scheduler.remove_job(args["id"])
+            except Exception:
+                pass
+        elif op == "remove_jobs_with_prefix":
+            for job in scheduler.get_jobs():
+                if job.id.startswith(args["prefix"]):
+                    try:
+                        scheduler.remove_job(job.id)
+                    except Exception:
+                        pass
+        else:
+            logger.error(f"[SchedulerLeader] Unknown forwarded operation {op}")
+
+    def _drain(self):
+        conn = self._connect()
+        rows = conn.execute("SELECT id, op, args FROM scheduler_outbox ORDER BY id").fetchall()
+        for row in rows:
+            try:
+                self._apply(row["op"], json.loads(row["args"], object_hook=_decode))
+                self._applied += 1
+            except Exception as e:
+                logger.error(f"[SchedulerLeader] Dropping forwarded {row['op']} {row['id']}: {str(e)}", exc_info=True)
+            conn.execute("DELETE FROM scheduler_outbox WHERE id = ?", (row["id"],))
+
+    def add_job(self, **kwargs):
+        """scheduler.add_job on the leader, from any process."""
+        if self.is_leader:
+            return scheduler.add_job(**kwargs)
+        self._forward("add_job", kwargs)
+
+    def add_leader_job(self, id: str, **kwargs):
+        """Declares a job the leader runs, registered locally whenever this process is (or becomes) leader."""
+        self._leader_jobs[id] = kwargs
+        if self.is_leader:
+            return scheduler.add_job(id=id, replace_existing=True, **kwargs)
+
+    def remove_job(self, job_id: str):
+        if self.is_leader:
+            self._apply("remove_job", {"id": job_id})
+        else:
+            self._forward("remove_job", {"id": job_id})
+
+    def remove_jobs_with_prefix(self, prefix: str):
+        """Removes every pending job whose id starts with prefix."""
+        if self.is_leader:
+            self._apply("remove_jobs_with_prefix", {"prefix": prefix})
+        else:
+            self._forward("remove_jobs_with_prefix", {"prefix": prefix})
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "pid": os.getpid(),
+            "is_leader": self.is_leader,
+            "forwarded": self._forwarded,
+            "applied": self._applied,
+            "pending_forwards": self._connect().execute("SELECT COUNT(*) FROM scheduler_outbox").fetchone()[0],
+        }
+
+
+scheduler_leader = SchedulerLeader()
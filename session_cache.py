@@ -0,0 +1,180 @@
+import os
+import json
+import hashlib
+import logging
+import threading
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# --- Session Cache Configuration ---
+SESSION_CACHE_DIR = os.getenv("SESSION_CACHE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".session_cache"))
+# How long a captured rec.us session is trusted before it must be refreshed
+SESSION_TTL_MINUTES = int(os.getenv("SESSION_CACHE_TTL_MINUTES", "720"))
+# Sessions closer than this to expiry are refreshed by the background job
+SESSION_REFRESH_MARGIN_MINUTES = int(os.getenv("SESSION_CACHE_REFRESH_MARGIN_MINUTES", "60"))
+# --- End Session Cache Configuration ---
+
+
+def _models():
+    # models imports database, which connects to Supabase on import; load it only
+    # when a session is actually read or written so automation stays importable.
+    import models
+    return models
+
+
+class SessionCache:
+    """
+    Per-user cache of Playwright storage_state (cookies + localStorage) for rec.us.
+
+    Entries are encrypted with the same Fernet key used for passwords in models.py
+    and stored one file per user. Nothing is cached when no key is configured,
+    since a plaintext session is as sensitive as a plaintext password.
+    """
+
+    def __init__(self, cache_dir: str = SESSION_CACHE_DIR, ttl_minutes: int = SESSION_TTL_MINUTES):
+        self.cache_dir = cache_dir
+        self.ttl = timedelta(minutes=ttl_minutes)
+        self._lock = threading.Lock()
+
+    def _path(self, email: str) -> str:
+        digest = hashlib.sha256(email.strip().lower().encode()).hexdigest()
+        return os.path.join(self.cache_dir, f"{digest}.session")
+
+    def _read_entry(self, email: str) -> Optional[Dict[str, Any]]:
+        path = self._path(email)
+        try:
+            with open(path) as f:
+                encrypted = f.read()
+        except FileNotFoundError:
+            return None
+        except OSError as e:
+            logger.error(f"[SessionCache] Could not read cached session for {email}: {str(e)}")
+            return None
+
+        decrypted = _models().decrypt_data(encrypted)
+        if not decrypted:
+            logger.warning(f"[SessionCache] Cached session for {email} could not be decrypted; discarding.")
+            self.invalidate(email)
+            return None
+        try:
+            return json.loads(decrypted)
+        except json.JSONDecodeError:
+            logger.warning(f"[SessionCache] Cached session for {email} is corrupt; discarding.")
+            self.invalidate(email)
+            return None
+
+    def load(self, email: str) -> Optional[Dict[str, Any]]:
+        """Returns the cached storage_state for a user, or None if missing or expired."""
+        if not email:
+            return None
+        entry = self._read_entry(email)
+        if not entry:
+            return None
+        try:
+            expires_at = datetime.fromisoformat(entry["expires_at"])
+        except (KeyError, ValueError):
+            self.invalidate(email)
+            return None
+        if expires_at <= datetime.now():
+            logger.info(f"[SessionCache] Cached session for {email} expired at {expires_at.isoformat()}")
+            self.invalidate(email)
+            return None
+        return entry.get("storage_state")
+
+    def save(self, email: str, storage_state: Dict[str, Any]) -> bool:
+        """Encrypts and stores a user's storage_state, resetting its expiry."""
+        if not email or not storage_state:
+            return False
+        if not _models().fernet:
+            logger.warning("[SessionCache] ENCRYPTION_KEY not available; not caching rec.us session.")
+            return False
+
+        now = datetime.now()
+        entry = {
+            "email": email,
+            "saved_at": now.isoformat(),
+            "expires_at": (now + self.ttl).isoformat(),
+            "storage_state": storage_state,
+        }
+        encrypted = _models().encrypt_data(json.dumps(entry))
+        if not encrypted:
+            logger.error(f"[SessionCache] Failed to encrypt session for {email}; not caching.")
+            return False
+
+        path = self._path(email)
+        with self._lock:
+            try:
+                os.makedirs(self.cache_dir, mode=0o700, exist_ok=True)
+                tmp_path = f"{path}.tmp"
+                with open(tmp_path, "w") as f:
+                    f.write(encrypted)
+                os.chmod(tmp_path, 0o600)
+                os.replace(tmp_path, path)
+            except OSError as e:
+                logger.error(f"[SessionCache] Could not write cached session for {email}: {str(e)}")
+                return False
+        logger.info(f"[SessionCache] Cached rec.us session for {email} until {entry['expires_at']}")
+        return True
+
+    def invalidate(self, email: str):
+        """Drops a user's cached session (e.g. after rec.us rejected it)."""
+        try:
+            os.remove(self._path(email))
+            logger.info(f"[SessionCache] Invalidated cached session for {email}")
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logger.error(f"[SessionCache] Could not remove cached session for {email}: {str(e)}")
+
+    def expiring_emails(self, within_minutes: int = SESSION_REFRESH_MARGIN_MINUTES) -> List[str]:
+        """Emails whose cached sessions expire within the given margin."""
+        if not os.path.isdir(self.cache_dir):
+            return []
+        cutoff = datetime.now() + timedelta(minutes=within_minutes)
+        emails = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(".session"):
+                continue
+            try:
+                with open(os.path.join(self.cache_dir, name)) as f:
+                    decrypted = _models().decrypt_data(f.read())
+                entry = json.loads(decrypted) if decrypted else None
+            except (OSError, json.JSONDecodeError):
+                entry = None
+            if not entry or "email" not in entry:
+                continue
+            try:
+                if datetime.fromisoformat(entry["expires_at"]) <= cutoff:
+                    emails.append(entry["email"])
+            except (KeyError, ValueError):
+                emails.append(entry["email"])
+        return emails
+
+
+session_cache = SessionCache()
+
+
+def refresh_expiring_sessions():
+    """Scheduler job: re-authenticates users whose cached sessions are about to expire."""
+    # Imported here to avoid a circular import (automation imports this module)
+    from automation import TennisBooker
+    from models import UserInformation
+
+    emails = session_cache.expiring_emails()
+    if not emails:
+        return
+    logger.info(f"[SessionCache] Refreshing {len(emails)} expiring session(s)")
+    for email in emails:
+        try:
+            user_info = UserInformation.get_by_email(email)
+            if not user_info or not user_info.get('rec_account_password'):
+                logger.warning(f"[SessionCache] No credentials for {email}; dropping its cached session.")
+                session_cache.invalidate(email)
+                continue
+            booker = TennisBooker(email, user_info['rec_account_password'], user_id=email)
+            if not booker.refresh_session():
+                logger.warning(f"[SessionCache] Could not refresh session for {email}")
+        except Exception as e:
+            logger.error(f"[SessionCache] Error refreshing session for {email}: {str(e)}", exc_info=True)
@@ -0,0 +1,74 @@
+import logging
+import threading
+from typing import Any, Callable, Dict, Hashable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class _Call:
+    __slots__ = ("done", "result", "error", "waiters")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Registry of in-flight calls keyed by what they fetch.
+
+    do(key, fn) runs fn unless a call for the same key is already running in
+    this process; then it waits for that call and returns its result, or
+    re-raises its exception. Concurrent lookups of the same court/date thus
+    share one scrape instead of each opening a browser. Results are shared
+    between callers, so they must be treated as read-only. Nothing is kept
+    once a call finishes; caching is availability_cache's job.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+        self._counters = {"calls": 0, "shared": 0, "errors": 0}
+
+    def do(self, key: Hashable, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self._counters["calls"] += 1
+            else:
+                call.waiters += 1
+                self._counters["shared"] += 1
+
+        if not leader:
+            logger.debug(f"[SingleFlight] Joining in-flight call for {key!r}")
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn(*args, **kwargs)
+            return call.result
+        except BaseException as e:
+            call.error = e
+            with self._lock:
+                self._counters["errors"] += 1
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+            if call.waiters:
+                logger.info(f"[SingleFlight] {key!r} shared with {call.waiters} waiting caller(s)")
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {**self._counters, "in_flight": len(self._calls),
+                    "waiting": sum(call.waiters for call in self._calls.values())}
+
+
+single_flight = SingleFlight()
@@ -0,0 +1,257 @@
+import os
+import json
+import time
+import queue
+import logging
+import threading
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from automation import TennisBooker
+from availability_cache import availability_cache
+from availability_store import availability_store
+from booking_queue import booking_queue
+from booking_window import SF_TIMEZONE
+from models import BookingAttempt, SlotWatch
+
+logger = logging.getLogger(__name__)
+
+# --- Slot Watch Configuration ---
+SLOT_WATCH_ENABLED = os.getenv("SLOT_WATCH_ENABLED", "true").lower() == "true"
+# Dates watched at once; each takes a pooled browser (and a 'watch' admission slot) for one session at a time
+SLOT_WATCH_MAX_DATES = int(os.getenv("SLOT_WATCH_MAX_DATES", "1"))
+# How often the leader re-reads the active watches
+SLOT_WATCH_SYNC_SECONDS = int(os.getenv("SLOT_WATCH_SYNC_SECONDS", "30"))
+# /slot-events checks the event log this often, and ends a stream after this long (EventSource reconnects)
+SLOT_EVENT_POLL_SECONDS = float(os.getenv("SLOT_EVENT_POLL_SECONDS", "1"))
+SLOT_EVENT_STREAM_SECONDS = float(os.getenv("SLOT_EVENT_STREAM_SECONDS", "300"))
+# Open /slot-events streams allowed per gunicorn worker; each holds one of its threads
+# (--threads in supervisord.conf), so keep this well under that
+SLOT_EVENT_MAX_STREAMS = int(os.getenv("SLOT_EVENT_MAX_STREAMS", "8"))
+# --- End Slot Watch Configuration ---
+
+# Comment line sent on an idle stream so proxies keep it open
+_KEEPALIVE_SECONDS = 15
+
+_streams_lock = threading.Lock()
+_open_streams = 0
+
+
+def diff_snapshots(date_str: str, before: Dict[str, List[str]], after: Dict[str, List[str]]) -> List[Dict[str, Any]]:
+    """slot_added / slot_removed events between two snapshots of the same date."""
+    now = time.time()
+    events = []
+    for court_name in sorted(set(before) | set(after)):
+        old, new = set(before.get(court_name, [])), set(after.get(court_name, []))
+        for event_type, times in (("slot_added", new - old), ("slot_removed", old - new)):
+            events.extend({"type": event_type, "court_name": court_name, "date": date_str, "time": slot, "at": now}
+                          for slot in sorted(times))
+    return events
+
+
+def served_dates(watches: List[Dict[str, Any]], today: str, max_dates: int = SLOT_WATCH_MAX_DATES) -> List[str]:
+    """Dates watch mode covers: the soonest max_dates dates from today on with an active watch."""
+    if not SLOT_WATCH_ENABLED:
+        return []
+    return sorted({str(watch["date"]) for watch in watches if str(watch["date"]) >= today})[:max(1, max_dates)]
+
+
+def with_served(watches: List[Dict[str, Any]], today: str, max_dates: int = SLOT_WATCH_MAX_DATES) -> List[Dict[str, Any]]:
+    """watches, each with 'served': whether its date is currently being watched."""
+    served = set(served_dates(watches, today, max_dates))
+    return [{**watch, "served": str(watch["date"]) in served} for watch in watches]
+
+
+def matches(watch: Dict[str, Any], event: Dict[str, Any]) -> bool:
+    return (watch["court_name"] == event["court_name"] and str(watch["date"]) == event["date"]
+            and watch["earliest_time"] <= event["time"] <= watch["latest_time"])
+
+
+class SlotWatcher:
+    """
+    Watch mode for freed-up slots, run on the scheduler leader.
+
+    sync() (a scheduler job every SLOT_WATCH_SYNC_SECONDS) reads the active
+    slot_watches and keeps one TennisBooker.watch_availability thread per
+    watched date, for the soonest SLOT_WATCH_MAX_DATES dates (served_dates);
+    watches on later dates wait, flagged as not served, until one of those
+    dates has passed or its watches are closed. Every listing
+    snapshot is written to the shared availability store and diffed against
+    the previous one; the resulting slot_added / slot_removed events go
+    through an in-process queue to a dispatcher that appends them to the
+    store's event log (streamed by /slot-events) and books the first matching
+    slot of each auto_book watch through the booking queue.
+    """
+
+    def __init__(self, max_dates: int = SLOT_WATCH_MAX_DATES):
+        self.max_dates = max(1, max_dates)
+        self._lock = threading.Lock()
+        # date_str -> (watch thread, stop event)
+        self._threads: Dict[str, Tuple[threading.Thread, threading.Event]] = {}
+        self._watches: List[Dict[str, Any]] = []
+        # Ids of auto_book watches booking or booked by this process
+        self._claimed = set()
+        self._last: Dict[str, Dict[str, List[str]]] = {}
+        self._last_at: Dict[str, float] = {}
+        self._events: "queue.Queue[Dict[str, Any]]" = queue.Queue()
+        self._dispatcher: Optional[threading.Thread] = None
+        self._counters = {"snapshots": 0, "slot_added": 0, "slot_removed": 0, "auto_booked": 0, "auto_book_errors": 0}
+
+    def sync(self):
+        """Starts and stops per-date watches to match the active slot_watches."""
+        today = datetime.now(SF_TIMEZONE).strftime("%Y-%m-%d")
+        watches = SlotWatch.get_active(from_date=today)
+        wanted = served_dates(watches, today, self.max_dates)
+
+        with self._lock:
+            self._watches = watches
+            if self._dispatcher is None:
+                self._dispatcher = threading.Thread(target=self._dispatch, name="slot-watch-dispatch", daemon=True)
+                self._dispatcher.start()
+            for date_str in [date_str for date_str in self._threads if date_str not in wanted]:
+                _, stop = self._threads.pop(date_str)
+                stop.set()
+                self._last.pop(date_str, None)
+                logger.info(f"[SlotWatcher] Stopped watching {date_str}")
+            for date_str in wanted:
+                thread, _ = self._threads.get(date_str, (None, None))
+                if thread is not None and thread.is_alive():
+                    continue
+                stop = threading.Event()
+                thread = threading.Thread(target=TennisBooker("", "").watch_availability,
+                                          args=(date_str, self._on_snapshot, stop),
+                                          name=f"slot-watch-{date_str}", daemon=True)
+                self._threads[date_str] = (thread, stop)
+                thread.start()
+                logger.info(f"[SlotWatcher] Watching {date_str}")
+
+    def _on_snapshot(self, date_str: str, snapshot: Dict[str, List[str]]):
+        if not snapshot:
+            # Nothing parsed; a diff against it would report every slot as removed
+            return
+        availability_cache.put(date_str, snapshot)
+        with self._lock:
+            previous = self._last.get(date_str)
+            self._last[date_str] = snapshot
+            self._last_at[date_str] = time.time()
+            self._counters["snapshots"] += 1
+        if previous is None:
+            return
+        for event in diff_snapshots(date_str, previous, snapshot):
+            self._events.put(event)
+
+    def _dispatch(self):
+        while True:
+            event = self._events.get()
+            try:
+                event["id"] = availability_store.add_slot_events([event])[0]
+            except Exception as e:
+                logger.error(f"[SlotWatcher] Could not log {event['type']} event: {str(e)}")
+            try:
+                self._handle(event)
+            except Exception as e:
+                logger.error(f"[SlotWatcher] Could not handle {event['type']} event: {str(e)}", exc_info=True)
+
+    def _handle(self, event: Dict[str, Any]):
+        with self._lock:
+            self._counters[event["type"]] += 1
+            auto_book = [watch for watch in self._watches
+                         if watch.get("auto_book") and watch["id"] not in self._claimed and matches(watch, event)]
+        logger.info(f"[SlotWatcher] {event['type']}: {event['court_name']} {event['date']} {event['time']}")
+        if event["type"] == "slot_added":
+            for watch in auto_book:
+                self._auto_book(watch, event)
+
+    def _auto_book(self, watch: Dict[str, Any], event: Dict[str, Any]):
+        """Queues a booking of the freed slot for watch's user and closes the watch."""
+        with self._lock:
+            if watch["id"] in self._claimed:
+                return
+            self._claimed.add(watch["id"])
+        booking_time = datetime.strptime(f"{event['date']} {event['time']}", "%Y-%m-%d %H:%M").replace(tzinfo=SF_TIMEZONE)
+        attempt = BookingAttempt(court_name=event["court_name"], booking_time=booking_time, user_email=watch["user_email"])
+        try:
+            existing_attempt = BookingAttempt.get_active_by_key(attempt.idempotency_key)
+            attempt_data = existing_attempt or attempt.save()
+            if not attempt_data:
+                raise RuntimeError("could not save booking attempt")
+            if not existing_attempt:
+                job_id = booking_queue.enqueue(attempt_data["id"], dedupe_key=attempt.idempotency_key)
+                BookingAttempt.update_status(attempt_data["id"], "queued")
+                logger.info(f"[SlotWatcher] Watch {watch['id']} queued attempt {attempt_data['id']} as job {job_id}")
+            SlotWatch.update_status(watch["id"], "booked", attempt_data["id"])
+            with self._lock:
+                self._counters["auto_booked"] += 1
+        except Exception as e:
+            with self._lock:
+                self._counters["auto_book_errors"] += 1
+                # Let the next freed slot try again
+                self._claimed.discard(watch["id"])
+            logger.error(f"[SlotWatcher] Auto-book for watch {watch['id']} failed: {str(e)}", exc_info=True)
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.time()
+        with self._lock:
+            return {
+                **self._counters,
+                "active_watches": len(self._watches),
+                "unserved_dates": sorted({str(watch["date"]) for watch in self._watches} - set(self._threads)),
+                "queued_events": self._events.qsize(),
+                "open_streams": _open_streams,
+                "dates": {
+                    date_str: {
+                        "alive": thread.is_alive(),
+                        "last_snapshot_age_seconds": round(now - self._last_at[date_str], 1) if date_str in self._last_at else None,
+                    }
+                    for date_str, (thread, _) in self._threads.items()
+                },
+            }
+
+
+def open_stream() -> bool:
+    """Takes one of this process's SLOT_EVENT_MAX_STREAMS stream slots; False if all are in use."""
+    global _open_streams
+    with _streams_lock:
+        if _open_streams >= SLOT_EVENT_MAX_STREAMS:
+            return False
+        _open_streams += 1
+        return True
+
+
+def close_stream():
+    global _open_streams
+    with _streams_lock:
+        _open_streams = max(0, _open_streams - 1)
+
+
+def stream_slot_events(last_id: Optional[int] = None) -> Iterator[str]:
+    """
+    Server-sent events for /slot-events: every logged slot event after
+    last_id (default: only new ones), then a keep-alive comment when idle.
+    Ends after SLOT_EVENT_STREAM_SECONDS; EventSource reconnects with
+    Last-Event-ID and resumes where it left off.
+    """
+    if last_id is None:
+        last_id = availability_store.last_slot_event_id()
+    ends = time.time() + SLOT_EVENT_STREAM_SECONDS
+    last_sent = time.time()
+    yield "retry: 2000\n\n"
+    while time.time() < ends:
+        events = availability_store.slot_events_after(last_id)
+        for event in events:
+            last_id = event["id"]
+            yield f"id: {event['id']}\nevent: {event['type']}\ndata: {json.dumps(event)}\n\n"
+        if events:
+            last_sent = time.time()
+        elif time.time() - last_sent >= _KEEPALIVE_SECONDS:
+            yield ": keep-alive\n\n"
+            last_sent = time.time()
+        time.sleep(SLOT_EVENT_POLL_SECONDS)
+
+
+slot_watcher = SlotWatcher()
+
+
+def sync_slot_watches():
+    """Scheduler job entry point."""
+    slot_watcher.sync()
@@ -0,0 +1,2 @@
+-- Stage/fire/click/confirm timeline of pre-staged booking attempts (see release_launcher.BookingTimeline)
+alter table booking_attempts add column if not exists timeline jsonb;
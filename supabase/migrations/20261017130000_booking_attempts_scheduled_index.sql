@@ -0,0 +1,2 @@
+-- Startup recovery reads every scheduled attempt in booking_time order (see scheduler.recover_scheduled_bookings)
+create index if not exists booking_attempts_status_booking_time_idx on booking_attempts (status, booking_time);
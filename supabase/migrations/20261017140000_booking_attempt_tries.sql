@@ -0,0 +1,2 @@
+-- Every booking try of an attempt: time, latency, error and retryable/terminal class (see retry_policy.try_record)
+alter table booking_attempts add column if not exists tries jsonb;
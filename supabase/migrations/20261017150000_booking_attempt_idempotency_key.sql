@@ -0,0 +1,6 @@
+-- One live attempt per user, court and slot (see BookingAttempt.make_idempotency_key).
+-- Failed attempts drop out of the index, so a slot can be submitted again after a failure.
+alter table booking_attempts add column if not exists idempotency_key text;
+create unique index if not exists booking_attempts_active_idempotency_key_idx
+    on booking_attempts (idempotency_key)
+    where status in ('scheduled', 'queued', 'running', 'completed');
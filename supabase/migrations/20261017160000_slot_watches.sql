@@ -0,0 +1,16 @@
+-- Courts/dates watched for freed-up slots (see slot_watcher.py).
+-- A watch matches slots on its date starting between earliest_time and latest_time;
+-- with auto_book the first match is booked and the watch becomes 'booked'.
+create table if not exists slot_watches (
+    id bigint generated by default as identity primary key,
+    user_email text not null,
+    court_name text not null,
+    date date not null,
+    earliest_time text not null default '00:00',
+    latest_time text not null default '23:59',
+    auto_book boolean not null default false,
+    status text not null default 'active',
+    attempt_id bigint references booking_attempts (id),
+    created_at timestamptz not null default now()
+);
+create index if not exists slot_watches_active_date_idx on slot_watches (status, date);
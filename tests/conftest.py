@@ -0,0 +1,47 @@
+import os
+import sys
+import types
+import tempfile
+
+# The modules under test are flat files at the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Keep the host-wide SQLite files and the scheduler lock of imported modules out of the checkout
+_workdir = tempfile.mkdtemp(prefix="tennis_tests_")
+for _name, _file in (("ADMISSION_PATH", "admission.sqlite3"),
+                     ("AVAILABILITY_STORE_PATH", "availability.sqlite3"),
+                     ("BOOKING_QUEUE_PATH", "booking_queue.sqlite3"),
+                     ("SCHEDULER_LOCK_PATH", "scheduler.lock"),
+                     ("SCHEDULER_OUTBOX_PATH", "scheduler_outbox.sqlite3")):
+    os.environ.setdefault(_name, os.path.join(_workdir, _file))
+
+
+class _OfflineQuery:
+    """Supabase query builder for tests: every filter chains and every query finds no rows."""
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: self
+
+    def execute(self):
+        return types.SimpleNamespace(data=[], count=0)
+
+
+class _OfflineSupabase:
+    def table(self, name):
+        return _OfflineQuery()
+
+
+def _offline_database() -> types.ModuleType:
+    """
+    Stands in for database.py, which calls create_client at import time and so
+    needs SUPABASE_URL/SUPABASE_KEY. models, app and slot_watcher can then be
+    imported offline and in CI; tests monkeypatch the model methods whose
+    answers matter to them.
+    """
+    module = types.ModuleType("database")
+    module.supabase = _OfflineSupabase()
+    module.init_db = lambda: True
+    return module
+
+
+sys.modules["database"] = _offline_database()
@@ -0,0 +1,158 @@
+import multiprocessing
+import threading
+import time
+
+import pytest
+
+from admission import AdmissionController, AdmissionRejected
+
+
+@pytest.fixture
+def make(tmp_path):
+    """Builds controllers on one slot table, as separate processes on a host would."""
+    path = str(tmp_path / "admission.sqlite3")
+
+    def build(**kwargs):
+        kwargs.setdefault("pool_size", 8)
+        return AdmissionController(path=path, **kwargs)
+
+    build.path = path
+    return build
+
+
+def _wait_until(predicate, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, "condition not reached"
+        time.sleep(0.005)
+
+
+def _queue_up(controller, kind, order, name=None):
+    queued = controller.metrics()["kinds"][kind]["queued"]
+
+    def run():
+        with controller.admit(kind, timeout=2):
+            order.append(name or kind)
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    _wait_until(lambda: controller.metrics()["kinds"][kind]["queued"] == queued + 1)
+    return thread
+
+
+def _admission_order(make, first, second):
+    """Order in which a waiting `first` and a later waiting `second` get the only slot."""
+    holder = make(slots=1, reserved_for_booking=0)
+    order = []
+    ticket = holder.acquire("book")
+    threads = [_queue_up(make(slots=1, reserved_for_booking=0), first, order),
+               _queue_up(make(slots=1, reserved_for_booking=0), second, order)]
+    holder.release(ticket)
+    for thread in threads:
+        thread.join(2)
+    return order
+
+
+def test_booking_goes_before_an_earlier_scrape(make):
+    assert _admission_order(make, "scrape", "book") == ["book", "scrape"]
+
+
+def test_scrape_goes_before_an_earlier_watch(make):
+    assert _admission_order(make, "watch", "scrape") == ["scrape", "watch"]
+
+
+def test_same_kind_is_first_come_first_served(make):
+    controller = make(slots=1, reserved_for_booking=0)
+    order = []
+    ticket = controller.acquire("scrape")
+    threads = [_queue_up(controller, "scrape", order, name) for name in ("first", "second")]
+    controller.release(ticket)
+    for thread in threads:
+        thread.join(2)
+    assert order == ["first", "second"]
+
+
+@pytest.mark.parametrize("kind", ["scrape", "watch"])
+def test_reserved_slot_is_kept_for_bookings(make, kind):
+    controller = make(slots=2, reserved_for_booking=1)
+    controller.acquire(kind)
+
+    with pytest.raises(TimeoutError):
+        controller.acquire(kind, timeout=0.05)
+    controller.acquire("book", timeout=0.05)
+    assert controller.metrics()["kinds"][kind]["timed_out"] == 1
+    assert controller.metrics()["in_use"] == 2
+
+
+def test_reservation_leaves_scrapes_one_slot(make):
+    controller = make(slots=1, reserved_for_booking=5)
+    assert controller.reserved_for_booking == 0
+    controller.acquire("scrape", timeout=0.05)
+
+
+def test_slots_never_exceed_the_browser_pool(make):
+    assert make(slots=4, pool_size=2).slots == 2
+
+
+def test_scrapes_are_rejected_once_the_queue_is_full(make):
+    controller = make(slots=1, reserved_for_booking=0, max_queued_scrapes=0)
+    controller.acquire("book")
+
+    with pytest.raises(AdmissionRejected):
+        controller.acquire("scrape")
+    # Bookings are never rejected, only time out
+    with pytest.raises(TimeoutError):
+        controller.acquire("book", timeout=0.05)
+    assert controller.metrics()["kinds"]["scrape"]["rejected"] == 1
+    assert controller.metrics()["queue_depth"] == 0
+
+
+def test_slots_are_shared_by_every_controller_on_the_host(make):
+    web, worker = make(slots=2, reserved_for_booking=1), make(slots=2, reserved_for_booking=1)
+    web.acquire("scrape")
+
+    # The other process's scrape cannot use the reserved slot, its booking can
+    with pytest.raises(TimeoutError):
+        worker.acquire("scrape", timeout=0.1)
+    worker.acquire("book", timeout=0.1)
+    with pytest.raises(TimeoutError):
+        web.acquire("book", timeout=0.1)
+    assert web.metrics()["in_use"] == worker.metrics()["in_use"] == 2
+
+
+def _hold_slot(path, held):
+    AdmissionController(path=path, slots=1, reserved_for_booking=0, pool_size=1).acquire("book")
+    held.set()
+    time.sleep(60)
+
+
+def test_slots_of_a_dead_process_are_freed(make):
+    context = multiprocessing.get_context("fork")
+    held = context.Event()
+    child = context.Process(target=_hold_slot, args=(make.path, held), daemon=True)
+    child.start()
+    try:
+        assert held.wait(5)
+        controller = make(slots=1, reserved_for_booking=0)
+        with pytest.raises(TimeoutError):
+            controller.acquire("book", timeout=0.1)
+    finally:
+        child.kill()
+        child.join(5)
+
+    controller.acquire("book", timeout=1)
+    assert controller.metrics()["kinds"]["book"]["in_use"] == 1
+
+
+def test_busy_reports_held_slots(make):
+    controller = make(slots=1, reserved_for_booking=0)
+    assert not controller.busy("watch")
+    ticket = controller.acquire("watch")
+    assert controller.busy("watch") and not controller.busy("scrape")
+    controller.release(ticket)
+    assert not controller.busy("watch")
+
+
+def test_unknown_kind_is_refused(make):
+    with pytest.raises(ValueError):
+        make().acquire("download")
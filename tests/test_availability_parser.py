@@ -0,0 +1,46 @@
+import os
+
+import pytest
+
+from availability_parser import PARSERS, parse_availability_snapshot
+
+CORPUS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks", "fixtures",
+                          "parser_corpus")
+
+# Class lists as a server may render them: a trailing space on the container and a
+# double space inside the slot label's class, which BeautifulSoup both ignores
+MESSY_PAGE = """
+<html><body>
+<div class="rounded-xl border border-gray-200 p-3 ">
+  <p class="text-[1rem] font-medium text-black md:text-[1.125rem] mb-1">Alice Marble</p>
+  <p class="text-[0.875rem]  font-medium text-black md:text-[1rem] mb-2">Tennis</p>
+  <div class="relative">
+    <div class="swiper-wrapper">
+      <div class="swiper-slide"><p class="text-[0.875rem]  font-medium">7:30 AM</p></div>
+      <div class="swiper-slide swiper-slide-next"><p class=" text-[0.875rem] font-medium">1:00 PM</p></div>
+    </div>
+  </div>
+</div>
+<div class="rounded-xl border border-gray-200 p-3 extra">
+  <p class="text-[1rem] font-medium text-black md:text-[1.125rem] mb-1">Not A Listing</p>
+  <p class="text-[0.875rem] font-medium text-black md:text-[1rem] mb-2">Tennis</p>
+</div>
+</body></html>
+"""
+
+
+@pytest.mark.parametrize("backend", sorted(PARSERS))
+def test_backends_match_class_lists_regardless_of_whitespace(backend):
+    expected = parse_availability_snapshot(MESSY_PAGE, backend="html.parser")
+
+    assert expected == {"Alice Marble": ["07:30", "13:00"]}
+    assert parse_availability_snapshot(MESSY_PAGE, backend=backend) == expected
+
+
+@pytest.mark.parametrize("backend", sorted(PARSERS))
+@pytest.mark.parametrize("page", sorted(os.listdir(CORPUS_DIR)))
+def test_backends_agree_on_the_saved_corpus(backend, page):
+    with open(os.path.join(CORPUS_DIR, page), encoding="utf-8") as f:
+        html = f.read()
+
+    assert parse_availability_snapshot(html, backend=backend) == parse_availability_snapshot(html, backend="html.parser")
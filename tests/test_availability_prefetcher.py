@@ -0,0 +1,54 @@
+import math
+
+import pytest
+
+import availability_prefetcher
+from admission import AdmissionController
+from availability_prefetcher import AvailabilityPrefetcher
+from availability_store import AvailabilityStore
+
+
+class _Booker:
+    scraped = []
+
+    def __init__(self, email, password):
+        pass
+
+    def get_availability_snapshot(self, date_str):
+        self.scraped.append(date_str)
+        return {"Alice Marble": ["08:00"]}
+
+
+@pytest.fixture
+def prefetcher(tmp_path, monkeypatch):
+    controller = AdmissionController(path=str(tmp_path / "admission.sqlite3"))
+    store = AvailabilityStore(str(tmp_path / "availability.sqlite3"))
+    _Booker.scraped = []
+    monkeypatch.setattr(availability_prefetcher, "admission_controller", controller)
+    monkeypatch.setattr(availability_prefetcher, "availability_store", store)
+    monkeypatch.setattr(availability_prefetcher.availability_cache, "store", store)
+    monkeypatch.setattr(availability_prefetcher, "TennisBooker", _Booker)
+    prefetcher = AvailabilityPrefetcher()
+    monkeypatch.setattr(prefetcher, "active_courts", lambda: ["Alice Marble"])
+    monkeypatch.setattr(prefetcher, "due_dates", lambda: [("2026-10-20", math.inf), ("2026-10-21", 2.0)])
+    prefetcher.controller = controller
+    return prefetcher
+
+
+def test_due_dates_are_fetched(prefetcher):
+    tick = prefetcher.tick()
+
+    assert tick["fetched"] == ["2026-10-20", "2026-10-21"] and tick["skipped"] == []
+    assert _Booker.scraped == ["2026-10-20", "2026-10-21"]
+
+
+def test_tick_yields_while_a_slot_watch_holds_a_browser(prefetcher):
+    ticket = prefetcher.controller.acquire("watch")
+    try:
+        tick = prefetcher.tick()
+    finally:
+        prefetcher.controller.release(ticket)
+
+    assert tick["fetched"] == [] and tick["skipped"] == ["2026-10-20", "2026-10-21"]
+    assert _Booker.scraped == []
+    assert prefetcher.stats()["yielded_to_watch"] == 1
@@ -0,0 +1,127 @@
+import asyncio
+import os
+import time
+from contextlib import asynccontextmanager
+
+import pytest
+
+import availability_scanner
+from admission import AdmissionController
+from availability_cache import AvailabilityCache
+from availability_parser import parse_availability_snapshot
+from availability_store import AvailabilityStore
+
+FIXTURE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                       "benchmarks", "fixtures", "parser_corpus", "typical_day.html")
+NAVIGATION_SECONDS = 0.2
+
+
+class _Tracker:
+    def __init__(self):
+        self.running = 0
+        self.peak = 0
+        self.browsers = 0
+
+
+class _FakePage:
+    def __init__(self, tracker, html):
+        self.tracker = tracker
+        self.html = html
+
+    async def content(self):
+        return self.html
+
+
+class _FakeContext:
+    def __init__(self, tracker, html):
+        self.tracker = tracker
+        self.html = html
+
+    async def route(self, pattern, handler):
+        pass
+
+    def on(self, event, handler):
+        pass
+
+    async def new_page(self):
+        return _FakePage(self.tracker, self.html)
+
+    async def close(self):
+        pass
+
+
+class _FakeBrowser:
+    def __init__(self, tracker, html):
+        self.tracker = tracker
+        self.html = html
+
+    async def new_context(self, **options):
+        return _FakeContext(self.tracker, self.html)
+
+
+@pytest.fixture
+def scanner(tmp_path, monkeypatch):
+    """The scanner with a fake Chromium, its own store and the default admission budget on a fresh slot table."""
+    tracker = _Tracker()
+    with open(FIXTURE, encoding="utf-8") as fixture:
+        html = fixture.read()
+
+    @asynccontextmanager
+    async def launch_browser():
+        tracker.browsers += 1
+        yield _FakeBrowser(tracker, html)
+
+    async def navigate(page, target_date):
+        tracker.running += 1
+        tracker.peak = max(tracker.peak, tracker.running)
+        await asyncio.sleep(NAVIGATION_SECONDS)
+        tracker.running -= 1
+
+    controller = AdmissionController(path=str(tmp_path / "admission.sqlite3"))
+    monkeypatch.setattr(availability_scanner, "_launch_browser", launch_browser)
+    monkeypatch.setattr(availability_scanner, "_navigate_to_date", navigate)
+    monkeypatch.setattr(availability_scanner, "admission_controller", controller)
+    monkeypatch.setattr(availability_scanner, "availability_cache",
+                        AvailabilityCache(store=AvailabilityStore(str(tmp_path / "availability.sqlite3"))))
+    tracker.controller = controller
+    tracker.expected = parse_availability_snapshot(html)
+    return tracker
+
+
+def test_booking_window_is_scanned_concurrently_under_the_default_budget(scanner):
+    dates = availability_scanner.booking_window_dates()
+    # Default config: one of the two host-wide slots is reserved for bookings, leaving a single scrape slot
+    assert scanner.controller.slots - scanner.controller.reserved_for_booking == 1
+
+    started = time.monotonic()
+    results = availability_scanner.scan_availability(dates)
+    elapsed = time.monotonic() - started
+
+    assert results == {date_str: scanner.expected for date_str in dates}
+    assert scanner.peak == min(len(dates), availability_scanner.SCANNER_CONCURRENCY) > 1
+    assert elapsed < len(dates) * NAVIGATION_SECONDS / 2
+    # One browser and one admission slot for the whole range
+    assert scanner.browsers == 1
+    assert scanner.controller.metrics()["kinds"]["scrape"]["admitted"] == 1
+
+
+def test_stored_dates_are_not_scraped_again(scanner):
+    dates = availability_scanner.booking_window_dates(3)
+    availability_scanner.scan_availability(dates)
+
+    assert availability_scanner.scan_availability(dates) == {date_str: scanner.expected for date_str in dates}
+    assert scanner.browsers == 1
+
+
+def test_a_failed_date_maps_to_an_empty_snapshot(scanner, monkeypatch):
+    dates = availability_scanner.booking_window_dates(3)
+
+    async def navigate(page, target_date):
+        if target_date.strftime("%Y-%m-%d") == dates[1]:
+            raise RuntimeError("calendar did not open")
+
+    monkeypatch.setattr(availability_scanner, "_navigate_to_date", navigate)
+
+    results = availability_scanner.scan_availability(dates)
+
+    assert results[dates[1]] == {} and results[dates[0]] == results[dates[2]] == scanner.expected
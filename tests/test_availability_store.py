@@ -0,0 +1,35 @@
+import sqlite3
+
+from availability_store import AvailabilityStore
+
+
+def test_eviction_keeps_the_entries_that_are_read(tmp_path):
+    store = AvailabilityStore(str(tmp_path / "availability.sqlite3"))
+    store.put("2026-10-18", {"Alice Marble": ["08:00"]}, fetched_at=1000.0)
+    store.put("2026-10-19", {"Alice Marble": ["09:00"]}, fetched_at=2000.0)
+
+    # The oldest fetch is the one users keep asking for
+    for _ in range(3):
+        assert store.get_date("2026-10-18") == ({"Alice Marble": ["08:00"]}, 1000.0)
+    evicted = store.put("2026-10-20", {"Alice Marble": ["10:00"]}, fetched_at=3000.0, max_entries=2)
+
+    assert evicted == 1
+    assert store.get("Alice Marble", "2026-10-18") == (["08:00"], 1000.0)
+    assert store.get("Alice Marble", "2026-10-19") is None
+    assert store.get("Alice Marble", "2026-10-20") == (["10:00"], 3000.0)
+
+
+def test_store_files_without_last_used_are_migrated(tmp_path):
+    path = str(tmp_path / "availability.sqlite3")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE availability (court_name TEXT NOT NULL, date_str TEXT NOT NULL, times TEXT NOT NULL, "
+                 "fetched_at REAL NOT NULL, PRIMARY KEY (court_name, date_str))")
+    conn.execute("INSERT INTO availability VALUES ('Alice Marble', '2026-10-18', '[\"08:00\"]', 1000.0)")
+    conn.commit()
+    conn.close()
+
+    store = AvailabilityStore(path)
+    store.put("2026-10-19", {"Alice Marble": ["09:00"]}, max_entries=1)
+
+    assert store.get("Alice Marble", "2026-10-18") is None
+    assert store.get("Alice Marble", "2026-10-19")[0] == ["09:00"]
@@ -0,0 +1,76 @@
+import os
+import time
+
+import pytest
+
+import booking_queue as queue_module
+from booking_queue import BookingQueue
+
+
+@pytest.fixture
+def queue(tmp_path):
+    return BookingQueue(path=str(tmp_path / "queue.sqlite3"))
+
+
+def test_claim_takes_the_oldest_runnable_job_once(queue):
+    first = queue.enqueue(1)
+    queue.enqueue(2, run_at=time.time() + 3600)
+    second = queue.enqueue(3)
+
+    job = queue.claim()
+    assert job["id"] == first
+    assert job["status"] == "running" and job["worker_pid"] == os.getpid()
+    assert queue.claim()["id"] == second
+    # The delayed job is not runnable yet
+    assert queue.claim() is None
+
+
+def test_claim_decodes_the_payload(queue):
+    queue.enqueue(1, {"phase": "retry", "retry": 2})
+    assert queue.claim()["payload"] == {"phase": "retry", "retry": 2}
+
+
+def test_enqueue_collapses_duplicates_of_another_attempt(queue):
+    job_id = queue.enqueue(1, dedupe_key="user|court|slot")
+
+    assert queue.enqueue(2, dedupe_key="user|court|slot") == job_id
+    # Retries of the same attempt are not duplicates
+    assert queue.enqueue(1, dedupe_key="user|court|slot") != job_id
+    assert queue.stats() == {"queued": 2}
+
+
+def test_finished_jobs_no_longer_collapse(queue):
+    job_id = queue.enqueue(1, dedupe_key="user|court|slot")
+    queue.finish(queue.claim()["id"])
+
+    assert queue.enqueue(2, dedupe_key="user|court|slot") != job_id
+
+
+def test_finish_records_failures(queue):
+    job_id = queue.enqueue(1)
+    queue.claim()
+    queue.finish(job_id, "Login rejected")
+
+    assert queue.jobs_for_attempt(1)[0]["status"] == "failed"
+    assert queue.jobs_for_attempt(1)[0]["error"] == "Login rejected"
+
+
+def test_requeue_orphaned_only_takes_jobs_of_dead_workers(queue, monkeypatch):
+    orphaned = queue.enqueue(1)
+    queue.enqueue(2)
+    queue.claim()
+    queue.claim()
+    queue._connect().execute("UPDATE booking_jobs SET worker_pid = 999999 WHERE id = ?", (orphaned,))
+    monkeypatch.setattr(queue_module, "_pid_alive", lambda pid: pid != 999999)
+
+    assert queue.requeue_orphaned() == 1
+    assert queue.stats() == {"queued": 1, "running": 1}
+    assert queue.position(orphaned) == 0
+
+
+def test_reconnects_after_fork(queue, monkeypatch):
+    inherited = queue._connect()
+    parent_pid = os.getpid()
+    monkeypatch.setattr(os, "getpid", lambda: parent_pid + 1)
+
+    assert queue._connect() is not inherited
@@ -0,0 +1,69 @@
+from datetime import datetime, timedelta
+
+import booking_window
+from booking_window import SF_TIMEZONE, job_chain, release_instant
+
+
+def test_default_rule_releases_seven_days_ahead_at_eight(monkeypatch):
+    monkeypatch.setattr(booking_window, "BOOKING_WINDOW_RULES", {"default": dict(booking_window.DEFAULT_RULE)})
+    booking_time = datetime(2026, 10, 24, 18, 30, tzinfo=SF_TIMEZONE)
+
+    assert release_instant("Any Court", booking_time) == datetime(2026, 10, 17, 8, 0, tzinfo=SF_TIMEZONE)
+
+
+def test_naive_and_utc_times_are_read_in_sf_time(monkeypatch):
+    monkeypatch.setattr(booking_window, "BOOKING_WINDOW_RULES", {"default": dict(booking_window.DEFAULT_RULE)})
+    utc = datetime(2026, 10, 25, 1, 30, tzinfo=booking_window.ZoneInfo("UTC"))
+
+    # 01:30 UTC on the 25th is 18:30 on the 24th in San Francisco
+    assert release_instant("Any Court", utc).date() == datetime(2026, 10, 17).date()
+    assert release_instant("Any Court", datetime(2026, 10, 24, 18, 30)) == \
+        datetime(2026, 10, 17, 8, 0, tzinfo=SF_TIMEZONE)
+
+
+def test_rolling_rule_releases_at_the_slot_time(monkeypatch):
+    monkeypatch.setattr(booking_window, "BOOKING_WINDOW_RULES", {
+        "default": dict(booking_window.DEFAULT_RULE),
+        "Alice Marble Tennis Courts": {"days_ahead": 2, "release_time": "rolling"},
+    })
+    booking_time = datetime(2026, 10, 24, 18, 30, tzinfo=SF_TIMEZONE)
+
+    assert release_instant("Alice Marble Tennis Courts", booking_time) == \
+        datetime(2026, 10, 22, 18, 30, tzinfo=SF_TIMEZONE)
+    assert release_instant("Other Court", booking_time) == datetime(2026, 10, 17, 8, 0, tzinfo=SF_TIMEZONE)
+
+
+def test_chain_before_release_has_prewarm_fire_and_retries(monkeypatch):
+    monkeypatch.setattr(booking_window, "PREWARM_LEAD_SECONDS", 300)
+    monkeypatch.setattr(booking_window, "RETRY_OFFSETS_SECONDS", [5.0, 15.0])
+    release_at = datetime(2026, 10, 17, 8, 0, tzinfo=SF_TIMEZONE)
+
+    chain = job_chain(release_at, 20, release_at - timedelta(hours=1))
+
+    assert chain == [
+        {"phase": "prewarm", "run_date": release_at - timedelta(seconds=300)},
+        {"phase": "fire", "run_date": release_at - timedelta(seconds=20)},
+        {"phase": "retry", "run_date": release_at + timedelta(seconds=5)},
+        {"phase": "retry", "run_date": release_at + timedelta(seconds=15)},
+    ]
+
+
+def test_chain_inside_the_prewarm_lead_fires_now(monkeypatch):
+    monkeypatch.setattr(booking_window, "PREWARM_LEAD_SECONDS", 300)
+    monkeypatch.setattr(booking_window, "RETRY_OFFSETS_SECONDS", [5.0])
+    release_at = datetime(2026, 10, 17, 8, 0, tzinfo=SF_TIMEZONE)
+    now = release_at - timedelta(seconds=10)
+
+    assert [job["phase"] for job in job_chain(release_at, 20, now)] == ["fire", "retry"]
+    assert job_chain(release_at, 20, now)[0]["run_date"] == now
+
+
+def test_chain_after_release_only_retries_from_now(monkeypatch):
+    monkeypatch.setattr(booking_window, "RETRY_OFFSETS_SECONDS", [5.0, 15.0])
+    release_at = datetime(2026, 10, 17, 8, 0, tzinfo=SF_TIMEZONE)
+    now = release_at + timedelta(minutes=3)
+
+    assert job_chain(release_at, 20, now) == [
+        {"phase": "retry", "run_date": now + timedelta(seconds=5)},
+        {"phase": "retry", "run_date": now + timedelta(seconds=15)},
+    ]
@@ -0,0 +1,35 @@
+import pytest
+
+from clock_sync import estimate_offset, offset_bounds
+
+
+def test_bounds_cover_the_round_trip_and_the_truncated_second():
+    assert offset_bounds((100.0, 100.2, 150.0)) == (pytest.approx(49.8), pytest.approx(51.0))
+
+
+def test_samples_at_different_phases_narrow_the_offset():
+    # Server clock is 50.3 s ahead; Date headers are truncated to the second
+    offset = 50.3
+    samples = []
+    for sent in (1000.0, 1001.25, 1002.5, 1003.75, 1004.9):
+        received = sent + 0.1
+        server_at = sent + 0.05 + offset
+        samples.append((sent, received, float(int(server_at))))
+
+    estimate = estimate_offset(samples)
+
+    assert estimate["method"] == "intersection"
+    assert estimate["uncertainty"] < 0.5
+    assert abs(estimate["offset"] - offset) <= estimate["uncertainty"]
+    assert estimate["rtt_min"] == pytest.approx(0.1)
+    assert estimate["rtt_jitter"] == pytest.approx(0.0, abs=1e-9)
+
+
+def test_disagreeing_samples_fall_back_to_the_midpoints():
+    # The second response is a cached page with a Date a minute old
+    samples = [(1000.0, 1000.2, 1050.0), (1010.0, 1010.2, 1000.0)]
+
+    estimate = estimate_offset(samples)
+
+    assert estimate["method"] == "midpoint"
+    assert estimate["uncertainty"] == pytest.approx(0.6)
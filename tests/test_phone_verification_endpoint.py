@@ -0,0 +1,76 @@
+import time
+import types
+from datetime import datetime, timezone
+
+import pytest
+
+models = pytest.importorskip("models", exc_type=ImportError)
+endpoint = pytest.importorskip("phone_verification_endpoint", exc_type=ImportError)
+
+
+class _UsersTable:
+    """One user's stored verification code, as the Supabase users table returns it."""
+
+    def __init__(self, code, received_at):
+        self.row = {"verification_code": code,
+                    "verification_code_timestamp": datetime.fromtimestamp(received_at, timezone.utc).isoformat()}
+        self._update = None
+
+    def table(self, name):
+        return self
+
+    def select(self, *args):
+        self._update = None
+        return self
+
+    def update(self, data):
+        self._update = data
+        return self
+
+    def eq(self, *args):
+        return self
+
+    def limit(self, *args):
+        return self
+
+    def execute(self):
+        if self._update is not None:
+            self.row.update(self._update)
+        return types.SimpleNamespace(data=[dict(self.row)])
+
+
+@pytest.fixture
+def stored_code(monkeypatch):
+    def store(code, received_at):
+        table = _UsersTable(code, received_at)
+        monkeypatch.setattr(models, "supabase", table)
+        return table
+    return store
+
+
+@pytest.fixture
+def client(monkeypatch):
+    # Nothing is published to this process, so /wait_code falls back to the stored copy
+    monkeypatch.setattr(endpoint.verification_broker, "wait_for_code", lambda email, timeout, since: None)
+    return endpoint.app.test_client()
+
+
+@pytest.mark.parametrize("path", ["/get_code", "/wait_code"])
+def test_stored_code_from_before_since_is_not_returned(client, stored_code, path):
+    table = stored_code("111111", received_at=time.time() - 60)
+
+    response = client.get(path, query_string={"email": "player@example.com", "since": time.time() - 10, "timeout": 0})
+
+    assert response.get_json() == {"status": "not_available"}
+    # Left in place, not consumed by the request that could not use it
+    assert table.row["verification_code"] == "111111"
+
+
+@pytest.mark.parametrize("path", ["/get_code", "/wait_code"])
+def test_stored_code_from_after_since_is_returned_and_cleared(client, stored_code, path):
+    table = stored_code("222222", received_at=time.time() - 5)
+
+    response = client.get(path, query_string={"email": "player@example.com", "since": time.time() - 10, "timeout": 0})
+
+    assert response.get_json() == {"status": "available", "code": "222222"}
+    assert table.row["verification_code"] is None
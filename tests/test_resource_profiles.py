@@ -0,0 +1,32 @@
+import pytest
+
+from resource_profiles import PROFILES, blocked_patterns
+
+ORG_URL = "https://www.rec.us/organizations/san-francisco-rec-park"
+
+
+def _blocked(profile_name: str, url: str) -> bool:
+    return any(pattern.search(url) for pattern in blocked_patterns(PROFILES[profile_name]))
+
+
+@pytest.mark.parametrize("profile_name", sorted(PROFILES))
+@pytest.mark.parametrize("url", [
+    "https://www.rec.us/_next/image?url=%2Fimages%2Fcourt.jpg&w=640&q=75",
+    "https://www.rec.us/_next/image?url=https%3A%2F%2Fcdn.rec.us%2Fparks%2Fmarble.png&w=1080&q=75",
+    "https://cdn.rec.us/parks/marble.webp?v=3",
+    "https://www.googletagmanager.com/gtag/js?id=G-XXXX",
+])
+def test_images_and_trackers_are_blocked(profile_name, url):
+    assert _blocked(profile_name, url)
+
+
+@pytest.mark.parametrize("profile_name", sorted(PROFILES))
+@pytest.mark.parametrize("url", [
+    ORG_URL,
+    "https://www.rec.us/_next/static/chunks/pages/_app-1234.js",
+    "https://www.rec.us/_next/static/css/app.css",
+    "https://www.rec.us/_next/data/build/organizations/san-francisco-rec-park.json?url=%2Fcourt.jpg",
+    "https://api.rec.us/v1/locations?image=%2Fcourt.jpg",
+])
+def test_pages_scripts_and_data_go_through(profile_name, url):
+    assert not _blocked(profile_name, url)
@@ -0,0 +1,62 @@
+import time
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+import pytest
+
+from retry_policy import RetryPolicy, classify_error, try_record
+
+
+@pytest.mark.parametrize("error", [
+    "No user information found",
+    "Cannot log in: missing password",
+    "Login rejected: login form still visible after submit",
+])
+def test_account_errors_are_terminal(error):
+    assert classify_error(error) == "terminal"
+
+
+@pytest.mark.parametrize("error", [
+    "Login button not found",
+    "Timeout 30000ms exceeded",
+    "Slot 08:00 not listed",
+    "",
+    None,
+])
+def test_other_errors_are_retryable(error):
+    assert classify_error(error) == "retryable"
+
+
+def test_delays_are_capped_and_one_fewer_than_the_tries():
+    delays = list(RetryPolicy(base_delay=0.25, max_delay=2, max_tries=10).delays())
+    assert len(delays) == 9
+    assert all(0.25 <= delay <= 2 for delay in delays)
+
+
+def test_deadline_only_right_after_release():
+    policy = RetryPolicy(window_seconds=20)
+    now = time.time()
+
+    assert policy.deadline(None) is None
+    assert policy.deadline(now - 5) == pytest.approx(now + 15)
+    assert policy.deadline(now - 30) is None
+
+
+def test_try_record_classifies_its_error():
+    assert try_record(1, time.time(), 0.1234, "Login rejected")["class"] == "terminal"
+    record = try_record(2, time.time(), 0.5, None)
+    assert record["class"] is None and record["latency_ms"] == 500.0
+
+
+def test_book_court_retry_window_follows_the_synced_clock(monkeypatch):
+    automation = pytest.importorskip("automation")
+    calls = []
+    monkeypatch.setattr(automation.browser_pool, "run", lambda func, *args, **kwargs: calls.append(args) or (True, "ok"))
+    # rec.us runs 2 s ahead of the local clock
+    monkeypatch.setattr(automation.clock_sync, "_estimate", {"offset": 2.0})
+    release_at = datetime(2026, 10, 17, 8, 0, tzinfo=ZoneInfo("America/Los_Angeles"))
+
+    automation.TennisBooker("", "").book_court("Alice Marble", datetime(2026, 10, 24, 8, 0), release_at=release_at)
+
+    # _book_court gets the release instant on the local clock, which its retry deadline is compared with
+    assert calls[0][3] == pytest.approx(release_at.timestamp() - 2.0)
@@ -0,0 +1,57 @@
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+
+import pytest
+
+# app needs the database client and the booker
+app_module = pytest.importorskip("app", exc_type=ImportError)
+BookingAttempt, UserInformation = app_module.BookingAttempt, app_module.UserInformation
+
+
+@pytest.fixture
+def client(monkeypatch):
+    app_module.app.config.update(TESTING=True, WTF_CSRF_ENABLED=False)
+    monkeypatch.setattr(UserInformation, "get_latest", staticmethod(lambda: {"rec_account_email": "player@example.com"}))
+    return app_module.app.test_client()
+
+
+def _booking_time():
+    slot = datetime.now(ZoneInfo("America/Los_Angeles")) + timedelta(days=3)
+    return slot.replace(hour=18, minute=0, second=0, microsecond=0).isoformat()
+
+
+def _refuse_save(self):
+    raise AssertionError("a duplicate submission must not create an attempt")
+
+
+@pytest.mark.parametrize("status, answer", [
+    ("scheduled", "scheduled"),
+    ("queued", "queued"),
+    ("running", "queued"),
+    ("completed", "success"),
+])
+def test_duplicate_submission_collapses_into_the_live_attempt(client, monkeypatch, status, answer):
+    keys = []
+
+    def get_active_by_key(key):
+        keys.append(key)
+        return {"id": 42, "status": status}
+
+    monkeypatch.setattr(BookingAttempt, "get_active_by_key", staticmethod(get_active_by_key))
+    monkeypatch.setattr(BookingAttempt, "save", _refuse_save)
+    booking_time = _booking_time()
+
+    response = client.post("/schedule-booking", json={"court_name": "Alice Marble", "booking_time": booking_time})
+
+    assert response.status_code == 200
+    assert response.get_json() == {**response.get_json(), "status": answer, "attempt_id": 42, "duplicate": True}
+    assert keys == [BookingAttempt.make_idempotency_key(
+        "player@example.com", "Alice Marble", datetime.fromisoformat(booking_time))]
+
+
+def test_same_slot_gets_the_same_key_in_any_timezone():
+    sf = datetime(2026, 10, 24, 18, 0, tzinfo=ZoneInfo("America/Los_Angeles"))
+    utc = sf.astimezone(ZoneInfo("UTC"))
+
+    assert BookingAttempt.make_idempotency_key(" Player@Example.com ", "Alice Marble", sf) == \
+        BookingAttempt.make_idempotency_key("player@example.com", "Alice Marble", utc)
@@ -0,0 +1,39 @@
+import threading
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+scheduled_bookings = pytest.importorskip("scheduled_bookings", exc_type=ImportError)
+from booking_window import SF_TIMEZONE
+
+
+def test_every_attempt_of_a_release_fires_at_once(monkeypatch):
+    release_at = datetime.now(SF_TIMEZONE) + timedelta(days=1)
+    attempts = [{"id": attempt_id, "court_name": "Alice Marble", "user_email": f"player{attempt_id}@example.com",
+                 "local_booking_time": release_at + timedelta(days=7), "release_at": release_at}
+                for attempt_id in range(1, 6)]
+    started = {}
+    lock = threading.Lock()
+
+    def run_attempt(attempt):
+        with lock:
+            started[attempt["id"]] = time.monotonic()
+        # Stands in for the wait for the release and the retry gaps, during which no browser is held
+        time.sleep(0.3)
+        return {"id": attempt["id"], "success": True, "error": None, "tries": 1, "seconds": 0.3}
+
+    statuses = {}
+    monkeypatch.setattr(scheduled_bookings, "cancel_booking_chain", lambda attempt_id, booking_time: None)
+    monkeypatch.setattr(scheduled_bookings.BookingAttempt, "update_status",
+                        staticmethod(lambda attempt_id, status, *args: statuses.__setitem__(attempt_id, status)))
+    monkeypatch.setattr(scheduled_bookings, "prewarm_group", lambda release_at, group: None)
+    monkeypatch.setattr(scheduled_bookings, "run_attempt", run_attempt)
+
+    results = scheduled_bookings.run_release_day(scheduled_bookings.group_attempts(attempts))
+
+    assert [result["id"] for result in results] == [1, 2, 3, 4, 5]
+    assert all(status == "running" for status in statuses.values()) and len(statuses) == 5
+    # More attempts than browser slots, yet none waited for another to finish
+    assert len(attempts) > scheduled_bookings.admission_controller.slots
+    assert max(started.values()) - min(started.values()) < 0.2
@@ -0,0 +1,88 @@
+import scheduler_leader as leader_module
+from scheduler_leader import SchedulerLeader
+
+
+class FakeScheduler:
+    """Stands in for one process's APScheduler."""
+
+    def __init__(self):
+        self.app = None
+        self.running = False
+        self.jobs = {}
+
+    def init_app(self, app):
+        self.app = app
+
+    def start(self):
+        self.running = True
+
+    def add_job(self, id, replace_existing=False, **kwargs):
+        if id in self.jobs and not replace_existing:
+            raise ValueError(f"job {id} exists")
+        self.jobs[id] = kwargs
+
+    def remove_job(self, job_id):
+        del self.jobs[job_id]
+
+    def get_jobs(self):
+        return []
+
+
+def _process(tmp_path, monkeypatch, fake):
+    monkeypatch.setattr(leader_module, "scheduler", fake)
+    leader = SchedulerLeader(lock_path=str(tmp_path / "leader.lock"), outbox_path=str(tmp_path / "outbox.sqlite3"))
+    leader.add_leader_job(id="refresh_rec_sessions", func="session_cache:refresh_expiring_sessions",
+                          trigger="interval", minutes=15)
+    return leader
+
+
+def test_leader_jobs_are_registered_by_the_next_leader(tmp_path, monkeypatch):
+    first_scheduler, second_scheduler = FakeScheduler(), FakeScheduler()
+    elected = []
+
+    first = _process(tmp_path, monkeypatch, first_scheduler)
+    first._on_elected.append(lambda: elected.append("first"))
+    first._poll_once()
+    second = _process(tmp_path, monkeypatch, second_scheduler)
+    second._on_elected.append(lambda: elected.append("second"))
+    second._poll_once()
+
+    assert first.is_leader and not second.is_leader
+    assert "refresh_rec_sessions" in first_scheduler.jobs
+    assert second_scheduler.jobs == {}
+
+    # The leader dies: the OS drops its flock and the follower takes over on its next poll
+    first._lock_file.close()
+    first._lock_file = None
+    second._poll_once()
+
+    assert second.is_leader
+    assert second_scheduler.running
+    assert second_scheduler.jobs["refresh_rec_sessions"]["minutes"] == 15
+    assert elected == ["first", "second"]
+
+
+def test_leader_job_declared_after_election_is_added_at_once(tmp_path, monkeypatch):
+    fake = FakeScheduler()
+    leader = _process(tmp_path, monkeypatch, fake)
+    leader._poll_once()
+    leader.add_leader_job(id="prefetch_availability", func="availability_prefetcher:prefetch_tick",
+                          trigger="interval", seconds=15)
+
+    assert set(fake.jobs) == {"refresh_rec_sessions", "prefetch_availability"}
+
+
+def test_follower_add_job_goes_through_the_outbox(tmp_path, monkeypatch):
+    leader_scheduler, follower_scheduler = FakeScheduler(), FakeScheduler()
+    leader = _process(tmp_path, monkeypatch, leader_scheduler)
+    leader._poll_once()
+    follower = _process(tmp_path, monkeypatch, follower_scheduler)
+    follower._poll_once()
+
+    follower.add_job(id="booking_1", func="scheduler:run_booking", trigger="date", args=[1])
+    assert follower.stats()["pending_forwards"] == 1
+
+    monkeypatch.setattr(leader_module, "scheduler", leader_scheduler)
+    leader._poll_once()
+    assert leader_scheduler.jobs["booking_1"]["args"] == [1]
+    assert "booking_1" not in follower_scheduler.jobs
@@ -0,0 +1,69 @@
+import threading
+
+import pytest
+
+from singleflight import SingleFlight
+
+
+def _run_concurrently(flight, key, fn, callers=3):
+    """Starts callers threads on flight.do(key, fn) while fn blocks; returns (results, errors) once it is released."""
+    release = threading.Event()
+    started = threading.Event()
+    results, errors = [], []
+
+    def blocking():
+        started.set()
+        release.wait(2)
+        return fn()
+
+    def call():
+        try:
+            results.append(flight.do(key, blocking))
+        except Exception as e:
+            errors.append(e)
+
+    leader = threading.Thread(target=call)
+    leader.start()
+    started.wait(2)
+    followers = [threading.Thread(target=call) for _ in range(callers - 1)]
+    for thread in followers:
+        thread.start()
+    while flight.stats()["waiting"] < callers - 1:
+        pass
+    release.set()
+    for thread in [leader, *followers]:
+        thread.join(2)
+    return results, errors
+
+
+def test_concurrent_callers_share_one_call():
+    flight = SingleFlight()
+    calls = []
+    snapshot = {"Court": ["08:00"]}
+
+    results, errors = _run_concurrently(flight, ("Court", "2026-10-20"), lambda: calls.append(1) or snapshot)
+
+    assert errors == [] and len(calls) == 1
+    assert all(result is snapshot for result in results) and len(results) == 3
+    assert flight.stats() == {"calls": 1, "shared": 2, "errors": 0, "in_flight": 0, "waiting": 0}
+
+
+def test_leader_error_is_raised_in_every_caller():
+    flight = SingleFlight()
+    failure = RuntimeError("scrape failed")
+
+    def fail():
+        raise failure
+
+    results, errors = _run_concurrently(flight, "key", fail)
+
+    assert results == [] and errors == [failure] * 3
+    assert flight.stats()["errors"] == 1
+
+
+def test_nothing_is_kept_after_a_call():
+    flight = SingleFlight()
+    with pytest.raises(ValueError):
+        flight.do("key", int, "not a number")
+    assert flight.do("key", int, "7") == 7
+    assert flight.stats()["calls"] == 2 and flight.stats()["in_flight"] == 0
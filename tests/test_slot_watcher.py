@@ -0,0 +1,53 @@
+import pytest
+
+# slot_watcher pulls in the booker and the database models
+slot_watcher = pytest.importorskip("slot_watcher", exc_type=ImportError)
+diff_snapshots, matches = slot_watcher.diff_snapshots, slot_watcher.matches
+served_dates, with_served = slot_watcher.served_dates, slot_watcher.with_served
+
+
+def _watch(date, court_name="Alice Marble", earliest="08:00", latest="10:00", **extra):
+    return {"id": 1, "court_name": court_name, "date": date, "earliest_time": earliest, "latest_time": latest, **extra}
+
+
+def test_diff_reports_added_and_removed_slots_per_court():
+    before = {"Alice Marble": ["08:00", "09:00"], "Dolores": ["10:00"]}
+    after = {"Alice Marble": ["09:00", "11:00"], "Moscone": ["07:00"]}
+
+    events = [(event["type"], event["court_name"], event["time"]) for event in diff_snapshots("2026-10-20", before, after)]
+
+    assert events == [
+        ("slot_added", "Alice Marble", "11:00"),
+        ("slot_removed", "Alice Marble", "08:00"),
+        ("slot_removed", "Dolores", "10:00"),
+        ("slot_added", "Moscone", "07:00"),
+    ]
+
+
+def test_identical_snapshots_have_no_events():
+    snapshot = {"Alice Marble": ["08:00"]}
+    assert diff_snapshots("2026-10-20", snapshot, dict(snapshot)) == []
+
+
+def test_matches_court_date_and_time_window():
+    watch = _watch("2026-10-20")
+    event = {"type": "slot_added", "court_name": "Alice Marble", "date": "2026-10-20", "time": "10:00"}
+
+    assert matches(watch, event)
+    assert not matches(watch, {**event, "time": "10:30"})
+    assert not matches(watch, {**event, "date": "2026-10-21"})
+    assert not matches(watch, {**event, "court_name": "Dolores"})
+
+
+def test_only_the_soonest_dates_from_today_are_served(monkeypatch):
+    monkeypatch.setattr(slot_watcher, "SLOT_WATCH_ENABLED", True)
+    watches = [_watch("2026-10-22"), _watch("2026-10-20"), _watch("2026-10-16"), _watch("2026-10-20")]
+
+    assert served_dates(watches, "2026-10-17", max_dates=1) == ["2026-10-20"]
+    assert served_dates(watches, "2026-10-17", max_dates=2) == ["2026-10-20", "2026-10-22"]
+    assert [watch["served"] for watch in with_served(watches, "2026-10-17", max_dates=1)] == [False, True, False, True]
+
+
+def test_nothing_is_served_when_watch_mode_is_off(monkeypatch):
+    monkeypatch.setattr(slot_watcher, "SLOT_WATCH_ENABLED", False)
+    assert served_dates([_watch("2026-10-20")], "2026-10-17") == []
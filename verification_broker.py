@@ -0,0 +1,112 @@
+import os
+import time
+import logging
+import threading
+from typing import Dict, Optional, Tuple
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+# --- Verification Code Configuration ---
+# Base URL of phone_verification_endpoint.py, which receives the SMS webhook
+VERIFICATION_SERVICE_URL = os.getenv("VERIFICATION_SERVICE_URL", "http://localhost:8000")
+# Total time a booking waits for its SMS code
+VERIFICATION_CODE_TIMEOUT_SECONDS = float(os.getenv("VERIFICATION_CODE_TIMEOUT", "30"))
+# Longest single /wait_code request; the server holds it open until a code arrives
+LONG_POLL_SECONDS = 20
+# Codes older than this are never handed out
+CODE_MAX_AGE_SECONDS = 5 * 60
+# --- End Verification Code Configuration ---
+
+
+class VerificationCodeBroker:
+    """
+    Hands SMS verification codes from the /sms webhook to waiting bookings.
+
+    publish() stores the newest code per account email and wakes every waiter;
+    wait_for_code() blocks on a condition until a code published after `since`
+    arrives, so a booking resumes as soon as the SMS does. Codes are consumed
+    by the first waiter that receives them. State is per process: the webhook
+    and the waiters must share the same process (the verification service runs
+    as a single threaded Flask app).
+    """
+
+    def __init__(self, max_age_seconds: float = CODE_MAX_AGE_SECONDS):
+        self.max_age_seconds = max_age_seconds
+        self._condition = threading.Condition()
+        # email -> (code, wall-clock time it was published)
+        self._codes: Dict[str, Tuple[str, float]] = {}
+
+    @staticmethod
+    def _key(email: str) -> str:
+        return email.strip().lower()
+
+    def publish(self, email: str, code: str):
+        with self._condition:
+            self._codes[self._key(email)] = (code, time.time())
+            self._condition.notify_all()
+        logger.info(f"[VerificationCodeBroker] Code published for {email}")
+
+    def _take(self, key: str, since: float) -> Optional[str]:
+        entry = self._codes.get(key)
+        if entry is None:
+            return None
+        code, published_at = entry
+        if published_at < since or time.time() - published_at > self.max_age_seconds:
+            return None
+        del self._codes[key]
+        return code
+
+    def wait_for_code(self, email: str, timeout: float, since: float = 0.0) -> Optional[str]:
+        """
+        Returns the first code for email published at or after `since` (epoch
+        seconds), waiting up to `timeout` seconds for one. Returns None on timeout.
+        """
+        key = self._key(email)
+        deadline = time.monotonic() + timeout
+        with self._condition:
+            while True:
+                code = self._take(key, since)
+                if code is not None:
+                    return code
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return None
+                self._condition.wait(remaining)
+
+
+verification_broker = VerificationCodeBroker()
+
+# Reused across waits so each booking does not open a new connection
+_session = requests.Session()
+
+
+def wait_for_verification_code(email: str, since: float,
+                               timeout: float = VERIFICATION_CODE_TIMEOUT_SECONDS) -> Optional[str]:
+    """
+    Client side used by TennisBooker: long-polls the verification service's
+    /wait_code until the SMS for `email` sent after `since` arrives.
+    """
+    deadline = time.monotonic() + timeout
+    while True:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return None
+        wait_seconds = min(remaining, LONG_POLL_SECONDS)
+        try:
+            response = _session.get(
+                f"{VERIFICATION_SERVICE_URL}/wait_code",
+                params={"email": email, "since": since, "timeout": wait_seconds},
+                timeout=wait_seconds + 5,
+            )
+            if response.status_code == 200:
+                data = response.json()
+                if data.get("status") == "available":
+                    return data.get("code")
+            else:
+                logger.warning(f"[wait_for_verification_code] /wait_code returned {response.status_code}")
+                time.sleep(min(1, max(0, deadline - time.monotonic())))
+        except requests.RequestException as e:
+            logger.error(f"[wait_for_verification_code] Error waiting for code: {str(e)}")
+            time.sleep(min(1, max(0, deadline - time.monotonic())))
@@ -0,0 +1,122 @@
+"""
+Booking worker: runs queued booking attempts outside the web server.
+
+The web app only records an attempt and puts it on the durable local queue
+(booking_queue.py); each worker process here claims attempts, drives the
+browser and writes progress to the booking_attempts row. When an immediate
+booking fails, the retries are queued as delayed jobs.
+
+Usage:
+    python worker.py [--processes N]
+"""
+import os
+import time
+import signal
+import logging
+import argparse
+import multiprocessing
+
+logger = logging.getLogger(__name__)
+
+BOOKING_WORKER_PROCESSES = int(os.getenv("BOOKING_WORKER_PROCESSES", "2"))
+# How often an idle worker looks for new jobs
+POLL_INTERVAL_SECONDS = float(os.getenv("BOOKING_WORKER_POLL_INTERVAL", "0.5"))
+
+
+def process_job(job):
+    """Runs one claimed queue job. Returns the error message, or None on success."""
+    from booking_queue import booking_queue
+    from booking_window import RETRY_OFFSETS_SECONDS
+    from retry_policy import classify_error
+    from models import BookingAttempt
+    from scheduler import run_booking
+
+    attempt_id = job["attempt_id"]
+    payload = job["payload"]
+    phase = payload.get("phase")
+    if phase is None:
+        BookingAttempt.update_status(attempt_id, 'running')
+
+    # The last job of an attempt is the one that may mark it failed
+    retry_index = payload.get("retry", 0)
+    final = retry_index >= len(RETRY_OFFSETS_SECONDS)
+    # Retries are queue jobs, not chain links: keep the attempt out of chain recovery
+    success, error = run_booking(attempt_id, phase=phase, final=final, pending_status='queued')
+
+    if not success and not final and classify_error(error) != "terminal":
+        next_retry = retry_index + 1
+        booking_queue.enqueue(attempt_id, {"phase": "retry", "retry": next_retry},
+                              run_at=time.time() + RETRY_OFFSETS_SECONDS[next_retry - 1],
+                              dedupe_key=job.get("dedupe_key"))
+        logger.info(f"Attempt {attempt_id} failed ({error}); retry {next_retry} queued")
+    return None if success else (error or "Booking failed")
+
+
+def worker_loop(stop_event):
+    from booking_queue import booking_queue
+
+    logger.info(f"Booking worker {os.getpid()} started")
+    while not stop_event.is_set():
+        job = booking_queue.claim()
+        if job is None:
+            stop_event.wait(POLL_INTERVAL_SECONDS)
+            continue
+        started = time.perf_counter()
+        error = None
+        try:
+            error = process_job(job)
+        except Exception as e:
+            error = str(e)
+            logger.error(f"Booking job {job['id']} for attempt {job['attempt_id']} crashed: {error}", exc_info=True)
+        booking_queue.finish(job["id"], error)
+        logger.info(f"Booking job {job['id']} (attempt {job['attempt_id']}) finished in "
+                    f"{time.perf_counter() - started:.1f}s: {error or 'ok'}")
+    logger.info(f"Booking worker {os.getpid()} stopping")
+
+
+def _run_worker(stop_event):
+    # Children exit on the parent's stop event, not on the terminal's Ctrl+C
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(processName)s %(name)s %(levelname)s %(message)s")
+    worker_loop(stop_event)
+
+
+def main(processes: int = BOOKING_WORKER_PROCESSES):
+    from booking_queue import booking_queue
+
+    booking_queue.requeue_orphaned()
+    stop_event = multiprocessing.Event()
+
+    def stop(signum, frame):
+        logger.info(f"Received signal {signum}; stopping workers")
+        stop_event.set()
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    workers = {}
+    while not stop_event.is_set():
+        # Start missing workers (initially, or after one died)
+        for slot in range(processes):
+            process = workers.get(slot)
+            if process is None or not process.is_alive():
+                if process is not None:
+                    logger.warning(f"Booking worker {process.pid} exited with {process.exitcode}; restarting")
+                    booking_queue.requeue_orphaned()
+                process = multiprocessing.Process(target=_run_worker, args=(stop_event,), name=f"booking-worker-{slot}")
+                process.start()
+                workers[slot] = process
+        stop_event.wait(1)
+
+    for process in workers.values():
+        process.join(timeout=60)
+        if process.is_alive():
+            process.terminate()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--processes", type=int, default=BOOKING_WORKER_PROCESSES)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(processName)s %(name)s %(levelname)s %(message)s")
+    main(args.processes)